@@ -6,11 +6,16 @@ AKShare 数据获取脚本
 """
 
 import sys
+import os
 import json
-import akshare as ak
 import pandas as pd
 from datetime import datetime, timedelta
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'akshare_api'))
+from upstream import ak
+from history_store import get_index_daily
+from pycommon import profiling, timings
+
 def get_wind_a_index_data(end_date=None):
     """
     获取万得全A指数数据
@@ -35,10 +40,10 @@ def get_wind_a_index_data(end_date=None):
         try:
             # 尝试获取万得全A
             df = ak.index_zh_a_hist(symbol="881001", period="daily", start_date=start_date, end_date=end_date)
-        except:
+        except Exception as e:
             # 如果失败，使用上证指数作为替代
-            print("Warning: 万得全A数据获取失败，使用上证指数替代", file=sys.stderr)
-            df = ak.stock_zh_index_daily(symbol="sh000001")
+            print(f"Warning: 万得全A数据获取失败，使用上证指数替代: {e}", file=sys.stderr)
+            df = get_index_daily("sh000001", end_date=f"{end_date[:4]}-{end_date[4:6]}-{end_date[6:]}")
             # 转换日期格式用于过滤
             df['date'] = pd.to_datetime(df['date']).dt.strftime('%Y%m%d')
             df = df[(df['date'] >= start_date) & (df['date'] <= end_date)]
@@ -63,81 +68,85 @@ def get_wind_a_index_data(end_date=None):
             print(f"Warning: 国债数据获取失败: {e}", file=sys.stderr)
             china_10y = pd.DataFrame()
         
-        # 数据处理
-        df['date'] = pd.to_datetime(df['日期']).dt.strftime('%Y-%m-%d')
-        df['close'] = df['收盘']
-        df['volume'] = df.get('成交量', 0)
-        
-        # 计算涨跌幅
-        df['change_pct'] = df['close'].pct_change() * 100
-        
-        # 构建返回数据
-        result = {
-            'historical_data': [],
-            'current_metrics': {},
-            'bond_data': []
-        }
-        
-        # 历史数据（每周采样一次以减少数据量）
-        df_weekly = df.iloc[::5].copy()  # 每5个交易日取一个点
-        
-        for idx, row in df_weekly.iterrows():
-            result['historical_data'].append({
-                'date': row['date'],
-                'close': float(row['close']),
-                'volume': float(row.get('volume', 0)),
-                'change_pct': float(row.get('change_pct', 0)) if pd.notna(row.get('change_pct')) else 0
-            })
-        
-        # 当前指标（使用最新数据）
-        latest = df.iloc[-1]
-        
-        # 计算PE和PB（这里使用估算值，实际应该从专业数据源获取）
-        # 简化计算：假设合理PE范围
-        current_pe = 15 + (float(latest['close']) / 3000) * 10  # 简化估算
-        current_pb = 1.2 + (float(latest['close']) / 3000) * 1.5  # 简化估算
-        
-        # 获取最新国债收益率
-        if not china_10y.empty:
-            latest_bond = china_10y.iloc[-1]
-            bond_yield = float(latest_bond['bond_yield'])
-        else:
-            bond_yield = 2.5  # 默认值
-        
-        # 计算股债利差 (股票收益率 - 债券收益率)
-        # 股票收益率 = 1 / PE * 100
-        equity_yield = (1 / current_pe) * 100
-        spread = equity_yield - bond_yield
-        
-        result['current_metrics'] = {
-            'date': latest['date'],
-            'index_value': float(latest['close']),
-            'pe': round(current_pe, 2),
-            'pb': round(current_pb, 2),
-            'bond_yield': round(bond_yield, 3),
-            'equity_yield': round(equity_yield, 3),
-            'spread': round(spread, 2),
-            'change_pct': float(latest.get('change_pct', 0)) if pd.notna(latest.get('change_pct')) else 0
-        }
-        
-        # 国债数据
-        if not china_10y.empty:
-            for idx, row in china_10y.iterrows():
-                result['bond_data'].append({
+        with timings.span("transform"):
+            # 数据处理
+            df['date'] = pd.to_datetime(df['日期']).dt.strftime('%Y-%m-%d')
+            df['close'] = df['收盘']
+            df['volume'] = df.get('成交量', 0)
+            
+            # 计算涨跌幅
+            df['change_pct'] = df['close'].pct_change() * 100
+            
+            # 构建返回数据
+            result = {
+                'historical_data': [],
+                'current_metrics': {},
+                'bond_data': []
+            }
+            
+            # 历史数据（每周采样一次以减少数据量）
+            df_weekly = df.iloc[::5].copy()  # 每5个交易日取一个点
+            
+            for idx, row in df_weekly.iterrows():
+                result['historical_data'].append({
                     'date': row['date'],
-                    'yield': float(row['bond_yield'])
+                    'close': float(row['close']),
+                    'volume': float(row.get('volume', 0)),
+                    'change_pct': float(row.get('change_pct', 0)) if pd.notna(row.get('change_pct')) else 0
                 })
-        
-        return json.dumps(result, ensure_ascii=False)
+            
+            # 当前指标（使用最新数据）
+            latest = df.iloc[-1]
+            
+            # 计算PE和PB（这里使用估算值，实际应该从专业数据源获取）
+            # 简化计算：假设合理PE范围
+            current_pe = 15 + (float(latest['close']) / 3000) * 10  # 简化估算
+            current_pb = 1.2 + (float(latest['close']) / 3000) * 1.5  # 简化估算
+            
+            # 获取最新国债收益率
+            if not china_10y.empty:
+                latest_bond = china_10y.iloc[-1]
+                bond_yield = float(latest_bond['bond_yield'])
+            else:
+                bond_yield = 2.5  # 默认值
+            
+            # 计算股债利差 (股票收益率 - 债券收益率)
+            # 股票收益率 = 1 / PE * 100
+            equity_yield = (1 / current_pe) * 100
+            spread = equity_yield - bond_yield
+            
+            result['current_metrics'] = {
+                'date': latest['date'],
+                'index_value': float(latest['close']),
+                'pe': round(current_pe, 2),
+                'pb': round(current_pb, 2),
+                'bond_yield': round(bond_yield, 3),
+                'equity_yield': round(equity_yield, 3),
+                'spread': round(spread, 2),
+                'change_pct': float(latest.get('change_pct', 0)) if pd.notna(latest.get('change_pct')) else 0
+            }
+            
+            # 国债数据
+            if not china_10y.empty:
+                for idx, row in china_10y.iterrows():
+                    result['bond_data'].append({
+                        'date': row['date'],
+                        'yield': float(row['bond_yield'])
+                    })
+            
+        
+        return timings.dumps(result, ensure_ascii=False)
         
     except Exception as e:
         error_result = {
             'error': str(e),
             'message': '获取数据失败，请检查AKShare是否正确安装'
         }
-        return json.dumps(error_result, ensure_ascii=False)
+        return timings.dumps(error_result, ensure_ascii=False)
 
 if __name__ == '__main__':
+    timings.mark_imported()
+    profiling.install()
     # 从命令行参数获取日期，如果没有则使用今天
     end_date = sys.argv[1] if len(sys.argv) > 1 else None
     
@@ -0,0 +1,199 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+akshare 按需导入
+`import akshare` 会执行 akshare/__init__.py 中的全部 import，导入数百个子模块（约 0.5~1 秒），
+而每个脚本只用到其中几个函数。这里只导入被调用函数所在的子模块:
+
+- 函数名 -> 子模块 的索引由 akshare/__init__.py 的 from ... import 语句解析得到（ast，不执行），
+  按 __init__.py 的路径、大小和修改时间缓存在本地缓存目录（upstream/akshare_index.json）
+- sys.modules 中放入一个不执行 __init__.py 的 akshare 包对象，子模块按正常的包导入机制加载；
+  其他代码直接 `import akshare` 后访问包对象上还没有的名字时（PEP 562 模块 __getattr__），导入完整的 akshare
+- 索引中没有的名字（例如后来改为动态导出的函数）导入完整的 akshare
+- AKSHARE_LAZY_IMPORT=false 时关闭，始终导入完整的 akshare
+
+用法:
+    python3 akshare_loader.py stock_zh_index_daily tool_trade_date_hist_sina   # 查看函数所在的子模块
+"""
+
+import os
+import sys
+import json
+import threading
+import importlib
+import importlib.util
+
+from local_cache import cache_path, read_json, write_json
+
+PACKAGE = "akshare"
+
+ENABLED = os.environ.get("AKSHARE_LAZY_IMPORT", "true").lower() not in ("0", "false", "no")
+
+def build_index(init_path):
+    """
+    解析 akshare/__init__.py 中的 from akshare.x.y import (...) 语句
+
+    Args:
+        init_path: akshare/__init__.py 的路径
+
+    Returns:
+        {导出名: [子模块名, 子模块中的属性名]}
+    """
+    import ast
+
+    with open(init_path, "rb") as f:
+        tree = ast.parse(f.read(), filename=init_path)
+
+    index = {}
+    # 只看模块顶层的语句；同名导出以最后一次为准，与执行 __init__.py 的结果一致
+    for node in tree.body:
+        if not isinstance(node, ast.ImportFrom) or node.module is None:
+            continue
+        if node.level:
+            module = f"{PACKAGE}.{node.module}"
+        elif node.module.startswith(f"{PACKAGE}."):
+            module = node.module
+        else:
+            continue
+        for alias in node.names:
+            if alias.name == "*":
+                continue
+            index[alias.asname or alias.name] = [module, alias.name]
+    return index
+
+class AkshareLoader:
+    """
+    按函数名导入 akshare 的子模块
+
+    Args:
+        enabled: False 时始终导入完整的 akshare
+    """
+
+    def __init__(self, enabled=ENABLED):
+        self.enabled = enabled
+        self.lock = threading.RLock()
+        self._spec = None
+        self._index = None
+        self._stub = None
+        self._full = None
+        self._loading = False
+        self.loaded = set()
+
+    def _find_spec(self):
+        if self._spec is None:
+            self._spec = importlib.util.find_spec(PACKAGE)
+            if self._spec is None:
+                raise ImportError(f"No module named '{PACKAGE}'")
+        return self._spec
+
+    def index(self):
+        """函数名 -> 子模块索引（优先读取本地缓存）"""
+        if self._index is None:
+            init_path = self._find_spec().origin
+            stat = os.stat(init_path)
+            signature = [init_path, stat.st_size, int(stat.st_mtime)]
+            path = cache_path("upstream", "akshare_index.json")
+            cached = read_json(path)
+            if isinstance(cached, dict) and cached.get("signature") == signature:
+                self._index = cached["index"]
+            else:
+                self._index = build_index(init_path)
+                try:
+                    write_json(path, {"signature": signature, "index": self._index})
+                except OSError as e:
+                    print(f"Warning: 写入 akshare 导入索引失败: {e}", file=sys.stderr)
+        return self._index
+
+    def _package(self):
+        """sys.modules 中的 akshare 包；尚未导入时放入一个不执行 __init__.py 的包对象"""
+        module = sys.modules.get(PACKAGE)
+        if module is None:
+            module = importlib.util.module_from_spec(self._find_spec())
+            module.__getattr__ = self._stub_getattr
+            sys.modules[PACKAGE] = module
+            self._stub = module
+        return module
+
+    def _stub_getattr(self, name):
+        """包对象的模块 __getattr__：访问还没有的名字时导入完整的 akshare 再取"""
+        with self.lock:
+            # 执行 __init__.py 期间（同一线程内）的查找按普通的缺少属性处理
+            if self._loading:
+                raise AttributeError(f"module '{PACKAGE}' has no attribute '{name}'")
+            module = self.load_all()
+        try:
+            return module.__dict__[name]
+        except KeyError:
+            raise AttributeError(f"module '{PACKAGE}' has no attribute '{name}'") from None
+
+    def load_all(self):
+        """
+        导入完整的 akshare
+
+        已放入未初始化的包对象时，在同一个模块对象上执行 __init__.py，已导入的子模块直接复用
+        """
+        with self.lock:
+            if self._full is None:
+                module = sys.modules.get(PACKAGE)
+                if module is not None and module is self._stub:
+                    self._loading = True
+                    try:
+                        self._find_spec().loader.exec_module(module)
+                    finally:
+                        self._loading = False
+                    # 完整导入后不再需要按需导入的 __getattr__
+                    if module.__dict__.get("__getattr__") == self._stub_getattr:
+                        del module.__getattr__
+                else:
+                    module = importlib.import_module(PACKAGE)
+                self._full = module
+            return self._full
+
+    def resolve(self, name):
+        """
+        取得 akshare.<name>，只导入它所在的子模块
+
+        Args:
+            name: akshare 导出的函数名，如 "stock_zh_index_daily"
+
+        Returns:
+            函数（或其他导出的对象）
+
+        Raises:
+            AttributeError: akshare 没有这个名字
+        """
+        if self._full is not None or not self.enabled:
+            return getattr(self.load_all(), name)
+
+        with self.lock:
+            module = sys.modules.get(PACKAGE)
+            if module is not None and module is not self._stub:
+                # 已由其他代码完整导入，取包上的属性（可能已被替换）
+                self._full = module
+                return getattr(module, name)
+            entry = self.index().get(name)
+            if entry is None:
+                return getattr(self.load_all(), name)
+            module_name, attr = entry
+            self._package()
+            module = importlib.import_module(module_name)
+            self.loaded.add(module_name)
+        return getattr(module, attr)
+
+    def is_exported(self, name):
+        """索引中是否有这个名字（不导入任何模块）"""
+        if not self.enabled:
+            return False
+        with self.lock:
+            return name in self.index()
+
+loader = AkshareLoader()
+
+if __name__ == "__main__":
+    names = sys.argv[1:]
+    index = loader.index()
+    if not names:
+        print(json.dumps({"names": len(index), "modules": len({entry[0] for entry in index.values()})}))
+    for name in names:
+        entry = index.get(name)
+        print(f"{name}: {'.'.join(entry) if entry else '（不在索引中，导入完整的 akshare）'}")
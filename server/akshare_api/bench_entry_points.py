@@ -0,0 +1,256 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+数据入口性能测试
+用录制的上游数据（pycommon.recorder）回放，不访问网络。每个入口在独立的子进程中运行:
+
+- coldStartMs: 从启动子进程到第一次调用返回（解释器启动 + 导入 + 第一次调用，本地存储为空）
+- importMs / firstCallMs: 子进程内导入耗时和第一次调用耗时
+- warm: 之后 N 次调用的 p50/p95/p99/mean/min/max（毫秒），与常驻工作进程中的情况相同
+- peakRssKb: 子进程的峰值内存
+- upstream: 上游调用数（calls 为 ak.* 调用数，upstream 为实际发出数）及按函数的明细
+
+结果输出为 JSON，可用 --compare 与之前的结果对比。
+
+用法:
+    # 录制一次上游数据（需要网络）
+    python3 bench_entry_points.py --record --fixtures /data/bench-fixtures --date 2024-01-15
+    # 回放测试
+    python3 bench_entry_points.py --fixtures /data/bench-fixtures --date 2024-01-15 \\
+        [--iterations 20] [--only get_sectors_data,get_indices_data] [--output result.json] [--compare base.json]
+"""
+
+import io
+import os
+import sys
+import json
+import math
+import time
+import argparse
+import platform
+import tempfile
+import subprocess
+import importlib.util
+from contextlib import redirect_stdout
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+SERVER_DIR = os.path.dirname(SCRIPT_DIR)
+
+sys.path.insert(0, SERVER_DIR)
+from pycommon import profiling
+
+INDEX_CODES = "000001.SH,399001.SZ,399006.SZ,000300.SH,000016.SH"
+
+def _module(name):
+    return importlib.import_module(name)
+
+def _akshare_fetch():
+    """akshare-fetch.py 文件名带连字符，按路径导入"""
+    spec = importlib.util.spec_from_file_location("akshare_fetch", os.path.join(SERVER_DIR, "akshare-fetch.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+# 入口名 -> (导入模块的函数, 函数名, 参数构造函数)
+ENTRY_POINTS = {
+    "get_sectors_data": (lambda: _module("get_sectors"), "get_sectors_data", lambda date: (date,)),
+    "get_indices_data": (lambda: _module("get_indices"), "get_indices_data", lambda date: (INDEX_CODES, date)),
+    "get_equity_bond_spread": (lambda: _module("get_equity_bond_spread"), "get_equity_bond_spread",
+                               lambda date: (date,)),
+    "get_market_overview": (lambda: _module("get_market_overview"), "get_market_overview", lambda date: (date,)),
+    "get_market_overview_simple": (lambda: _module("get_market_overview_v2"), "get_market_overview_simple",
+                                   lambda date: (date,)),
+    "get_market_overview_fast": (lambda: _module("get_market_overview_v3"), "get_market_overview_fast",
+                                 lambda date: (date,)),
+    "get_wind_a_index_data": (_akshare_fetch, "get_wind_a_index_data", lambda date: (date,)),
+}
+
+def percentile(sorted_values, p):
+    """最近秩法的分位数"""
+    if not sorted_values:
+        return None
+    rank = max(1, int(math.ceil(p / 100.0 * len(sorted_values))))
+    return sorted_values[rank - 1]
+
+def summarize(latencies):
+    values = sorted(latencies)
+    if not values:
+        return {"n": 0}
+    return {
+        "n": len(values),
+        "p50": round(percentile(values, 50), 2),
+        "p95": round(percentile(values, 95), 2),
+        "p99": round(percentile(values, 99), 2),
+        "mean": round(sum(values) / len(values), 2),
+        "min": round(values[0], 2),
+        "max": round(values[-1], 2),
+    }
+
+def _emit(event):
+    """子进程向父进程输出一行 JSON（入口函数自己的输出已被重定向）"""
+    sys.__stdout__.write(json.dumps(event, ensure_ascii=False) + "\n")
+    sys.__stdout__.flush()
+
+def run_child(name, date, iterations):
+    """在子进程中运行单个入口并输出测量结果"""
+    sys.path.insert(0, SCRIPT_DIR)
+    loader, func_name, make_args = ENTRY_POINTS[name]
+    report = {"entry": name}
+    sink = io.StringIO()
+
+    started = time.perf_counter()
+    try:
+        with redirect_stdout(sink):
+            func = getattr(loader(), func_name)
+        imported = time.perf_counter()
+        report["importMs"] = round((imported - started) * 1000, 2)
+
+        args = make_args(date)
+        with redirect_stdout(sink):
+            func(*args)
+        report["firstCallMs"] = round((time.perf_counter() - imported) * 1000, 2)
+        _emit({"event": "first"})
+
+        latencies = []
+        for _ in range(iterations):
+            sink.seek(0)
+            sink.truncate()
+            call_started = time.perf_counter()
+            with redirect_stdout(sink):
+                func(*args)
+            latencies.append((time.perf_counter() - call_started) * 1000)
+        report["warm"] = summarize(latencies)
+    except Exception as e:
+        report["error"] = f"{type(e).__name__}: {e}"
+        _emit({"event": "first"})
+
+    upstream = sys.modules.get("upstream")
+    if upstream is not None:
+        stats = upstream.get_stats()
+        report["upstream"] = {
+            "calls": stats.get("calls", 0),
+            "upstream": stats.get("upstream", 0),
+            "deduplicated": stats.get("deduplicated", 0),
+            "byFunction": {fn: counters["upstream"] for fn, counters in stats.get("byFunction", {}).items()},
+        }
+        if "recorder" in stats:
+            report["recorder"] = stats["recorder"]
+    _emit({"event": "result", "report": report})
+
+def run_entry(name, args):
+    """启动子进程运行单个入口，返回测量结果"""
+    env = dict(os.environ)
+    env["UPSTREAM_MODE"] = "record" if args.record else "replay"
+    env["UPSTREAM_RECORD_DIR"] = os.path.abspath(args.fixtures)
+    command = [sys.executable, os.path.abspath(__file__), "--child", name, "--date", args.date,
+               "--iterations", "0" if args.record else str(args.iterations)]
+
+    # 每个入口使用空的本地缓存目录，冷启动包括本地存储的构建；结束后删除
+    with tempfile.TemporaryDirectory(prefix=f"bench-{name}-") as cache_dir, \
+            tempfile.TemporaryFile(mode="w+") as stderr:
+        env["AKSHARE_CACHE_DIR"] = cache_dir
+        started = time.perf_counter()
+        proc = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=stderr, env=env, text=True)
+        cold_start_ms = None
+        report = None
+        for line in proc.stdout:
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue
+            if event.get("event") == "first" and cold_start_ms is None:
+                cold_start_ms = round((time.perf_counter() - started) * 1000, 2)
+            elif event.get("event") == "result":
+                report = event["report"]
+        proc.stdout.close()
+        _, status, rusage = os.wait4(proc.pid, 0)
+        proc.returncode = os.waitstatus_to_exitcode(status) if hasattr(os, "waitstatus_to_exitcode") else status
+
+        if report is None:
+            stderr.seek(0)
+            report = {"entry": name, "error": f"子进程退出码 {proc.returncode}: {stderr.read()[-500:]}"}
+
+    report["coldStartMs"] = cold_start_ms
+    report["peakRssKb"] = profiling.max_rss_kb(rusage)
+    return report
+
+def compare(results, baseline):
+    """打印与基线的对比（变化百分比，正数表示变慢/变大）"""
+    def change(new, old):
+        if new is None or not old:
+            return "     -"
+        return f"{(new - old) / old * 100:+6.1f}%"
+
+    print(f"{'入口':32s} {'cold':>8s} {'p50':>8s} {'p95':>8s} {'RSS':>8s} {'upstream':>9s}", file=sys.stderr)
+    for name, report in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        warm, base_warm = report.get("warm", {}), base.get("warm", {})
+        calls = report.get("upstream", {}).get("upstream")
+        base_calls = base.get("upstream", {}).get("upstream")
+        print(f"{name:32s} {change(report.get('coldStartMs'), base.get('coldStartMs')):>8s} "
+              f"{change(warm.get('p50'), base_warm.get('p50')):>8s} {change(warm.get('p95'), base_warm.get('p95')):>8s} "
+              f"{change(report.get('peakRssKb'), base.get('peakRssKb')):>8s} "
+              f"{str(base_calls) + '->' + str(calls):>9s}", file=sys.stderr)
+
+def main():
+    parser = argparse.ArgumentParser(description="数据入口性能测试")
+    parser.add_argument("--fixtures", default=os.path.join(SERVER_DIR, ".cache", "bench-fixtures"),
+                        help="录制的上游数据目录")
+    parser.add_argument("--date", default="2024-01-15", help="测试日期 YYYY-MM-DD")
+    parser.add_argument("--iterations", type=int, default=20, help="热调用次数")
+    parser.add_argument("--only", default=None, help="只测试这些入口，逗号分隔")
+    parser.add_argument("--record", action="store_true", help="访问上游录制数据，不测量")
+    parser.add_argument("--output", default=None, help="结果 JSON 文件，默认输出到标准输出")
+    parser.add_argument("--compare", default=None, help="与之前的结果 JSON 对比")
+    parser.add_argument("--child", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.date, args.iterations)
+        return
+
+    names = args.only.split(",") if args.only else list(ENTRY_POINTS)
+    unknown = [name for name in names if name not in ENTRY_POINTS]
+    if unknown:
+        parser.error(f"未知入口: {', '.join(unknown)}（可选: {', '.join(ENTRY_POINTS)}）")
+
+    results = {}
+    for name in names:
+        print(f"[bench] {name}...", file=sys.stderr)
+        results[name] = run_entry(name, args)
+        misses = results[name].get("recorder", {}).get("misses", 0)
+        if misses and not args.record:
+            # 缺少录制时入口走的是回退路径，测到的不是正常情况
+            print(f"Warning: {name} 有 {misses} 次调用没有录制，请用相同的 --date 重新 --record", file=sys.stderr)
+        if "error" in results[name]:
+            print(f"Warning: {name} 失败: {results[name]['error']}", file=sys.stderr)
+
+    output = {
+        "meta": {
+            "date": args.date,
+            "iterations": args.iterations,
+            "mode": "record" if args.record else "replay",
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "replayLatency": os.environ.get("UPSTREAM_REPLAY_LATENCY"),
+            "replayFailureRate": os.environ.get("UPSTREAM_REPLAY_FAILURE_RATE"),
+        },
+        "results": results,
+    }
+
+    data = json.dumps(output, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(data + "\n")
+    else:
+        print(data)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            compare(results, json.load(f).get("results", {}))
+
+if __name__ == "__main__":
+    main()
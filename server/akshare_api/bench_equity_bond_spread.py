@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+股债利差计算性能测试
+对比逐行 iterrows 循环与整列计算，使用合成数据，不访问网络
+
+用法:
+    python3 bench_equity_bond_spread.py [--years 20] [--repeat 5]
+"""
+
+import sys
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from get_equity_bond_spread import compute_spread_series, chart_records
+
+BOND_COL = '中国国债收益率10年'
+
+def _month_end_alias():
+    """月末频率别名：pandas 2.2 起为 'ME'，更早的版本只认 'M'"""
+    try:
+        pd.tseries.frequencies.to_offset('ME')
+        return 'ME'
+    except ValueError:
+        return 'M'
+
+MONTH_END = _month_end_alias()
+
+def make_merged(years, freq):
+    """构造与 sample_series 结果同结构的合成数据"""
+    periods_per_year = {'D': 365, 'B': 252, MONTH_END: 12}[freq]
+    dates = pd.date_range(end='2025-06-30', periods=int(years * periods_per_year), freq=freq)
+    rng = np.random.default_rng(0)
+    n = len(dates)
+    return pd.DataFrame({
+        'open': 3000 + rng.normal(0, 20, n).cumsum(),
+        'close': 3000 + rng.normal(0, 20, n).cumsum(),
+        'volume': rng.uniform(1e8, 5e8, n),
+        'PE': rng.uniform(8, 20, n),
+        'PB': rng.uniform(1, 2.5, n),
+        BOND_COL: rng.uniform(1.5, 4.5, n),
+    }, index=dates)
+
+def legacy_chart_data(merged, bond_col):
+    """原实现：逐行循环"""
+    chart_data = []
+    spreads = []
+    pbs = []
+    pes = []
+
+    for date, row in merged.iterrows():
+        pe = float(row.get('PE', 15.0))
+        pb = float(row.get('PB', 1.5))
+        bond_yield = float(row.get(bond_col, 3.0))
+        wind_a = float(row.get('close', 3000))
+
+        earnings_yield = (1 / pe * 100) if pe > 0 else 0
+        spread = earnings_yield - bond_yield
+
+        year = date.year
+        month = date.month
+        date_str = f"{year}-{str(month).zfill(2)}-01"
+
+        chart_data.append({
+            "date": date_str,
+            "year": year,
+            "displayYear": year if month == 1 else "",
+            "spread": round(spread, 2),
+            "windA": round(wind_a, 0)
+        })
+
+        spreads.append(spread)
+        pbs.append(pb)
+        pes.append(pe)
+
+    return chart_data
+
+def vectorized_chart_data(merged, bond_col):
+    """新实现：整列计算后直接由列序列化"""
+    return chart_records(compute_spread_series(merged, bond_col))
+
+def best_of(func, repeat, *args):
+    """重复执行取最快一次（秒）"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser(description="股债利差计算性能测试")
+    parser.add_argument("--years", type=float, default=20, help="历史年数")
+    parser.add_argument("--repeat", type=int, default=5, help="重复次数")
+    args = parser.parse_args()
+
+    print(f"{'粒度':<6}{'行数':>8}{'iterrows(ms)':>16}{'整列(ms)':>12}{'加速':>8}")
+    for label, freq in (("月", MONTH_END), ("交易日", 'B'), ("自然日", 'D')):
+        merged = make_merged(args.years, freq)
+        legacy_time, legacy = best_of(legacy_chart_data, args.repeat, merged, BOND_COL)
+        fast_time, fast = best_of(vectorized_chart_data, args.repeat, merged, BOND_COL)
+
+        # 新实现多出滚动分位数字段，只比较原有字段
+        if len(legacy) != len(fast) or legacy != [{key: item[key] for key in legacy_item} for item, legacy_item in zip(fast, legacy)]:
+            print(f"结果不一致: {label}", file=sys.stderr)
+            sys.exit(1)
+
+        print(f"{label:<6}{len(merged):>8}{legacy_time * 1000:>16.1f}{fast_time * 1000:>12.1f}{legacy_time / fast_time:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
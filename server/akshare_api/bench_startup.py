@@ -0,0 +1,277 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+一次性脚本启动耗时测试（带预算）
+本地缓存已覆盖请求时，一次性脚本的耗时几乎全部是解释器启动和导入。每个场景:
+
+1. 在空的本地缓存目录中运行一次，回放录制的上游数据（pycommon.recorder）填充本地存储
+2. 在同一个缓存目录中不回放、不访问上游地再运行 N 次，测量端到端耗时（启动进程到退出）
+3. 统计值（默认 p50）超过预算，或测量的运行中仍有上游调用时，退出码为 1
+
+测量的运行使用正常模式（不设置 UPSTREAM_MODE），akshare 的导入方式与线上一致；
+上游调用数由 SCRIPT_TIMINGS 的 upstream.* 阶段统计。--zygote 时测量的运行经由 zygote.py fork 执行
+（从发出请求到收到结果）。
+
+--importtime 用 python -X importtime 运行一个脚本，按自身耗时列出最慢的模块和顶层包，
+用于定位是哪个导入超出了预算（使用当前的本地缓存目录）。
+
+用法:
+    python3 bench_startup.py --fixtures /data/bench-fixtures --date 2024-01-15 \\
+        [--runs 9] [--budget get_indices=300] [--stat p95] [--zygote] [--output result.json]
+    python3 bench_startup.py [--top 20] --importtime get_indices.py 000001.SH,399001.SZ 2024-01-15
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import subprocess
+
+from bench_entry_points import INDEX_CODES, SCRIPT_DIR, SERVER_DIR, summarize
+
+# 场景名 -> (脚本参数构造函数, 默认预算毫秒数)
+STARTUP_CASES = {
+    "get_indices": (lambda date: ["get_indices.py", INDEX_CODES, date], 300),
+}
+
+def _run(command, env):
+    """运行一次脚本，返回 (耗时毫秒, 退出码, stderr)"""
+    started = time.perf_counter()
+    proc = subprocess.run(command, cwd=SCRIPT_DIR, env=env, stdout=subprocess.DEVNULL,
+                          stderr=subprocess.PIPE, text=True)
+    return (time.perf_counter() - started) * 1000, proc.returncode, proc.stderr
+
+def _timings(stderr):
+    """从 SCRIPT_TIMINGS=stderr 的输出中取 (上游调用数, 各类别耗时)"""
+    upstream_calls = 0
+    summary = {}
+    for line in stderr.splitlines():
+        if not line.startswith('{"span"'):
+            continue
+        try:
+            item = json.loads(line)
+        except ValueError:
+            continue
+        if item["span"] == "total":
+            summary = item.get("summary", {})
+        elif item["span"].startswith("upstream."):
+            upstream_calls += 1
+    return upstream_calls, summary
+
+class _ZygoteRunner:
+    """在测量用的缓存目录上启动 zygote，经由它运行脚本"""
+
+    def __init__(self, env):
+        self.socket_path = os.path.join(env["AKSHARE_CACHE_DIR"], "zygote.sock")
+        self.proc = subprocess.Popen([sys.executable, "zygote.py", "--socket", self.socket_path, "--watch-stdin"],
+                                     cwd=SCRIPT_DIR, env=env, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                     text=True)
+        line = self.proc.stdout.readline()
+        if not line:
+            raise RuntimeError(f"zygote 启动失败，退出码 {self.proc.wait()}")
+
+    def run(self, argv):
+        """返回 (耗时毫秒, 退出码, stderr)"""
+        from zygote import call
+
+        started = time.perf_counter()
+        response = call(argv[0], argv[1:], socket_path=self.socket_path)
+        elapsed = (time.perf_counter() - started) * 1000
+        if "error" in response:
+            return elapsed, -1, response["error"]["message"]
+        return elapsed, response["code"], response["stderr"]
+
+    def close(self):
+        self.proc.stdin.close()
+        self.proc.wait()
+
+def run_case(name, args, budget):
+    """在空的本地缓存目录中测量一个场景，结束后删除该目录"""
+    with tempfile.TemporaryDirectory(prefix=f"startup-{name}-") as cache_dir:
+        return _measure(name, args, budget, cache_dir)
+
+def _measure(name, args, budget, cache_dir):
+    """填充本地缓存后测量一个场景"""
+    make_argv, _ = STARTUP_CASES[name]
+    command = [sys.executable] + make_argv(args.date)
+    env = dict(os.environ)
+    env["AKSHARE_CACHE_DIR"] = cache_dir
+    env.pop("SCRIPT_PROFILE_DIR", None)
+
+    warm_env = dict(env, UPSTREAM_MODE="replay", UPSTREAM_RECORD_DIR=os.path.abspath(args.fixtures))
+    _, code, stderr = _run(command, warm_env)
+    if code != 0:
+        return {"case": name, "error": f"填充本地缓存失败，退出码 {code}: {stderr[-500:]}"}
+
+    env.pop("UPSTREAM_MODE", None)
+    env["SCRIPT_TIMINGS"] = "stderr"
+    zygote = _ZygoteRunner(env) if args.zygote else None
+    latencies = []
+    imports = []
+    upstream_calls = 0
+    try:
+        for _ in range(args.runs):
+            if zygote is not None:
+                elapsed, code, stderr = zygote.run(make_argv(args.date))
+            else:
+                elapsed, code, stderr = _run(command, env)
+            if code != 0:
+                return {"case": name, "error": f"退出码 {code}: {stderr[-500:]}"}
+            calls, summary = _timings(stderr)
+            upstream_calls += calls
+            latencies.append(elapsed)
+            if "import" in summary:
+                imports.append(summary["import"])
+    finally:
+        if zygote is not None:
+            zygote.close()
+
+    report = {
+        "case": name,
+        "command": " ".join(make_argv(args.date)),
+        "mode": "zygote" if args.zygote else "spawn",
+        "endToEnd": summarize(latencies),
+        "importMs": summarize(imports),
+        "upstreamCalls": upstream_calls,
+        "budgetMs": budget,
+    }
+    measured = report["endToEnd"][args.stat]
+    report["ok"] = measured <= budget and upstream_calls == 0
+    return report
+
+def parse_importtime(stderr):
+    """
+    解析 -X importtime 的输出
+
+    Returns:
+        [(模块名, 自身耗时微秒, 累计耗时微秒)]
+    """
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue
+        modules.append((fields[2].strip(), int(fields[0]), int(fields[1])))
+    return modules
+
+def importtime_report(argv, top, as_json):
+    """用 -X importtime 运行脚本并输出最慢的模块和顶层包"""
+    command = [sys.executable, "-X", "importtime"] + argv
+    started = time.perf_counter()
+    proc = subprocess.run(command, cwd=SCRIPT_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    elapsed = (time.perf_counter() - started) * 1000
+
+    modules = parse_importtime(proc.stderr)
+    packages = {}
+    for module, self_us, _ in modules:
+        package = module.split(".", 1)[0]
+        packages[package] = packages.get(package, 0) + self_us
+
+    report = {
+        "command": " ".join(argv),
+        "exitCode": proc.returncode,
+        "elapsedMs": round(elapsed, 2),
+        "importMs": round(sum(item[1] for item in modules) / 1000, 2),
+        "modules": len(modules),
+        "packages": [{"package": name, "ms": round(us / 1000, 2)}
+                     for name, us in sorted(packages.items(), key=lambda item: -item[1])[:top]],
+        "slowest": [{"module": name, "selfMs": round(self_us / 1000, 2), "cumulativeMs": round(cum_us / 1000, 2)}
+                    for name, self_us, cum_us in sorted(modules, key=lambda item: -item[1])[:top]],
+    }
+    if as_json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+        return report
+
+    print(f"{report['command']}: 退出码 {proc.returncode}，总耗时 {report['elapsedMs']:.0f}ms，"
+          f"导入 {report['modules']} 个模块共 {report['importMs']:.0f}ms")
+    print(f"\n{'顶层包':40s} {'ms':>8s}")
+    for item in report["packages"]:
+        print(f"{item['package']:40s} {item['ms']:8.1f}")
+    print(f"\n{'模块':56s} {'self':>8s} {'cumulative':>11s}")
+    for item in report["slowest"]:
+        print(f"{item['module']:56s} {item['selfMs']:8.1f} {item['cumulativeMs']:11.1f}")
+    return report
+
+def _parse_budgets(values, parser):
+    budgets = {name: budget for name, (_, budget) in STARTUP_CASES.items()}
+    for value in values or []:
+        name, _, ms = value.partition("=")
+        if name not in STARTUP_CASES or not ms:
+            parser.error(f"预算格式为 场景=毫秒，可选场景: {', '.join(STARTUP_CASES)}")
+        budgets[name] = float(ms)
+    return budgets
+
+def main():
+    parser = argparse.ArgumentParser(description="一次性脚本启动耗时测试")
+    parser.add_argument("--fixtures", default=os.path.join(SERVER_DIR, ".cache", "bench-fixtures"),
+                        help="录制的上游数据目录（见 bench_entry_points.py --record）")
+    parser.add_argument("--date", default="2024-01-15", help="测试日期 YYYY-MM-DD")
+    parser.add_argument("--runs", type=int, default=9, help="测量次数")
+    parser.add_argument("--only", default=None, help="只测试这些场景，逗号分隔")
+    parser.add_argument("--budget", action="append", help="预算，如 get_indices=300（毫秒），可重复")
+    parser.add_argument("--stat", default="p50", choices=["p50", "p95", "p99", "max"], help="与预算比较的统计值")
+    parser.add_argument("--zygote", action="store_true", help="经由 zygote.py fork 执行（测量每个请求的耗时）")
+    parser.add_argument("--output", default=None, help="结果 JSON 文件，默认输出到标准输出")
+    parser.add_argument("--top", type=int, default=25, help="--importtime 列出的模块数")
+    parser.add_argument("--json", action="store_true", help="--importtime 的结果输出为 JSON")
+    parser.add_argument("--importtime", nargs=argparse.REMAINDER, default=None,
+                        help="用 -X importtime 运行脚本及其参数（放在最后）")
+    args = parser.parse_args()
+
+    if args.importtime is not None:
+        if not args.importtime:
+            parser.error("--importtime 需要脚本名，如 --importtime get_indices.py 000001.SH 2024-01-15")
+        report = importtime_report(args.importtime, args.top, args.json)
+        sys.exit(report["exitCode"])
+
+    budgets = _parse_budgets(args.budget, parser)
+    names = args.only.split(",") if args.only else list(STARTUP_CASES)
+    unknown = [name for name in names if name not in STARTUP_CASES]
+    if unknown:
+        parser.error(f"未知场景: {', '.join(unknown)}（可选: {', '.join(STARTUP_CASES)}）")
+
+    results = {}
+    for name in names:
+        report = run_case(name, args, budgets[name])
+        results[name] = report
+        if "error" in report:
+            print(f"[startup] {name} 失败: {report['error']}", file=sys.stderr)
+            continue
+        measured = report["endToEnd"][args.stat]
+        status = "OK" if report["ok"] else "超出预算"
+        if report["upstreamCalls"]:
+            status = f"有 {report['upstreamCalls']} 次上游调用，未完全由本地缓存应答"
+        print(f"[startup] {name} {args.stat}={measured:.0f}ms max={report['endToEnd']['max']:.0f}ms "
+              f"import p50={report['importMs'].get('p50', 0):.0f}ms 预算 {report['budgetMs']:.0f}ms: {status}",
+              file=sys.stderr)
+
+    output = {
+        "meta": {
+            "date": args.date,
+            "runs": args.runs,
+            "stat": args.stat,
+            "mode": "zygote" if args.zygote else "spawn",
+            "lazyImport": os.environ.get("AKSHARE_LAZY_IMPORT", "true"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+    data = json.dumps(output, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(data + "\n")
+    else:
+        print(data)
+
+    if not all(report.get("ok") for report in results.values()):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
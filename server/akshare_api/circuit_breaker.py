@@ -0,0 +1,240 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+按 akshare 函数的熔断器
+
+某个接口（如 stock_zh_a_spot_em）不可用时，每个请求都要等完整的失败过程（重试、超时）才能回退。
+熔断器按函数名统计连续失败:
+
+- closed: 正常调用；连续 FAILURE_THRESHOLD 次上游失败后打开
+- open: 直接抛出 CircuitOpenError，调用方立即走回退路径（缓存的旧值、估算值等）；
+  RESET_TIMEOUT 秒后进入半开
+- half_open: 只放行一个探测调用，成功则关闭，失败则重新打开
+
+只有上游故障（连接失败、超时、5xx 等可重试的错误）计入失败，参数错误等不计入；
+调用方期限到达不算上游故障。
+
+状态变化写入 .cache/upstream/breakers.json，一次性脚本启动时沿用其他进程打开的熔断器，
+diagnose.py 和 Node 端可以查询。
+
+用法:
+    python3 circuit_breaker.py        # 输出最近记录的熔断器状态 {函数名: 状态}
+"""
+
+import os
+import sys
+import json
+import time
+import threading
+
+from local_cache import cache_path, read_json, write_json
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from pycommon import resilience
+
+# 设置 AKSHARE_BREAKER=false 关闭熔断
+ENABLED = os.environ.get("AKSHARE_BREAKER", "true") != "false"
+
+# 连续失败多少次后打开
+FAILURE_THRESHOLD = int(os.environ.get("AKSHARE_BREAKER_FAILURES", "5"))
+
+# 打开多少秒后进入半开
+RESET_TIMEOUT = float(os.environ.get("AKSHARE_BREAKER_RESET", "30"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class CircuitOpenError(Exception):
+    """熔断器打开，调用未发出"""
+
+    def __init__(self, name, retry_in):
+        super().__init__(f"{name} 熔断中，{max(0, retry_in):.0f} 秒后重试")
+        self.name = name
+        self.retry_in = retry_in
+
+def is_upstream_failure(error):
+    """是否计为上游故障"""
+    return resilience.is_retryable(error)
+
+class CircuitBreaker:
+    """
+    单个函数的熔断器
+
+    Args:
+        name: 函数名
+        failure_threshold: 连续失败多少次后打开
+        reset_timeout: 打开多少秒后进入半开
+        on_change: 状态变化时的回调 on_change(breaker)
+    """
+
+    def __init__(self, name, failure_threshold=FAILURE_THRESHOLD, reset_timeout=RESET_TIMEOUT, on_change=None):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.on_change = on_change
+        self.lock = threading.Lock()
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self.last_error = None
+        self.stats = {"calls": 0, "failures": 0, "rejected": 0, "opens": 0}
+
+    def _transition(self, state):
+        """切换状态（调用方持有锁），返回是否变化"""
+        if self.state == state:
+            return False
+        self.state = state
+        if state == OPEN:
+            self.opened_at = time.time()
+            self.stats["opens"] += 1
+        elif state == CLOSED:
+            self.opened_at = None
+            self.failures = 0
+        return True
+
+    def before_call(self):
+        """
+        调用前检查
+
+        Raises:
+            CircuitOpenError: 熔断器打开，或半开状态下已有探测调用
+        """
+        with self.lock:
+            self.stats["calls"] += 1
+            if self.state == OPEN:
+                retry_in = self.opened_at + self.reset_timeout - time.time()
+                if retry_in > 0:
+                    self.stats["rejected"] += 1
+                    raise CircuitOpenError(self.name, retry_in)
+                self._transition(HALF_OPEN)
+            if self.state == HALF_OPEN:
+                if self.probing:
+                    self.stats["rejected"] += 1
+                    raise CircuitOpenError(self.name, 0)
+                self.probing = True
+
+    def record(self, error=None):
+        """记录调用结果，error 为 None 表示成功"""
+        changed = False
+        with self.lock:
+            was_probe = self.state == HALF_OPEN and self.probing
+            self.probing = False
+            if error is not None and isinstance(error, resilience.DeadlineExceeded):
+                # 调用方的期限到了，不能说明上游的状态
+                return
+            if error is not None and is_upstream_failure(error):
+                self.stats["failures"] += 1
+                self.failures += 1
+                self.last_error = str(error)[:200]
+                if was_probe or self.failures >= self.failure_threshold:
+                    changed = self._transition(OPEN)
+                    if not changed:
+                        # 已经打开（并发调用先后失败），重新计时
+                        self.opened_at = time.time()
+            else:
+                self.failures = 0
+                changed = self._transition(CLOSED)
+        if changed and self.on_change is not None:
+            self.on_change(self)
+
+    def call(self, func):
+        """在熔断器保护下执行 func"""
+        self.before_call()
+        try:
+            result = func()
+        except BaseException as e:
+            self.record(e)
+            raise
+        self.record()
+        return result
+
+    def get_state(self):
+        with self.lock:
+            state = dict(self.stats)
+            state["state"] = self.state
+            state["consecutiveFailures"] = self.failures
+            state["openedAt"] = self.opened_at
+            state["lastError"] = self.last_error
+            if self.state == OPEN:
+                state["retryIn"] = round(max(0.0, self.opened_at + self.reset_timeout - time.time()), 1)
+        return state
+
+class BreakerRegistry:
+    """
+    按函数名分配熔断器，状态变化时写入状态文件
+
+    Args:
+        state_path: 状态文件路径，None 表示不读写文件
+    """
+
+    def __init__(self, state_path=None):
+        self.state_path = state_path
+        self.lock = threading.Lock()
+        self.write_lock = threading.Lock()
+        self.breakers = {}
+        self._restore()
+
+    def _restore(self):
+        """沿用其他进程打开、仍未到半开时间的熔断器"""
+        if self.state_path is None:
+            return
+        snapshot = read_json(self.state_path, {}) or {}
+        now = time.time()
+        for name, saved in snapshot.get("breakers", {}).items():
+            opened_at = saved.get("openedAt")
+            if saved.get("state") == OPEN and opened_at and now - opened_at < RESET_TIMEOUT:
+                breaker = self._create(name)
+                breaker.state = OPEN
+                breaker.opened_at = opened_at
+                breaker.failures = saved.get("consecutiveFailures", 0)
+                breaker.last_error = saved.get("lastError")
+
+    def _create(self, name):
+        breaker = CircuitBreaker(name, on_change=self._save)
+        self.breakers[name] = breaker
+        return breaker
+
+    def get(self, name):
+        with self.lock:
+            breaker = self.breakers.get(name)
+            if breaker is None:
+                breaker = self._create(name)
+            return breaker
+
+    def call(self, name, func):
+        return self.get(name).call(func)
+
+    def get_states(self):
+        """{函数名: 状态}"""
+        with self.lock:
+            breakers = list(self.breakers.items())
+        return {name: breaker.get_state() for name, breaker in breakers}
+
+    def _save(self, _breaker=None):
+        if self.state_path is None:
+            return
+        with self.write_lock:
+            try:
+                write_json(self.state_path, {"updatedAt": time.time(), "pid": os.getpid(),
+                                             "breakers": self.get_states()})
+            except OSError as e:
+                print(f"Warning: 写入熔断器状态失败: {e}", file=sys.stderr)
+
+def default_state_path():
+    """状态文件 .cache/upstream/breakers.json"""
+    return cache_path("upstream", "breakers.json")
+
+registry = BreakerRegistry(default_state_path()) if ENABLED else None
+
+def get_states():
+    """本进程内各熔断器的状态，未启用时为空"""
+    return registry.get_states() if registry is not None else {}
+
+def load_snapshot():
+    """最近一次写入状态文件的熔断器状态（可能来自其他进程）"""
+    return read_json(default_state_path(), {}) or {}
+
+if __name__ == "__main__":
+    print(json.dumps(load_snapshot().get("breakers", {}), ensure_ascii=False))
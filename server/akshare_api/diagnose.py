@@ -31,7 +31,7 @@ def main():
     print("=" * 60)
     
     # 导入测试
-    print("\n[1/6] 导入模块测试...")
+    print("\n[1/7] 导入模块测试...")
     try:
         import akshare as ak
         import pandas as pd
@@ -44,7 +44,7 @@ def main():
         return
     
     # 网络测试
-    print("\n[2/6] 网络连接测试...")
+    print("\n[2/7] 网络连接测试...")
     try:
         import requests
         response = requests.get("https://www.baidu.com", timeout=5)
@@ -53,7 +53,7 @@ def main():
         print(f"  ⚠️  网络可能有问题: {str(e)[:50]}")
     
     # 指数数据测试
-    print("\n[3/6] 指数数据接口...")
+    print("\n[3/7] 指数数据接口...")
     try:
         df = ak.stock_zh_index_daily(symbol="sh000001")
         if not df.empty:
@@ -65,7 +65,7 @@ def main():
         print(f"  ❌ 失败: {str(e)[:100]}")
     
     # 市场概况测试
-    print("\n[4/6] 市场概况接口...")
+    print("\n[4/7] 市场概况接口...")
     try:
         df = ak.stock_zh_a_spot_em()
         if not df.empty:
@@ -84,7 +84,7 @@ def main():
             print(f"  ❌ 备用接口也失败: {str(e2)[:100]}")
     
     # 板块数据测试
-    print("\n[5/6] 板块数据接口...")
+    print("\n[5/7] 板块数据接口...")
     try:
         df = ak.stock_board_industry_name_em()
         if not df.empty:
@@ -95,7 +95,7 @@ def main():
         print(f"  ❌ 失败: {str(e)[:100]}")
     
     # 估值数据测试
-    print("\n[6/6] 估值数据接口...")
+    print("\n[6/7] 估值数据接口...")
     try:
         df = ak.index_value_hist_funddb(symbol="沪深300")
         if not df.empty:
@@ -105,13 +105,29 @@ def main():
     except Exception as e:
         print(f"  ❌ 失败: {str(e)[:100]}")
     
+    # 熔断器状态（工作进程等其他进程最近记录的）
+    print("\n[7/7] 上游熔断器状态...")
+    try:
+        from circuit_breaker import load_snapshot
+        breakers = load_snapshot().get("breakers", {})
+        if not breakers:
+            print("  ✅ 没有熔断记录")
+        for name, state in breakers.items():
+            mark = "✅" if state.get("state") == "closed" else "❌"
+            print(f"  {mark} {name}: {state.get('state')}（连续失败 {state.get('consecutiveFailures', 0)} 次）")
+            if state.get("lastError"):
+                print(f"     最近错误: {state['lastError'][:100]}")
+    except Exception as e:
+        print(f"  ⚠️  读取熔断器状态失败: {str(e)[:100]}")
+    
     print("\n" + "=" * 60)
     print("诊断完成")
     print("=" * 60)
     print("\n建议:")
     print("  1. 如果所有接口都失败 → 检查网络连接")
     print("  2. 如果部分接口失败 → 数据源暂时不可用，稍后重试")
-    print("  3. 如果 urllib3 版本不是 1.x → 运行: pip3 install 'urllib3<2.0'")
+    print("  3. 如果有熔断器处于 open → 该接口连续失败，恢复后会自动半开探测并关闭")
+    print("  4. 如果 urllib3 版本不是 1.x → 运行: pip3 install 'urllib3<2.0'")
     print("\n详细帮助: 查看 TROUBLESHOOTING.md\n")
 
 if __name__ == "__main__":
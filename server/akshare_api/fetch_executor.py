@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+有界并发的上游抓取执行器
+
+- 并发上限：同时进行的上游调用数不超过 max_concurrency
+- 单次期限：超过 call_timeout 的调用被放弃，不再等待
+- 总期限：超过 total_timeout 后，进行中的调用被放弃，未开始的调用直接跳过
+
+调用运行在守护线程中，被放弃的调用不会阻止一次性脚本退出；
+不依赖 SIGALRM，可在任意线程（如常驻工作进程的线程池）中使用。
+
+调用在调用方的上下文中执行，并带上单次/总期限中更早的一个
+（pycommon.resilience.deadline），上游重试不会超出这个期限。
+"""
+
+import os
+import sys
+import time
+import threading
+from concurrent.futures import Future, wait, FIRST_COMPLETED
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from pycommon import resilience
+
+class FetchResult:
+    """
+    单个抓取任务的结果
+
+    Attributes:
+        key: 任务标识
+        status: ok / error / timeout / skipped
+        value: 调用返回值（仅 status 为 ok 时有效）
+        error: 错误信息
+        exception: 调用抛出的异常（仅 status 为 error 时有）
+        elapsed: 墙钟耗时（秒），未开始的任务为 0
+    """
+
+    __slots__ = ("key", "status", "value", "error", "exception", "elapsed")
+
+    def __init__(self, key, status, value=None, error=None, elapsed=0.0, exception=None):
+        self.key = key
+        self.status = status
+        self.value = value
+        self.error = error
+        self.exception = exception
+        self.elapsed = elapsed
+
+    @property
+    def ok(self):
+        return self.status == "ok"
+
+    @property
+    def elapsed_ms(self):
+        return int(round(self.elapsed * 1000))
+
+    def to_dict(self):
+        """输出用的摘要: status、fetchMs，失败时另含 error"""
+        summary = {"status": self.status, "fetchMs": self.elapsed_ms}
+        if self.error is not None:
+            summary["error"] = self.error
+        return summary
+
+def _start_call(func, timeout=None):
+    """
+    在守护线程中执行 func，返回对应的 Future
+
+    Args:
+        timeout: func 内部可用的期限（秒），None 表示只沿用调用方的期限
+    """
+    future = Future()
+
+    def run():
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            with resilience.deadline(timeout):
+                future.set_result(func())
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=resilience.run_in_context(run), daemon=True).start()
+    return future
+
+def run_fetches(calls, max_concurrency=4, call_timeout=None, total_timeout=None):
+    """
+    并发执行一组上游调用
+
+    Args:
+        calls: 有序字典 {key: 无参可调用对象}
+        max_concurrency: 并发上限
+        call_timeout: 单次调用期限（秒），None 表示不限
+        total_timeout: 整体期限（秒），None 表示不限
+
+    Returns:
+        {key: FetchResult}，顺序与 calls 一致
+    """
+    started_at = time.monotonic()
+    total_deadline = started_at + total_timeout if total_timeout is not None else None
+    max_concurrency = max(1, int(max_concurrency))
+
+    pending = list(calls.items())
+    pending.reverse()
+    running = {}
+    results = {}
+
+    while pending or running:
+        now = time.monotonic()
+
+        # 总期限已到：放弃进行中的调用，跳过未开始的调用
+        if total_deadline is not None and now >= total_deadline:
+            for future, (key, call_started) in running.items():
+                results[key] = FetchResult(key, "timeout", error="超过总期限", elapsed=now - call_started)
+            for key, _ in pending:
+                results[key] = FetchResult(key, "skipped", error="超过总期限，未开始")
+            break
+
+        # 填满并发槽位
+        while pending and len(running) < max_concurrency:
+            key, func = pending.pop()
+            call_started = time.monotonic()
+            limits = []
+            if call_timeout is not None:
+                limits.append(call_timeout)
+            if total_deadline is not None:
+                limits.append(total_deadline - call_started)
+            running[_start_call(func, min(limits) if limits else None)] = (key, call_started)
+
+        # 等到最近的一个期限或有调用完成
+        wake_at = []
+        if call_timeout is not None:
+            wake_at.extend(call_started + call_timeout for _, call_started in running.values())
+        if total_deadline is not None:
+            wake_at.append(total_deadline)
+        timeout = max(0.0, min(wake_at) - time.monotonic()) if wake_at else None
+
+        done, _ = wait(list(running), timeout=timeout, return_when=FIRST_COMPLETED)
+
+        now = time.monotonic()
+        for future in done:
+            key, call_started = running.pop(future)
+            error = future.exception()
+            if error is None:
+                results[key] = FetchResult(key, "ok", value=future.result(), elapsed=now - call_started)
+            else:
+                status = "timeout" if isinstance(error, resilience.DeadlineExceeded) else "error"
+                results[key] = FetchResult(key, status, error=str(error), elapsed=now - call_started,
+                                           exception=error)
+
+        # 放弃超过单次期限的调用，释放槽位
+        if call_timeout is not None:
+            for future, (key, call_started) in list(running.items()):
+                if now - call_started >= call_timeout:
+                    running.pop(future)
+                    results[key] = FetchResult(key, "timeout", error=f"超过单次期限 {call_timeout}s",
+                                               elapsed=now - call_started)
+
+    return {key: results[key] for key in calls}
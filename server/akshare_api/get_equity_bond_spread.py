@@ -22,211 +22,539 @@
 """
 
 import sys
+import os
 import json
-import akshare as ak
+import time
+import argparse
+import threading
+from upstream import ak
+import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta
+from collections import OrderedDict
+from datetime import date
 
-def calculate_percentile(value, values_list):
+from history_store import get_index_daily
+from local_cache import cache_path, read_json, write_json
+from trade_calendar import resolve_trading_day, trading_days_between
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from pycommon.percentile import PercentileIndex, expanding_percentiles, prefix_percentiles, trailing_percentiles
+from pycommon import profiling, timings
+
+# 历史数据起始日期
+START_DATE = "2005-01-01"
+
+# 缺失时使用的默认值
+DEFAULT_PE = 15.0
+DEFAULT_PB = 1.5
+DEFAULT_BOND_YIELD = 3.0
+
+# 输出频率 -> 采样周期（None 表示每个交易日）
+FREQUENCIES = {"daily": None, "weekly": "W", "monthly": "M"}
+
+# 估值数据可能延迟发布，目标日期早于这么多天的结果才写入磁盘缓存
+SETTLED_DAYS = 7
+
+# 近期日期的结果在进程内缓存的秒数
+RECENT_TTL = int(os.environ.get("AKSHARE_SPREAD_CACHE_TTL", "300"))
+
+# 进程内最多缓存的目标日期数
+VIEWS_CACHE_SIZE = 32
+
+# chartData 中滚动分位数的窗口年数
+TRAILING_YEARS = (5, 10)
+
+# 磁盘上最多保留的已稳定日期数，超过时按最近使用时间（mtime）淘汰
+SETTLED_CACHE_SIZE = int(os.environ.get("AKSHARE_SPREAD_DISK_CACHE_SIZE", "64"))
+
+# 磁盘缓存格式版本，输出结构变化时递增
+VIEWS_VERSION = 2
+
+def load_inputs(end_date, start_date=START_DATE, backfill=True):
     """
-    计算分位数
+    获取计算股债利差所需的原始数据
     
     Args:
-        value: 当前值
-        values_list: 历史值列表
+        end_date: 结束日期，格式: YYYY-MM-DD
+        start_date: 起始日期，格式: YYYY-MM-DD
+        backfill: 是否用 PE/PB 各自的第一个值向前填充更早的日期
+    
+    Returns:
+        (index_df, valuation_df, bond_df, bond_col)
+    """
+    # 获取沪深300指数历史数据（作为市场代表）
+    index_df = get_index_daily("sh000300", end_date=end_date)
+    index_df['date'] = pd.to_datetime(index_df['date'])
+    
+    # 筛选日期范围
+    index_df = index_df[(index_df['date'] >= start_date) & (index_df['date'] <= end_date)]
+    
+    # 获取市场估值数据 - 使用沪深300的PE和PB数据
+    try:
+        # 获取沪深300的PE数据（来自中证指数官网）
+        pe_df = ak.stock_zh_index_value_csindex(symbol="000300")
+        pe_df['日期'] = pd.to_datetime(pe_df['日期'])
+        pe_df = pe_df[(pe_df['日期'] >= start_date) & (pe_df['日期'] <= end_date)]
+        # 使用市盈率1（静态PE）
+        pe_df = pe_df[['日期', '市盈率1']].rename(columns={'市盈率1': 'PE'})
+        
+        # 获取沪深300的PB数据（来自理杏仁）
+        pb_df = ak.stock_index_pb_lg()
+        pb_df['日期'] = pd.to_datetime(pb_df['日期'])
+        pb_df = pb_df[(pb_df['日期'] >= start_date) & (pb_df['日期'] <= end_date)]
+        # 使用市净率（加权平均）
+        pb_df = pb_df[['日期', '市净率']].rename(columns={'市净率': 'PB'})
+        
+        # 合并PE和PB数据
+        valuation_df = pd.merge(pe_df, pb_df, on='日期', how='outer')
+        valuation_df = valuation_df.sort_values('日期')
+        # 填充缺失值
+        valuation_df = valuation_df.ffill()
+        if backfill:
+            valuation_df = valuation_df.bfill()
+    except Exception as e:
+        # 如果获取失败，使用默认估值
+        print(f"Warning: 获取估值数据失败，使用默认值: {e}", file=sys.stderr)
+        valuation_df = pd.DataFrame({
+            '日期': index_df['date'],
+            'PE': [DEFAULT_PE] * len(index_df),
+            'PB': [DEFAULT_PB] * len(index_df)
+        })
+    
+    # 获取10年期国债收益率数据
+    bond_col = '中国国债收益率10年'
+    try:
+        bond_df = ak.bond_zh_us_rate()
+        bond_df['日期'] = pd.to_datetime(bond_df['日期'])
+        bond_df = bond_df[(bond_df['日期'] >= start_date) & (bond_df['日期'] <= end_date)]
+        # 使用中国10年期国债收益率
+        bond_col = '中国国债收益率10年' if '中国国债收益率10年' in bond_df.columns else '中国10年期国债收益率'
+    except Exception:
+        # 如果获取失败，使用固定收益率
+        bond_df = pd.DataFrame({
+            '日期': index_df['date'],
+            bond_col: [DEFAULT_BOND_YIELD] * len(index_df)
+        })
+    
+    return index_df, valuation_df, bond_df, bond_col
+
+def align_daily(index_df, valuation_df, bond_df, bond_col):
+    """
+    以指数交易日为日历，一次 merge_asof 对齐估值和国债收益率
+    
+    估值和国债收益率先按日期合并为一张因子表并向前填充，
+    每个交易日取当天（含）之前最后一个可用值。
     
     Returns:
-        分位数百分比
+        以交易日为索引的 DataFrame，列: close、PE、PB、国债收益率
     """
-    if not values_list:
-        return 0
+    calendar = index_df[['date', 'close']].dropna().sort_values('date')
+    calendar['date'] = calendar['date'].astype('datetime64[ns]')
     
-    sorted_values = sorted(values_list)
-    rank = sum(1 for v in sorted_values if v <= value)
-    percentile = (rank / len(sorted_values)) * 100
+    bond_cols = ['日期', bond_col] if bond_col in bond_df.columns else ['日期']
+    factors = pd.merge(valuation_df, bond_df[bond_cols].dropna(), on='日期', how='outer')
+    factors = factors.rename(columns={'日期': 'date'}).sort_values('date').ffill()
+    factors['date'] = factors['date'].astype('datetime64[ns]')
     
-    return round(percentile, 2)
+    aligned = pd.merge_asof(calendar, factors, on='date')
+    aligned = aligned.fillna({'PE': DEFAULT_PE, 'PB': DEFAULT_PB, bond_col: DEFAULT_BOND_YIELD})
+    return aligned.set_index('date')
 
-def get_equity_bond_spread(target_date):
+def sample_series(daily, freq):
     """
-    获取股债利差数据
+    按输出频率采样：每个周期取最后一个交易日
     
     Args:
+        daily: align_daily 的结果
+        freq: daily / weekly / monthly
+    """
+    if freq not in FREQUENCIES:
+        raise ValueError(f"不支持的频率: {freq}，可选: {', '.join(FREQUENCIES)}")
+    period = FREQUENCIES[freq]
+    if period is None:
+        return daily
+    periods = daily.index.to_period(period)
+    return daily[~periods.duplicated(keep='last')]
+
+def _column(merged, name, default):
+    """取出一列为 float64 数组，列不存在时用默认值填满"""
+    if name in merged.columns:
+        return merged[name].to_numpy(dtype='float64')
+    return np.full(len(merged), default)
+
+def compute_spread_series(merged, bond_col, freq='monthly'):
+    """
+    整列计算股债利差
+    
+    盈利收益率 = 1/PE × 100（PE <= 0 时为 0），股债利差 = 盈利收益率 - 国债收益率
+    
+    Args:
+        merged: sample_series 的结果
+        bond_col: 国债收益率列名
+        freq: 采样频率，月度的 date 为月初（YYYY-MM-01），其余为交易日
+    
+    Returns:
+        DataFrame，列: date、year、month、yearStart、pe、pb、bondYield、windA、spread
+    """
+    pe = _column(merged, 'PE', DEFAULT_PE)
+    pb = _column(merged, 'PB', DEFAULT_PB)
+    bond_yield = _column(merged, bond_col, DEFAULT_BOND_YIELD)
+    wind_a = _column(merged, 'close', 3000)
+    
+    # 计算盈利收益率 (Earnings Yield = E/P = 1/PE × 100)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        earnings_yield = np.where(pe > 0, 1 / pe * 100, 0.0)
+    
+    # 股债利差 = 盈利收益率 - 国债收益率
+    spread = earnings_yield - bond_yield
+    
+    dates = merged.index
+    # 转 datetime64[D] 再转字符串，比 strftime 快一个数量级
+    if freq == 'monthly':
+        days = dates.values.astype('datetime64[M]').astype('datetime64[D]')
+        # 月线只在 1 月标注年份
+        year_start = dates.month == 1
+    else:
+        days = dates.values.astype('datetime64[D]')
+        # 日线、周线在每年第一个点标注年份
+        years = dates.year.to_numpy()
+        year_start = np.r_[True, years[1:] != years[:-1]] if len(years) else np.zeros(0, dtype=bool)
+    return pd.DataFrame({
+        'date': days.astype(str),
+        'year': dates.year,
+        'month': dates.month,
+        'yearStart': year_start,
+        'pe': pe,
+        'pb': pb,
+        'bondYield': bond_yield,
+        'windA': wind_a,
+        'spread': spread,
+    })
+
+def spread_percentile_series(series):
+    """
+    每个点的股债利差历史分位数，一次计算整条序列
+    
+    每个点只使用它之前（含）的数据，没有未来数据。
+    
+    Returns:
+        {"percentile": 扩展窗口, "percentile5y": 近 5 年, "percentile10y": 近 10 年}
+    """
+    spreads = series['spread'].to_numpy()
+    dates = series['date'].to_numpy().astype('datetime64[D]')
+    result = {"percentile": expanding_percentiles(spreads)}
+    for years in TRAILING_YEARS:
+        result[f"percentile{years}y"] = trailing_percentiles(spreads, dates=dates, years=years)
+    return result
+
+def chart_records(series):
+    """
+    把股债利差序列转换为 chartData 列表
+    
+    Args:
+        series: compute_spread_series 的结果
+    """
+    percentiles = spread_percentile_series(series)
+    names = list(percentiles)
+    columns = [np.round(values, 2).tolist() for values in percentiles.values()]
+    return [
+        {
+            "date": date_str,
+            "year": year,
+            "displayYear": year if year_start else "",
+            "spread": round(spread, 2),
+            "windA": round(wind_a, 0),
+            **dict(zip(names, pcts))
+        }
+        for date_str, year, year_start, spread, wind_a, *pcts in zip(
+            series['date'].tolist(),
+            series['year'].tolist(),
+            series['yearStart'].tolist(),
+            series['spread'].tolist(),
+            series['windA'].tolist(),
+            *columns,
+        )
+    ]
+
+def build_metrics(series, target_date):
+    """
+    计算目标日期的股债利差、PE、PB 及其历史分位
+    
+    Args:
+        series: compute_spread_series 的结果
         target_date: 目标日期，格式: YYYY-MM-DD
+    """
+    if not len(series):
+        # 默认值
+        return {
+            "spreadPercentile": 50,
+            "spread": "2.0",
+            "pb": 1.5,
+            "pbPercentile": 50,
+            "pe": 15,
+            "pePercentile": 50
+        }
+    
+    # 查找目标日期所在月份，找不到时使用最新数据
+    target_date_str = pd.to_datetime(target_date).strftime('%Y-%m-01')
+    matches = np.flatnonzero(series['date'].to_numpy() == target_date_str)
+    target_idx = int(matches[0]) if len(matches) else len(series) - 1
+    
+    spreads = series['spread'].to_numpy()
+    pbs = series['pb'].to_numpy()
+    pes = series['pe'].to_numpy()
+    
+    spread = round(float(spreads[target_idx]), 2)
+    pb = float(pbs[target_idx])
+    pe = float(pes[target_idx])
+    
+    return {
+        "spreadPercentile": PercentileIndex(spreads).percentile(spread),
+        "spread": str(spread),
+        "pb": round(pb, 2),
+        "pbPercentile": PercentileIndex(pbs).percentile(pb),
+        "pe": round(pe, 2),
+        "pePercentile": PercentileIndex(pes).percentile(pe)
+    }
+
+def build_views(target_date):
+    """
+    一次计算目标日期的 metrics 和三种频率的 chartData
     
     Returns:
-        JSON格式的股债利差数据
+        {"metrics": {...}, "chartData": {"daily": [...], "weekly": [...], "monthly": [...]}}
     """
+    index_df, valuation_df, bond_df, bond_col = load_inputs(target_date)
+    with timings.span("transform.align"):
+        daily = align_daily(index_df, valuation_df, bond_df, bond_col)
+    
+    chart_data = {}
+    monthly = None
+    for freq in FREQUENCIES:
+        with timings.span(f"transform.{freq}"):
+            series = compute_spread_series(sample_series(daily, freq), bond_col, freq)
+            chart_data[freq] = chart_records(series)
+        if freq == 'monthly':
+            monthly = series
+    
+    # 估值分位始终按月度历史计算，切换频率不改变 metrics
+    with timings.span("transform.metrics"):
+        metrics = build_metrics(monthly, target_date)
+    return {
+        "metrics": metrics,
+        "chartData": chart_data
+    }
+
+_views_cache = OrderedDict()
+_views_lock = threading.Lock()
+
+def _is_settled(target_date):
+    """目标日期足够早，数据不会再变化"""
+    return pd.Timestamp(target_date) < pd.Timestamp(date.today()) - pd.Timedelta(days=SETTLED_DAYS)
+
+def _prune_settled(directory, keep=SETTLED_CACHE_SIZE):
+    """磁盘缓存只保留最近使用的 keep 个日期，其余按 mtime 从旧到新删除"""
     try:
-        # 设置历史数据范围：2005-01-01 至目标日期
-        start_date = "2005-01-01"
-        end_date = target_date
-        
-        # 获取沪深300指数历史数据（作为市场代表）
-        index_df = ak.stock_zh_index_daily(symbol="sh000300")
-        index_df['date'] = pd.to_datetime(index_df['date'])
-        
-        # 筛选日期范围
-        index_df = index_df[(index_df['date'] >= start_date) & (index_df['date'] <= end_date)]
-        
-        # 获取市场估值数据 - 使用沪深300的PE和PB数据
+        entries = [entry for entry in os.scandir(directory) if entry.name.endswith(".json")]
+    except OSError:
+        return
+    if len(entries) <= keep:
+        return
+    entries.sort(key=lambda entry: entry.stat().st_mtime)
+    for entry in entries[:len(entries) - keep]:
         try:
-            # 获取沪深300的PE数据（来自中证指数官网）
-            pe_df = ak.stock_zh_index_value_csindex(symbol="000300")
-            pe_df['日期'] = pd.to_datetime(pe_df['日期'])
-            pe_df = pe_df[(pe_df['日期'] >= start_date) & (pe_df['日期'] <= end_date)]
-            # 使用市盈率1（静态PE）
-            pe_df = pe_df[['日期', '市盈率1']].rename(columns={'市盈率1': 'PE'})
-            
-            # 获取沪深300的PB数据（来自理杏仁）
-            pb_df = ak.stock_index_pb_lg()
-            pb_df['日期'] = pd.to_datetime(pb_df['日期'])
-            pb_df = pb_df[(pb_df['日期'] >= start_date) & (pb_df['日期'] <= end_date)]
-            # 使用市净率（加权平均）
-            pb_df = pb_df[['日期', '市净率']].rename(columns={'市净率': 'PB'})
-            
-            # 合并PE和PB数据
-            valuation_df = pd.merge(pe_df, pb_df, on='日期', how='outer')
-            valuation_df = valuation_df.sort_values('日期')
-            # 填充缺失值
-            valuation_df = valuation_df.fillna(method='ffill').fillna(method='bfill')
-        except Exception as e:
-            # 如果获取失败，使用默认估值
-            print(f"Warning: 获取估值数据失败，使用默认值: {e}", file=sys.stderr)
-            valuation_df = pd.DataFrame({
-                '日期': index_df['date'],
-                'PE': [15.0] * len(index_df),
-                'PB': [1.5] * len(index_df)
-            })
-        
-        # 获取10年期国债收益率数据
+            os.remove(entry.path)
+        except OSError:
+            # 其他进程已删除
+            pass
+
+def get_views(target_date):
+    """
+    获取目标日期的全部频率结果，带进程内和磁盘缓存
+    
+    三种频率一起计算、一起缓存，切换频率不需要重新获取和对齐数据。
+    已稳定的日期写入磁盘缓存，最多保留 SETTLED_CACHE_SIZE 个最近使用的日期；
+    近期日期只在进程内缓存 RECENT_TTL 秒。
+    """
+    # 非交易日与之前最后一个交易日的结果相同，共用缓存
+    target_date = resolve_trading_day(pd.Timestamp(target_date).strftime('%Y-%m-%d'))
+    settled = _is_settled(target_date)
+    
+    with _views_lock:
+        cached = _views_cache.get(target_date)
+        if cached is not None and (settled or time.time() - cached[0] < RECENT_TTL):
+            _views_cache.move_to_end(target_date)
+            return cached[1]
+    
+    path = cache_path("equity_bond_spread", f"{target_date}.json")
+    stored = read_json(path, default=None) if settled else None
+    if stored and stored.get("version") == VIEWS_VERSION:
+        views = stored["views"]
         try:
-            bond_df = ak.bond_zh_us_rate()
-            bond_df['日期'] = pd.to_datetime(bond_df['日期'])
-            bond_df = bond_df[(bond_df['日期'] >= start_date) & (bond_df['日期'] <= end_date)]
-            # 使用中国10年期国债收益率
-            bond_col = '中国国债收益率10年' if '中国国债收益率10年' in bond_df.columns else '中国10年期国债收益率'
-        except:
-            # 如果获取失败，使用固定收益率
-            bond_df = pd.DataFrame({
-                '日期': index_df['date'],
-                bond_col: [3.0] * len(index_df)
-            })
-        
-        # 合并数据
-        # 按月采样
-        index_monthly = index_df.set_index('date').resample('M').last()
-        valuation_monthly = valuation_df.set_index('日期').resample('M').last()
-        bond_monthly = bond_df.set_index('日期').resample('M').last()
-        
-        # 合并所有数据
-        merged = pd.merge(index_monthly, valuation_monthly, left_index=True, right_index=True, how='left')
-        merged = pd.merge(merged, bond_monthly, left_index=True, right_index=True, how='left')
-        
-        # 填充缺失值
-        merged = merged.fillna(method='ffill').fillna({'PE': 15.0, 'PB': 1.5, bond_col: 3.0})
-        
-        # 计算股债利差
-        chart_data = []
-        spreads = []
-        pbs = []
-        pes = []
-        
-        for date, row in merged.iterrows():
-            pe = float(row.get('PE', 15.0))
-            pb = float(row.get('PB', 1.5))
-            bond_yield = float(row.get(bond_col, 3.0))
-            wind_a = float(row.get('close', 3000))
-            
-            # 计算盈利收益率 (Earnings Yield = E/P = 1/PE × 100)
-            earnings_yield = (1 / pe * 100) if pe > 0 else 0
-            
-            # 股债利差 = 盈利收益率 - 国债收益率
-            spread = earnings_yield - bond_yield
-            
-            year = date.year
-            month = date.month
-            date_str = f"{year}-{str(month).zfill(2)}-01"
-            
-            chart_data.append({
-                "date": date_str,
-                "year": year,
-                "displayYear": year if month == 1 else "",
-                "spread": round(spread, 2),
-                "windA": round(wind_a, 0)
-            })
-            
-            spreads.append(spread)
-            pbs.append(pb)
-            pes.append(pe)
-        
-        # 查找目标日期的数据
-        target_dt = pd.to_datetime(target_date)
-        target_year = target_dt.year
-        target_month = target_dt.month
-        target_date_str = f"{target_year}-{str(target_month).zfill(2)}-01"
-        
-        # 找到对应的数据点
-        target_data = None
-        target_idx = -1
-        
-        for i, item in enumerate(chart_data):
-            if item["date"] == target_date_str:
-                target_data = item
-                target_idx = i
-                break
-        
-        # 如果找不到精确日期，使用最新数据
-        if not target_data and chart_data:
-            target_data = chart_data[-1]
-            target_idx = len(chart_data) - 1
-        
-        # 计算指标
-        if target_data and target_idx >= 0:
-            spread = target_data["spread"]
-            pb = pbs[target_idx]
-            pe = pes[target_idx]
-            
-            # 计算分位数
-            spread_percentile = calculate_percentile(spread, spreads)
-            pb_percentile = calculate_percentile(pb, pbs)
-            pe_percentile = calculate_percentile(pe, pes)
-            
-            metrics = {
-                "spreadPercentile": spread_percentile,
-                "spread": str(round(spread, 2)),
-                "pb": round(pb, 2),
-                "pbPercentile": pb_percentile,
-                "pe": round(pe, 2),
-                "pePercentile": pe_percentile
-            }
-        else:
-            # 默认值
-            metrics = {
-                "spreadPercentile": 50,
-                "spread": "2.0",
-                "pb": 1.5,
-                "pbPercentile": 50,
-                "pe": 15,
-                "pePercentile": 50
-            }
-        
-        result = {
-            "metrics": metrics,
-            "chartData": chart_data
-        }
-        
-        # 输出JSON数据
-        print(json.dumps(result, ensure_ascii=False))
-        
-    except Exception as e:
-        print(json.dumps({"error": str(e)}))
-        sys.exit(1)
+            # 更新 mtime，淘汰时按最近使用排序
+            os.utime(path)
+        except OSError:
+            pass
+    else:
+        views = build_views(target_date)
+        if settled:
+            write_json(path, {"version": VIEWS_VERSION, "views": views})
+            _prune_settled(os.path.dirname(path))
+    
+    with _views_lock:
+        _views_cache[target_date] = (time.time(), views)
+        _views_cache.move_to_end(target_date)
+        while len(_views_cache) > VIEWS_CACHE_SIZE:
+            _views_cache.popitem(last=False)
+    return views
+
+def get_equity_bond_spread(target_date, freq='monthly'):
+    """
+    获取股债利差数据
+    
+    Args:
+        target_date: 目标日期，格式: YYYY-MM-DD
+        freq: chartData 的频率，daily / weekly / monthly
+    
+    Returns:
+        股债利差数据字典，包含 metrics 和 chartData
+    """
+    if freq not in FREQUENCIES:
+        raise ValueError(f"不支持的频率: {freq}，可选: {', '.join(FREQUENCIES)}")
+    views = get_views(target_date)
+    return {
+        "metrics": views["metrics"],
+        "chartData": views["chartData"][freq]
+    }
+
+def _batch_metrics(index_df, valuation_df, bond_df, bond_col, targets):
+    """
+    对一组目标日期一次性计算 metrics
+    
+    交易日序列只对齐一次；每个日期的当前点取当天（含）之前最后一个交易日的值，
+    分位数只相对该日期所在月份之前的月份（扩展窗口）。
+    """
+    daily = align_daily(index_df, valuation_df, bond_df, bond_col)
+    series = compute_spread_series(sample_series(daily, 'monthly'), bond_col)
+    current = compute_spread_series(daily, bond_col, 'daily')
+    
+    # 目标日期所在月份之前的完整月份数
+    target_months = targets.values.astype('datetime64[M]')
+    lengths = np.searchsorted(series['date'].to_numpy().astype('datetime64[M]'), target_months, side='left')
+    
+    # 每个目标日期（含）之前最后一个交易日
+    trading_days = daily.index.values
+    positions = np.searchsorted(trading_days, targets.values.astype(trading_days.dtype), side='right') - 1
+    rows = np.maximum(positions, 0)
+    
+    # 当月已有交易日时，当前点为该交易日的值；
+    # 否则与单日期模式一样使用最近一个完整月份，当前点就是历史中的最后一个月
+    has_bar = (positions >= 0) & (trading_days[rows].astype('datetime64[M]') == target_months) if len(daily) \
+        else np.zeros(len(targets), dtype=bool)
+    valid = has_bar | (lengths > 0)
+    previous = np.maximum(lengths - 1, 0)
+    lengths = np.where(has_bar, lengths, previous)
+    
+    history = {}
+    values = {}
+    for name in ('spread', 'pe', 'pb'):
+        history[name] = series[name].to_numpy()
+        own = current[name].to_numpy()[rows] if len(current) else np.zeros(len(targets))
+        values[name] = np.where(has_bar, own, history[name][previous]) if len(series) else own
+    
+    # 利差按取整后的值参与排名，与 build_metrics 一致
+    spread_pct = prefix_percentiles(history['spread'], lengths, values['spread'], np.round(values['spread'], 2))
+    pe_pct = prefix_percentiles(history['pe'], lengths, values['pe'])
+    pb_pct = prefix_percentiles(history['pb'], lengths, values['pb'])
+    
+    metrics = []
+    for i, target in enumerate(targets.strftime('%Y-%m-%d')):
+        if not valid[i]:
+            metrics.append({"date": target, **build_metrics(series.iloc[:0], target)})
+            continue
+        spread = round(float(values['spread'][i]), 2)
+        metrics.append({
+            "date": target,
+            "spreadPercentile": round(float(spread_pct[i]), 2),
+            "spread": str(spread),
+            "pb": round(float(values['pb'][i]), 2),
+            "pbPercentile": round(float(pb_pct[i]), 2),
+            "pe": round(float(values['pe'][i]), 2),
+            "pePercentile": round(float(pe_pct[i]), 2)
+        })
+    return metrics
+
+def get_equity_bond_spread_batch(dates):
+    """
+    批量获取多个日期的股债利差指标
+    
+    只获取一次数据、对齐一次交易日序列，再对所有日期一次遍历计算扩展窗口分位数。
+    每个日期只使用它当天及之前的数据，结果与逐个调用 get_equity_bond_spread 的 metrics 相同。
+    
+    Args:
+        dates: 日期列表，格式: YYYY-MM-DD
+    
+    Returns:
+        {"metrics": [...]}，按日期升序，每项比 get_equity_bond_spread 的 metrics 多一个 date 字段
+    """
+    targets = pd.DatetimeIndex(sorted(set(pd.to_datetime(list(dates)))))
+    if not len(targets):
+        return {"metrics": []}
+    
+    index_df, valuation_df, bond_df, bond_col = load_inputs(targets[-1].strftime('%Y-%m-%d'), backfill=False)
+    
+    # PE/PB 开始有数据之前，单日期模式会用之后的第一个值向前填充，
+    # 按各列是否已开始分组，每组只用组内最后日期之前的数据向前填充，避免用到未来数据
+    starts = [valuation_df.loc[valuation_df[name].first_valid_index(), '日期']
+              for name in ('PE', 'PB')
+              if name in valuation_df.columns and valuation_df[name].first_valid_index() is not None]
+    keys = np.column_stack([targets >= start for start in starts]) if starts else np.zeros((len(targets), 0), dtype=bool)
+    
+    metrics = []
+    for key in sorted(set(map(tuple, keys.tolist()))):
+        group = targets[np.all(keys == np.array(key, dtype=bool), axis=1)]
+        group_valuation = valuation_df[valuation_df['日期'] <= group[-1]].bfill()
+        metrics.extend(_batch_metrics(index_df, group_valuation, bond_df, bond_col, group))
+    metrics.sort(key=lambda item: item["date"])
+    return {"metrics": metrics}
+
+def parse_batch_dates(dates=None, start=None, end=None):
+    """
+    解析批量模式的日期参数
+    
+    Args:
+        dates: 逗号分隔的日期列表
+        start, end: 日期区间（含），取区间内每个交易日
+    """
+    if dates:
+        return [d.strip() for d in dates.split(',') if d.strip()]
+    if start and end:
+        return trading_days_between(start, end)
+    raise ValueError("批量模式需要 --dates，或同时提供 --start 和 --end")
 
 if __name__ == "__main__":
     if len(sys.argv) < 2:
         print(json.dumps({"error": "参数不足，需要: date"}))
         sys.exit(1)
+    timings.mark_imported()
+    profiling.install()
     
-    date = sys.argv[1]
-    get_equity_bond_spread(date)
+    parser = argparse.ArgumentParser(description="获取股债利差数据")
+    parser.add_argument("date", nargs="?", help="目标日期，格式: YYYY-MM-DD")
+    parser.add_argument("--dates", help="批量模式：逗号分隔的日期列表")
+    parser.add_argument("--start", help="批量模式：起始日期")
+    parser.add_argument("--end", help="批量模式：结束日期")
+    parser.add_argument("--freq", choices=list(FREQUENCIES), default="monthly", help="chartData 频率（默认 monthly）")
+    args = parser.parse_args()
+    
+    try:
+        if args.dates or args.start or args.end:
+            result = get_equity_bond_spread_batch(parse_batch_dates(args.dates, args.start, args.end))
+        elif args.date:
+            result = get_equity_bond_spread(args.date, args.freq)
+        else:
+            raise ValueError("参数不足，需要: date")
+    except Exception as e:
+        print(json.dumps({"error": str(e)}))
+        sys.exit(1)
+    print(timings.dumps(result, ensure_ascii=False))
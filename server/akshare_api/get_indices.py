@@ -7,20 +7,28 @@
 
 import sys
 import json
-import akshare as ak
-import pandas as pd
-from datetime import datetime
+import os
+import argparse
 
-def get_indices_data(codes, date):
+from index_quotes import empty_quote, get_service
+from trade_calendar import resolve_trading_day
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from pycommon import profiling, timings
+
+def get_indices_data(codes, date, max_concurrency=None):
     """
     获取指数数据
     
+    重复的代码、映射到同一 akshare 代码的代码只获取一次，不同指数并发获取；
+    返回顺序与 codes 一致。
+    
     Args:
         codes: 指数代码列表，逗号分隔，如: "000001.SH,399001.SZ"
         date: 日期，格式: YYYY-MM-DD
+        max_concurrency: 同时获取的指数数，默认 AKSHARE_INDEX_CONCURRENCY（4）
     
     Returns:
-        JSON格式的指数数据
+        指数数据列表，获取失败的指数带 error 字段
     """
     # 分割代码列表
     code_list = codes.split(',')
@@ -36,75 +44,37 @@ def get_indices_data(codes, date):
         "000016.SH": "000016",  # 上证50
     }
     
-    result = []
+    # 非交易日取之前最后一个交易日；交易日历获取失败时每个指数返回默认值和 error 字段
+    try:
+        trading_day = resolve_trading_day(date)
+    except Exception as e:
+        return [dict(code=code, **empty_quote(), error=str(e)) for code in code_list]
     
+    # 转换代码格式，如 000001.SH -> sh000001
+    symbols = []
     for code in code_list:
-        try:
-            # 转换代码格式
-            ak_code = code_mapping.get(code, code.split('.')[0])
-            
-            # 获取指数历史行情
-            df = ak.stock_zh_index_daily(symbol=f"sh{ak_code}" if code.endswith('.SH') else f"sz{ak_code}")
-            
-            # 转换日期格式
-            df['date'] = pd.to_datetime(df['date'])
-            target_date = pd.to_datetime(date)
-            
-            # 筛选指定日期的数据
-            day_data = df[df['date'] == target_date]
-            
-            if day_data.empty:
-                # 如果没有数据，尝试获取最近的数据
-                day_data = df[df['date'] <= target_date].tail(1)
-            
-            if not day_data.empty:
-                # 计算涨跌幅
-                close = float(day_data.iloc[0]['close'])
-                open_price = float(day_data.iloc[0]['open'])
-                
-                # 获取前一天的收盘价来计算涨跌幅
-                idx = df[df['date'] == day_data.iloc[0]['date']].index[0]
-                if idx > 0:
-                    prev_close = float(df.iloc[idx - 1]['close'])
-                    pct_chg = ((close - prev_close) / prev_close) * 100
-                else:
-                    pct_chg = 0
-                
-                volume = float(day_data.iloc[0]['volume']) if 'volume' in day_data.columns else 0
-                
-                result.append({
-                    "code": code,
-                    "pct_chg": round(pct_chg, 2),
-                    "volume": volume,
-                    "amt": 0  # AKShare部分数据源可能不包含成交额
-                })
-            else:
-                result.append({
-                    "code": code,
-                    "pct_chg": 0,
-                    "volume": 0,
-                    "amt": 0
-                })
-        
-        except Exception as e:
-            # 如果获取失败，返回空数据
-            result.append({
-                "code": code,
-                "pct_chg": 0,
-                "volume": 0,
-                "amt": 0,
-                "error": str(e)
-            })
+        ak_code = code_mapping.get(code, code.split('.')[0])
+        symbols.append(f"sh{ak_code}" if code.endswith('.SH') else f"sz{ak_code}")
+    
+    # 按指数查询行情（本地存储已覆盖该交易日时不访问上游），
+    # 获取失败的指数带 error 字段
+    quotes = get_service().lookup([(symbol, trading_day) for symbol in symbols], max_concurrency=max_concurrency)
     
-    # 输出JSON数据
-    print(json.dumps(result, ensure_ascii=False))
+    with timings.span("transform"):
+        return [dict(code=code, **quote) for code, quote in zip(code_list, quotes)]
 
 if __name__ == "__main__":
     if len(sys.argv) < 3:
         print(json.dumps({"error": "参数不足，需要: codes date"}))
         sys.exit(1)
+    timings.mark_imported()
+    profiling.install()
     
-    codes = sys.argv[1]
-    date = sys.argv[2]
+    parser = argparse.ArgumentParser(description="获取指数数据")
+    parser.add_argument("codes", help="指数代码列表，逗号分隔")
+    parser.add_argument("date", help="日期，格式: YYYY-MM-DD")
+    parser.add_argument("--concurrency", type=int, default=None, help="同时获取的指数数")
+    args = parser.parse_args()
     
-    get_indices_data(codes, date)
+    result = get_indices_data(args.codes, args.date, max_concurrency=args.concurrency)
+    print(timings.dumps(result, ensure_ascii=False))
@@ -12,32 +12,43 @@ import os
 # 禁用进度条，加快执行速度
 os.environ['TQDM_DISABLE'] = '1'
 
-import akshare as ak
+from upstream import ak
 import pandas as pd
 from datetime import datetime
 import time
 import warnings
 
+from fetch_executor import run_fetches
+from overview_inputs import OVERVIEW_TIMEOUT
+from circuit_breaker import CircuitOpenError
+import get_market_overview_v3
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from pycommon import profiling, timings
+
 # 忽略警告信息
 warnings.filterwarnings('ignore')
 
-def get_market_overview_fast():
+def get_market_overview_fast(timeout=None):
     """
     快速获取市场概况（优化版）
     
+    Args:
+        timeout: 获取期限（秒），默认 AKSHARE_OVERVIEW_TIMEOUT（120），超时的调用被放弃
+    
     Returns:
-        DataFrame 或 None
+        (DataFrame 或 None, 获取状态)；接口熔断中时获取状态带 circuitOpen: true
     """
-    try:
-        # 使用更快的接口 - 东方财富沪深京A股
-        df = ak.stock_zh_a_spot_em()
-        if not df.empty:
-            return df
-    except:
-        pass
+    # 使用更快的接口 - 东方财富沪深京A股
+    fetched = run_fetches({"stock_zh_a_spot_em": ak.stock_zh_a_spot_em},
+                          total_timeout=OVERVIEW_TIMEOUT if timeout is None else timeout)["stock_zh_a_spot_em"]
+    if fetched.ok and fetched.value is not None and not fetched.value.empty:
+        return fetched.value, fetched.to_dict()
     
-    # 备用方案：返回 None，使用模拟数据
-    return None
+    # 备用方案：返回 None，使用估算或模拟数据
+    summary = fetched.to_dict()
+    if isinstance(fetched.exception, CircuitOpenError):
+        summary["circuitOpen"] = True
+    return None, summary
 
 def get_market_overview(date):
     """
@@ -51,9 +62,15 @@ def get_market_overview(date):
     """
     try:
         # 快速获取市场数据
-        df = get_market_overview_fast()
+        df, spot_input = get_market_overview_fast()
+        inputs = {"stock_zh_a_spot_em": spot_input}
         
-        if df is None or df.empty:
+        if df is None and spot_input.get("circuitOpen"):
+            # 全市场行情接口熔断中，立即改用指数涨跌估算（V3）
+            result = get_market_overview_v3.get_market_overview_fast(date)
+            inputs.update(result.pop("inputs", {}))
+            result["estimated"] = True
+        elif df is None or df.empty:
             # 如果实时数据获取失败，返回模拟数据
             result = {
                 "upLimit": 15,
@@ -83,19 +100,20 @@ def get_market_overview(date):
                     "changePercent": 52.0
                 }
             else:
-                # 转换涨跌幅为数值
-                changes = pd.to_numeric(df[pct_col], errors='coerce').fillna(0)
-                
-                # 统计涨跌家数
-                up_limit = len(changes[changes >= 9.9])  # 涨停
-                up = len(changes[(changes > 0) & (changes < 9.9)])  # 上涨
-                flat = len(changes[changes == 0])  # 平盘
-                down = len(changes[(changes < 0) & (changes > -9.9)])  # 下跌
-                down_limit = len(changes[changes <= -9.9])  # 跌停
-                
-                # 计算整体涨跌幅（上涨家数占比）
-                total = len(changes)
-                change_percent = (up / total * 100) if total > 0 else 0
+                with timings.span("transform"):
+                    # 转换涨跌幅为数值
+                    changes = pd.to_numeric(df[pct_col], errors='coerce').fillna(0)
+                    
+                    # 统计涨跌家数
+                    up_limit = len(changes[changes >= 9.9])  # 涨停
+                    up = len(changes[(changes > 0) & (changes < 9.9)])  # 上涨
+                    flat = len(changes[changes == 0])  # 平盘
+                    down = len(changes[(changes < 0) & (changes > -9.9)])  # 下跌
+                    down_limit = len(changes[changes <= -9.9])  # 跌停
+                    
+                    # 计算整体涨跌幅（上涨家数占比）
+                    total = len(changes)
+                    change_percent = (up / total * 100) if total > 0 else 0
                 
                 result = {
                     "upLimit": int(up_limit),
@@ -106,8 +124,10 @@ def get_market_overview(date):
                     "changePercent": round(change_percent, 2)
                 }
         
+        result["inputs"] = inputs
+        
         # 输出JSON数据
-        print(json.dumps(result, ensure_ascii=False))
+        print(timings.dumps(result, ensure_ascii=False))
         
     except Exception as e:
         # 即使出错，也返回默认数据而不是失败
@@ -120,12 +140,14 @@ def get_market_overview(date):
             "changePercent": 52.0,
             "error": str(e)
         }
-        print(json.dumps(result, ensure_ascii=False))
+        print(timings.dumps(result, ensure_ascii=False))
 
 if __name__ == "__main__":
     if len(sys.argv) < 2:
         print(json.dumps({"error": "参数不足，需要: date"}))
         sys.exit(1)
     
+    timings.mark_imported()
+    profiling.install()
     date = sys.argv[1]
     get_market_overview(date)
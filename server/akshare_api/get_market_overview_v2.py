@@ -17,14 +17,16 @@ os.environ['TQDM_DISABLE'] = '1'
 import warnings
 warnings.filterwarnings('ignore')
 
+from overview_inputs import OVERVIEW_INDICES, fetch_index_changes
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from pycommon import profiling, timings
+
 def get_market_overview_simple(date):
     """
     简化版市场概况 - 超快响应
-    使用统计学方法估算市场数据
+    使用统计学方法估算市场数据，inputs 字段报告每个指数的获取状态
     """
-    import akshare as ak
-    import pandas as pd
-    
     result = {
         "upLimit": 0,
         "up": 0,
@@ -33,31 +35,13 @@ def get_market_overview_simple(date):
         "downLimit": 0,
         "changePercent": 50.0
     }
+    inputs = {symbol: {"status": "skipped", "fetchMs": 0} for symbol in OVERVIEW_INDICES}
     
     try:
         # 方法1: 仅获取主要指数数据，推算市场情况
         # 这个接口非常快，不需要遍历所有股票
-        indices_data = []
-        
-        # 获取上证指数
-        try:
-            sh_df = ak.stock_zh_index_daily(symbol="sh000001")
-            if not sh_df.empty:
-                sh_latest = sh_df.iloc[-1]
-                sh_pct = ((sh_latest['close'] - sh_latest['open']) / sh_latest['open']) * 100
-                indices_data.append(sh_pct)
-        except:
-            pass
-        
-        # 获取深证成指
-        try:
-            sz_df = ak.stock_zh_index_daily(symbol="sz399001")
-            if not sz_df.empty:
-                sz_latest = sz_df.iloc[-1]
-                sz_pct = ((sz_latest['close'] - sz_latest['open']) / sz_latest['open']) * 100
-                indices_data.append(sz_pct)
-        except:
-            pass
+        # 上证指数和深证成指同时获取，共用一个总期限
+        indices_data, inputs = fetch_index_changes(OVERVIEW_INDICES, date=date)
         
         # 根据主要指数推算市场情况
         if indices_data:
@@ -106,6 +90,7 @@ def get_market_overview_simple(date):
             "changePercent": 50.0
         }
     
+    result["inputs"] = inputs
     return result
 
 if __name__ == "__main__":
@@ -113,6 +98,8 @@ if __name__ == "__main__":
         print(json.dumps({"error": "参数不足，需要: date"}))
         sys.exit(1)
     
+    timings.mark_imported()
+    profiling.install()
     date = sys.argv[1]
     result = get_market_overview_simple(date)
-    print(json.dumps(result, ensure_ascii=False))
+    print(timings.dumps(result, ensure_ascii=False))
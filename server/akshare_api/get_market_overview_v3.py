@@ -2,7 +2,7 @@
 # -*- coding: utf-8 -*-
 """
 获取市场概况数据 V3 - 终极优化版
-- 超时控制：使用信号机制强制终止慢接口
+- 超时控制：两个指数同时获取，共用一个总期限，超时的调用被放弃
 - 快速降级：优先使用快速接口
 - 保证响应：最坏情况返回合理估算值
 """
@@ -10,7 +10,6 @@
 import sys
 import json
 import os
-import signal
 
 # 禁用所有进度条和警告
 os.environ['TQDM_DISABLE'] = '1'
@@ -19,18 +18,22 @@ os.environ['PYTHONWARNINGS'] = 'ignore'
 import warnings
 warnings.filterwarnings('ignore')
 
-class TimeoutError(Exception):
-    pass
+from overview_inputs import OVERVIEW_INDICES, fetch_index_changes
 
-def timeout_handler(signum, frame):
-    raise TimeoutError("操作超时")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from pycommon import profiling, timings
 
-def get_market_overview_fast(date):
+def get_market_overview_fast(date, timeout=None):
     """
     超快速市场概况 - 允许更长时间获取真实数据
-    """
-    import akshare as ak
     
+    Args:
+        date: 日期，格式: YYYY-MM-DD
+        timeout: 获取指数数据的总期限（秒），默认 AKSHARE_OVERVIEW_TIMEOUT（120）
+    
+    Returns:
+        市场概况字典，inputs 字段报告每个指数的获取状态
+    """
     result = {
         "upLimit": 15,
         "up": 1800,
@@ -39,43 +42,11 @@ def get_market_overview_fast(date):
         "downLimit": 12,
         "changePercent": 50.0
     }
+    inputs = {symbol: {"status": "skipped", "fetchMs": 0} for symbol in OVERVIEW_INDICES}
     
     try:
-        # 设置120秒超时（单个接口）
-        signal.signal(signal.SIGALRM, timeout_handler)
-        
-        indices_pct = []
-        
-        # 方法1: 尝试获取上证指数（120秒超时）
-        try:
-            signal.alarm(120)
-            sh_df = ak.stock_zh_index_daily(symbol="sh000001")
-            signal.alarm(0)  # 取消超时
-            
-            if sh_df is not None and not sh_df.empty:
-                sh_latest = sh_df.iloc[-1]
-                sh_pct = ((sh_latest['close'] - sh_latest['open']) / sh_latest['open']) * 100
-                indices_pct.append(sh_pct)
-        except (TimeoutError, Exception) as e:
-            signal.alarm(0)
-            pass
-        
-        # 方法2: 尝试获取深证成指（120秒超时）
-        try:
-            signal.alarm(120)
-            sz_df = ak.stock_zh_index_daily(symbol="sz399001")
-            signal.alarm(0)
-            
-            if sz_df is not None and not sz_df.empty:
-                sz_latest = sz_df.iloc[-1]
-                sz_pct = ((sz_latest['close'] - sz_latest['open']) / sz_latest['open']) * 100
-                indices_pct.append(sz_pct)
-        except (TimeoutError, Exception) as e:
-            signal.alarm(0)
-            pass
-        
-        # 取消总超时
-        signal.alarm(0)
+        # 上证指数和深证成指同时获取，总期限内没返回的放弃
+        indices_pct, inputs = fetch_index_changes(OVERVIEW_INDICES, total_timeout=timeout, date=date)
         
         # 根据获取到的指数数据计算
         if indices_pct:
@@ -127,14 +98,11 @@ def get_market_overview_fast(date):
             result["downLimit"] = max(0, min(200, result["downLimit"]))
             result["changePercent"] = max(0, min(100, result["changePercent"]))
     
-    except TimeoutError:
-        # 整体超时，返回默认值
-        signal.alarm(0)
-        pass
     except Exception as e:
-        signal.alarm(0)
-        pass
+        # 返回默认值
+        print(f"Warning: 估算市场概况失败，返回默认值: {e}", file=sys.stderr)
     
+    result["inputs"] = inputs
     return result
 
 if __name__ == "__main__":
@@ -142,7 +110,9 @@ if __name__ == "__main__":
         print(json.dumps({"error": "参数不足，需要: date"}))
         sys.exit(1)
     
+    timings.mark_imported()
+    profiling.install()
     date = sys.argv[1]
     result = get_market_overview_fast(date)
-    print(json.dumps(result, ensure_ascii=False))
+    print(timings.dumps(result, ensure_ascii=False))
 
@@ -7,10 +7,21 @@
 
 import sys
 import json
-import akshare as ak
+import os
+import time
+import argparse
+import functools
+import threading
+from upstream import ak
+import numpy as np
 import pandas as pd
 from datetime import datetime
 
+from fetch_executor import run_fetches
+from sector_membership import MembershipStore, codes_from_constituents
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from pycommon import profiling, timings
+
 # 板块配置
 SECTOR_CONFIGS = {
     "指数": [
@@ -59,135 +70,398 @@ SECTOR_CONFIGS = {
     ],
 }
 
-def get_sector_data(sector_name):
+# 板块行情快照默认有效期（秒），0 表示每次运行重新获取
+# 常驻工作进程中设置为正数即可跨请求复用同一份快照
+SNAPSHOT_TTL = float(os.environ.get("AKSHARE_BOARD_SNAPSHOT_TTL", "0"))
+
+# 成分股抓取：并发上限、单个板块期限（秒）、总期限（秒）
+CONS_CONCURRENCY = int(os.environ.get("AKSHARE_CONS_CONCURRENCY", "4"))
+CONS_CALL_TIMEOUT = float(os.environ.get("AKSHARE_CONS_CALL_TIMEOUT", "20"))
+CONS_TOTAL_TIMEOUT = float(os.environ.get("AKSHARE_CONS_TOTAL_TIMEOUT", "60"))
+
+# 板块统计方式
+# spot: 全市场行情快照 + 缓存的成分股映射，一次计算所有板块（默认）
+# cons: 每个板块调用一次 stock_board_industry_cons_em
+SECTOR_MODE = os.environ.get("AKSHARE_SECTOR_MODE", "spot")
+
+_membership_store = MembershipStore()
+
+_snapshot_lock = threading.Lock()
+_cached_snapshot = None
+
+class BoardSnapshot:
     """
-    获取单个板块数据（带重试机制）
+    行业板块行情快照
+    
+    整张板块行情表只下载一次，按板块名称建立哈希索引，供所有板块共享查询
+    """
+    
+    def __init__(self, df):
+        self.fetched_at = time.time()
+        self.rows = {}
+        for row in df.to_dict('records'):
+            # 同名板块只保留第一行，与按名称筛选后取 iloc[0] 的行为一致
+            self.rows.setdefault(row.get('板块名称'), row)
+    
+    def get(self, sector_name):
+        """按板块名称查找行，找不到返回 None"""
+        return self.rows.get(sector_name)
+    
+    def age(self):
+        """快照已存在的秒数"""
+        return time.time() - self.fetched_at
+
+def get_board_snapshot(ttl=None):
+    """
+    获取行业板块行情快照
     
     Args:
-        sector_name: 板块名称
+        ttl: 快照有效期（秒），None 使用 SNAPSHOT_TTL；有效期内复用上次的快照
     
     Returns:
-        板块数据字典
+        BoardSnapshot
     """
-    max_retries = 2
+    global _cached_snapshot
     
-    for attempt in range(max_retries):
-        try:
-            # 获取东方财富板块行情数据
-            df = ak.stock_board_industry_name_em()
-            
-            # 查找对应板块
-            sector_row = df[df['板块名称'] == sector_name]
-            
-            if sector_row.empty:
-                # 如果找不到，返回默认值
-                return {
-                    "changePercent": 0,
-                    "topGainer": {"name": "", "changePercent": 0},
-                    "topLoser": {"name": "", "changePercent": 0},
-                    "upCount": 0,
-                    "downCount": 0
-                }
-            
-            # 获取板块涨跌幅
-            pct_chg = float(sector_row.iloc[0]['涨跌幅']) if '涨跌幅' in sector_row.columns else 0
-            
-            # 获取板块成分股
-            try:
-                constituents_df = ak.stock_board_industry_cons_em(symbol=sector_name)
-                
-                if not constituents_df.empty and '涨跌幅' in constituents_df.columns:
-                    # 转换涨跌幅为数值
-                    changes = pd.to_numeric(constituents_df['涨跌幅'], errors='coerce').fillna(0)
-                    names = constituents_df['名称'] if '名称' in constituents_df.columns else constituents_df['股票名称'] if '股票名称' in constituents_df.columns else constituents_df.index
-                    
-                    # 统计涨跌家数
-                    up_count = len(changes[changes > 0])
-                    down_count = len(changes[changes < 0])
-                    
-                    # 找出涨幅最大和最小的股票
-                    if len(changes) > 0:
-                        max_idx = changes.idxmax()
-                        min_idx = changes.idxmin()
-                        
-                        top_gainer = {
-                            "name": str(names.iloc[max_idx]) if max_idx in names.index else "",
-                            "changePercent": round(float(changes.iloc[max_idx]), 2)
-                        }
-                        
-                        top_loser = {
-                            "name": str(names.iloc[min_idx]) if min_idx in names.index else "",
-                            "changePercent": round(float(changes.iloc[min_idx]), 2)
-                        }
-                    else:
-                        top_gainer = {"name": "", "changePercent": 0}
-                        top_loser = {"name": "", "changePercent": 0}
-                else:
-                    up_count = 0
-                    down_count = 0
-                    top_gainer = {"name": "", "changePercent": 0}
-                    top_loser = {"name": "", "changePercent": 0}
+    if ttl is None:
+        ttl = SNAPSHOT_TTL
+    
+    with _snapshot_lock:
+        if ttl > 0 and _cached_snapshot is not None and _cached_snapshot.age() < ttl:
+            return _cached_snapshot
+        
+        # 获取东方财富板块行情数据（失败时由 upstream 按退避重试，不超过调用方的期限）
+        snapshot = BoardSnapshot(ak.stock_board_industry_name_em())
+        
+        _cached_snapshot = snapshot
+        return snapshot
+
+def empty_sector_data():
+    """板块找不到或获取失败时的默认值"""
+    return {
+        "changePercent": 0,
+        "topGainer": {"name": "", "changePercent": 0},
+        "topLoser": {"name": "", "changePercent": 0},
+        "upCount": 0,
+        "downCount": 0
+    }
+
+def summarize_constituents(constituents_df):
+    """
+    统计板块成分股的涨跌家数和领涨/领跌个股
+    
+    Args:
+        constituents_df: stock_board_industry_cons_em 返回的成分股行情
+    
+    Returns:
+        包含 topGainer、topLoser、upCount、downCount 的字典
+    """
+    up_count = 0
+    down_count = 0
+    top_gainer = {"name": "", "changePercent": 0}
+    top_loser = {"name": "", "changePercent": 0}
+    
+    if not constituents_df.empty and '涨跌幅' in constituents_df.columns:
+        # 转换涨跌幅为数值
+        changes = pd.to_numeric(constituents_df['涨跌幅'], errors='coerce').fillna(0)
+        names = constituents_df['名称'] if '名称' in constituents_df.columns else constituents_df['股票名称'] if '股票名称' in constituents_df.columns else constituents_df.index
+        
+        # 统计涨跌家数
+        up_count = len(changes[changes > 0])
+        down_count = len(changes[changes < 0])
+        
+        # 找出涨幅最大和最小的股票
+        if len(changes) > 0:
+            max_idx = changes.idxmax()
+            min_idx = changes.idxmin()
             
-            except Exception as e:
-                up_count = 0
-                down_count = 0
-                top_gainer = {"name": "", "changePercent": 0}
-                top_loser = {"name": "", "changePercent": 0}
+            top_gainer = {
+                "name": str(names.iloc[max_idx]) if max_idx in names.index else "",
+                "changePercent": round(float(changes.iloc[max_idx]), 2)
+            }
             
-            return {
-                "changePercent": round(float(pct_chg), 2),
-                "topGainer": top_gainer,
-                "topLoser": top_loser,
-                "upCount": int(up_count),
-                "downCount": int(down_count)
+            top_loser = {
+                "name": str(names.iloc[min_idx]) if min_idx in names.index else "",
+                "changePercent": round(float(changes.iloc[min_idx]), 2)
+            }
+    
+    return {
+        "topGainer": top_gainer,
+        "topLoser": top_loser,
+        "upCount": int(up_count),
+        "downCount": int(down_count)
+    }
+
+def summarize_from_spot(spot_df, membership):
+    """
+    用一份全市场行情快照一次性统计所有板块
+    
+    与逐个板块调用 summarize_constituents 的结果一致：涨跌幅缺失按 0 处理，
+    涨幅/跌幅相同时按成分股列表中的先后顺序取第一只。
+    行情快照中没有的成分股（如新上市、已退市）保留在统计中，涨跌幅按 0 处理、名称用代码代替，
+    并在该板块的结果中用 missingCount 标出个数
+    
+    Args:
+        spot_df: stock_zh_a_spot_em 返回的全市场行情
+        membership: {板块名称: [成分股代码]}
+    
+    Returns:
+        {板块名称: 包含 topGainer、topLoser、upCount、downCount 的字典，有缺失成分股时另带 missingCount}
+    """
+    spot = pd.DataFrame({
+        'code': spot_df['代码'].astype(str).values,
+        'name': spot_df['名称'].astype(str).values,
+        'pct': pd.to_numeric(spot_df['涨跌幅'], errors='coerce').fillna(0).values,
+    }).drop_duplicates('code').set_index('code')
+    
+    # 展开为 (板块, 序号, 代码) 长表，再与行情快照连接
+    sector_names = list(membership.keys())
+    sizes = [len(membership[name]) for name in sector_names]
+    long_df = pd.DataFrame({
+        'sector': np.repeat(np.arange(len(sector_names)), sizes),
+        'pos': np.concatenate([np.arange(size) for size in sizes]) if sizes else np.array([], dtype=int),
+        'code': [code for name in sector_names for code in membership[name]],
+    })
+    joined = long_df.join(spot, on='code', how='left')
+    missing = joined['name'].isna()
+    joined['pct'] = joined['pct'].fillna(0)
+    joined['name'] = joined['name'].fillna(joined['code'])
+    missing_counts = missing.groupby(joined['sector']).sum()
+    
+    # 分组统计涨跌家数
+    up_counts = (joined['pct'] > 0).groupby(joined['sector']).sum()
+    down_counts = (joined['pct'] < 0).groupby(joined['sector']).sum()
+    
+    # 每个板块按涨跌幅排序后取第一行，序号作为并列时的次序
+    gainers = joined.sort_values(['sector', 'pct', 'pos'], ascending=[True, False, True]).drop_duplicates('sector').set_index('sector')
+    losers = joined.sort_values(['sector', 'pct', 'pos'], ascending=[True, True, True]).drop_duplicates('sector').set_index('sector')
+    
+    result = {}
+    for idx, name in enumerate(sector_names):
+        if idx not in gainers.index:
+            result[name] = {
+                "topGainer": {"name": "", "changePercent": 0},
+                "topLoser": {"name": "", "changePercent": 0},
+                "upCount": 0,
+                "downCount": 0
             }
+            continue
         
-        except Exception as e:
-            if attempt < max_retries - 1:
-                import time
-                time.sleep(2)
-                continue
-            else:
-                # 最后一次尝试失败，返回默认值
-                return {
-                    "changePercent": 0,
-                    "topGainer": {"name": "", "changePercent": 0},
-                    "topLoser": {"name": "", "changePercent": 0},
-                    "upCount": 0,
-                    "downCount": 0,
-                    "error": str(e)
-                }
-
-def get_sectors_data(date):
+        gainer = gainers.loc[idx]
+        loser = losers.loc[idx]
+        result[name] = {
+            "topGainer": {"name": str(gainer['name']), "changePercent": round(float(gainer['pct']), 2)},
+            "topLoser": {"name": str(loser['name']), "changePercent": round(float(loser['pct']), 2)},
+            "upCount": int(up_counts.get(idx, 0)),
+            "downCount": int(down_counts.get(idx, 0))
+        }
+        if missing_counts.get(idx, 0):
+            result[name]["missingCount"] = int(missing_counts[idx])
+    
+    return result
+
+def get_spot_stats(snapshot, sector_names):
+    """
+    用成分股映射 + 全市场行情快照统计板块
+    
+    Args:
+        snapshot: 板块行情快照 BoardSnapshot
+        sector_names: 板块名称列表
+    
+    Returns:
+        (spot_stats, missing): spot_stats 为已统计板块的结果（带 fetchMs，为行情快照的获取耗时），
+        missing 为当天还没有成分股映射、需要逐个获取成分股的板块
+    """
+    known = [name for name in sector_names if snapshot.get(name) is not None]
+    membership, missing = _membership_store.get_fresh(known)
+    
+    if not membership:
+        return {}, missing
+    
+    try:
+        started = time.perf_counter()
+        spot_df = ak.stock_zh_a_spot_em()
+        fetch_ms = int(round((time.perf_counter() - started) * 1000))
+        with timings.span("transform.spot"):
+            spot_stats = summarize_from_spot(spot_df, membership)
+        # 与逐个获取成分股的板块字段一致，fetchMs 为全市场行情快照的获取耗时
+        for stats in spot_stats.values():
+            stats["fetchMs"] = fetch_ms
+        return spot_stats, missing
+    except Exception as e:
+        # 行情快照获取失败，全部回退到逐个板块获取成分股
+        print(f"Warning: 全市场行情获取失败，逐个板块获取成分股: {e}", file=sys.stderr)
+        return {}, known
+
+def fetch_constituents(snapshot, sector_names, max_concurrency=None, call_timeout=None, total_timeout=None):
+    """
+    并发获取多个板块的成分股行情
+    
+    Args:
+        snapshot: 板块行情快照 BoardSnapshot
+        sector_names: 板块名称列表
+        max_concurrency: 并发上限，None 使用 CONS_CONCURRENCY
+        call_timeout: 单个板块的期限（秒），None 使用 CONS_CALL_TIMEOUT
+        total_timeout: 全部板块的总期限（秒），None 使用 CONS_TOTAL_TIMEOUT
+    
+    Returns:
+        {板块名称: FetchResult}，快照中找不到的板块不在结果中
+    """
+    calls = {}
+    for sector_name in sector_names:
+        sector_row = snapshot.get(sector_name)
+        if sector_row is None or sector_name in calls:
+            continue
+        # 直接传入板块代码，避免 akshare 内部按名称再下载一次板块列表
+        board_code = sector_row.get('板块代码') or sector_name
+        calls[sector_name] = functools.partial(ak.stock_board_industry_cons_em, symbol=board_code)
+    
+    return run_fetches(
+        calls,
+        max_concurrency=CONS_CONCURRENCY if max_concurrency is None else max_concurrency,
+        call_timeout=CONS_CALL_TIMEOUT if call_timeout is None else call_timeout,
+        total_timeout=CONS_TOTAL_TIMEOUT if total_timeout is None else total_timeout,
+    )
+
+def get_sector_data(sector_name, snapshot, fetched, spot_stats):
+    """
+    组装单个板块数据
+    
+    Args:
+        sector_name: 板块名称
+        snapshot: 板块行情快照 BoardSnapshot
+        fetched: fetch_constituents 的结果
+        spot_stats: summarize_from_spot 的结果
+    
+    Returns:
+        板块数据字典；成分股获取失败或超时的板块带 partial 标记
+    """
+    # 查找对应板块
+    sector_row = snapshot.get(sector_name)
+    
+    if sector_row is None:
+        # 如果找不到，返回默认值
+        return empty_sector_data()
+    
+    # 获取板块涨跌幅
+    pct_chg = float(sector_row['涨跌幅']) if '涨跌幅' in sector_row else 0
+    
+    if sector_name in spot_stats:
+        return {
+            "changePercent": round(float(pct_chg), 2),
+            **spot_stats[sector_name]
+        }
+    
+    fetch = fetched[sector_name]
+    if fetch.ok:
+        stats = summarize_constituents(fetch.value)
+    else:
+        stats = empty_sector_data()
+        del stats["changePercent"]
+    
+    sector_data = {
+        "changePercent": round(float(pct_chg), 2),
+        **stats,
+        "fetchMs": fetch.elapsed_ms
+    }
+    
+    if not fetch.ok:
+        sector_data["partial"] = True
+        sector_data["error"] = fetch.error
+    
+    return sector_data
+
+def get_sectors_data(date, snapshot_ttl=None, max_concurrency=None, call_timeout=None, total_timeout=None, mode=None):
     """
     获取所有板块数据
     
     Args:
         date: 日期，格式: YYYY-MM-DD
+        snapshot_ttl: 板块行情快照有效期（秒），None 使用 SNAPSHOT_TTL
+        max_concurrency: 成分股并发上限
+        call_timeout: 单个板块成分股的期限（秒）
+        total_timeout: 成分股抓取阶段的总期限（秒）
+        mode: 板块统计方式 spot / cons，None 使用 SECTOR_MODE
     
     Returns:
-        JSON格式的板块数据
+        板块数据列表
     """
+    mode = mode or SECTOR_MODE
     result = []
     
+    # 整张板块行情表每次运行只获取一次，所有板块共享
+    try:
+        snapshot = get_board_snapshot(snapshot_ttl)
+        snapshot_error = None
+    except Exception as e:
+        snapshot = None
+        snapshot_error = str(e)
+    
+    if snapshot is not None:
+        sector_names = [sector["code"] for sectors in SECTOR_CONFIGS.values() for sector in sectors]
+        
+        # 优先用全市场行情快照一次统计所有板块
+        spot_stats = {}
+        if mode == "spot":
+            spot_stats, sector_names = get_spot_stats(snapshot, sector_names)
+        
+        # 其余板块并发获取成分股
+        fetched = fetch_constituents(snapshot, sector_names, max_concurrency, call_timeout, total_timeout)
+        
+        # 顺便刷新当天的成分股映射
+        if mode == "spot":
+            refreshed = {}
+            for name, fetch in fetched.items():
+                codes = codes_from_constituents(fetch.value) if fetch.ok else None
+                if codes is not None:
+                    refreshed[name] = codes
+            _membership_store.update(refreshed)
+    
     # 遍历所有板块
-    for category, sectors in SECTOR_CONFIGS.items():
-        for sector in sectors:
-            sector_data = get_sector_data(sector["code"])
-            
-            result.append({
-                "category": category,
-                "name": sector["name"],
-                **sector_data
-            })
+    with timings.span("transform"):
+        for category, sectors in SECTOR_CONFIGS.items():
+            for sector in sectors:
+                if snapshot is None:
+                    # 板块行情获取失败，返回默认值
+                    sector_data = {**empty_sector_data(), "error": snapshot_error}
+                else:
+                    sector_data = get_sector_data(sector["code"], snapshot, fetched, spot_stats)
+                
+                result.append({
+                    "category": category,
+                    "name": sector["name"],
+                    **sector_data
+                })
     
-    # 输出JSON数据
-    print(json.dumps(result, ensure_ascii=False))
+    return result
 
 if __name__ == "__main__":
     if len(sys.argv) < 2:
         print(json.dumps({"error": "参数不足，需要: date"}))
         sys.exit(1)
+    timings.mark_imported()
+    profiling.install()
+    
+    parser = argparse.ArgumentParser(description="获取板块数据")
+    parser.add_argument("date", help="日期，格式: YYYY-MM-DD")
+    parser.add_argument("--snapshot-ttl", type=float, default=None,
+                        help="板块行情快照有效期（秒），常驻进程中跨请求复用")
+    parser.add_argument("--mode", choices=["spot", "cons"], default=None,
+                        help=f"板块统计方式（默认 {SECTOR_MODE}）")
+    parser.add_argument("--concurrency", type=int, default=None,
+                        help=f"成分股并发上限（默认 {CONS_CONCURRENCY}）")
+    parser.add_argument("--call-timeout", type=float, default=None,
+                        help=f"单个板块成分股的期限，秒（默认 {CONS_CALL_TIMEOUT:g}）")
+    parser.add_argument("--deadline", type=float, default=None,
+                        help=f"成分股抓取阶段的总期限，秒（默认 {CONS_TOTAL_TIMEOUT:g}）")
+    args = parser.parse_args()
     
-    date = sys.argv[1]
-    get_sectors_data(date)
+    result = get_sectors_data(
+        args.date,
+        snapshot_ttl=args.snapshot_ttl,
+        max_concurrency=args.concurrency,
+        call_timeout=args.call_timeout,
+        total_timeout=args.deadline,
+        mode=args.mode,
+    )
+    print(timings.dumps(result, ensure_ascii=False))
@@ -0,0 +1,295 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+指数日线本地列式存储
+按指数代码保存历史日线，每列一个 .npy 文件，读取时内存映射
+
+- 首次使用时通过 stock_zh_index_daily 下载全部历史
+- 之后只通过 stock_zh_index_daily_em 获取最后一个已存交易日之后的日线并追加
+- 已收盘的交易日不会再变化，当天（可能未收盘）的日线只在内存中使用，不写入磁盘
+- 请求非交易日（周末、节假日）时按交易日历落到前一个交易日，本地已有时不访问上游
+
+目录结构（.cache/index_daily/<symbol>/）:
+    CURRENT           当前版本目录名
+    <版本>/date.npy   datetime64[D]
+    <版本>/open.npy ... amount.npy  float64
+
+写入新版本后再替换 CURRENT，读取方不会读到写了一半的数据。
+"""
+
+import os
+import time
+import shutil
+import threading
+from datetime import date
+
+import numpy as np
+
+from local_cache import cache_path
+from trade_calendar import resolve_trading_day
+
+# 存储的列（date 之外），与 stock_zh_index_daily 的列保持一致，另加成交额
+COLUMNS = ("open", "high", "low", "close", "volume", "amount")
+
+# 设置 AKSHARE_HISTORY_STORE=false 关闭本地存储，每次都下载全部历史
+ENABLED = os.environ.get("AKSHARE_HISTORY_STORE", "true") != "false"
+
+class IndexHistory:
+    """
+    单个指数的日线数据（按日期升序）
+
+    Attributes:
+        symbol: 指数代码，如 sh000001
+        dates: datetime64[D] 数组
+        columns: {列名: float64 数组}
+    """
+
+    def __init__(self, symbol, dates, columns):
+        self.symbol = symbol
+        self.dates = dates
+        self.columns = columns
+
+    def __len__(self):
+        return len(self.dates)
+
+    @property
+    def last_date(self):
+        return self.dates[-1] if len(self.dates) else None
+
+    def until(self, end_date):
+        """截取 end_date（含）之前的日线"""
+        end = np.datetime64(end_date, 'D')
+        stop = int(np.searchsorted(self.dates, end, side='right'))
+        if stop == len(self.dates):
+            return self
+        return IndexHistory(self.symbol, self.dates[:stop], {name: col[:stop] for name, col in self.columns.items()})
+
+    def append(self, other):
+        """追加 other 中晚于最后一个交易日的日线，返回新的 IndexHistory"""
+        if self.last_date is not None:
+            start = int(np.searchsorted(other.dates, self.last_date, side='right'))
+        else:
+            start = 0
+        if start >= len(other.dates):
+            return self
+        dates = np.concatenate([self.dates, other.dates[start:]])
+        columns = {name: np.concatenate([self.columns[name], other.columns[name][start:]]) for name in COLUMNS}
+        return IndexHistory(self.symbol, dates, columns)
+
+    def to_frame(self):
+        """转换为与 stock_zh_index_daily 相同列的 DataFrame"""
+        import pandas as pd
+
+        frame = pd.DataFrame({"date": self.dates.astype('datetime64[ns]')})
+        for name in COLUMNS:
+            frame[name] = np.asarray(self.columns[name])
+        return frame
+
+def history_from_frame(symbol, df):
+    """
+    从 akshare 返回的 DataFrame 构造 IndexHistory
+
+    Args:
+        symbol: 指数代码
+        df: 包含 date 及 open/high/low/close/volume 列（amount 可选）的 DataFrame
+    """
+    import pandas as pd
+
+    if df is None or df.empty:
+        return IndexHistory(symbol, np.array([], dtype='datetime64[D]'),
+                            {name: np.array([], dtype='float64') for name in COLUMNS})
+
+    df = df.sort_values('date')
+    dates = pd.to_datetime(df['date']).values.astype('datetime64[D]')
+    columns = {}
+    for name in COLUMNS:
+        if name in df.columns:
+            columns[name] = pd.to_numeric(df[name], errors='coerce').to_numpy(dtype='float64')
+        else:
+            columns[name] = np.full(len(df), np.nan)
+    return IndexHistory(symbol, dates, columns)
+
+class HistoryStore:
+    """
+    指数日线本地存储
+
+    Args:
+        root: 存储根目录，默认 .cache/index_daily
+    """
+
+    def __init__(self, root=None):
+        self.root = root or os.path.dirname(cache_path("index_daily", "_"))
+        self.locks = {}
+        self.locks_lock = threading.Lock()
+
+    def _lock(self, symbol):
+        with self.locks_lock:
+            return self.locks.setdefault(symbol, threading.Lock())
+
+    def _symbol_dir(self, symbol):
+        return os.path.join(self.root, symbol)
+
+    def load(self, symbol):
+        """
+        读取已存的日线（内存映射），没有存储时返回 None
+        """
+        symbol_dir = self._symbol_dir(symbol)
+        try:
+            with open(os.path.join(symbol_dir, "CURRENT"), "r") as f:
+                version_dir = os.path.join(symbol_dir, f.read().strip())
+            dates = np.load(os.path.join(version_dir, "date.npy"), mmap_mode='r')
+            columns = {name: np.load(os.path.join(version_dir, f"{name}.npy"), mmap_mode='r') for name in COLUMNS}
+        except (OSError, ValueError):
+            return None
+        return IndexHistory(symbol, dates, columns)
+
+    def save(self, history):
+        """写入新版本并切换 CURRENT，保留上一个版本供仍在读取的进程使用"""
+        symbol_dir = self._symbol_dir(history.symbol)
+        os.makedirs(symbol_dir, exist_ok=True)
+
+        version = f"v{int(time.time() * 1000)}-{os.getpid()}-{threading.get_ident()}"
+        version_dir = os.path.join(symbol_dir, version)
+        os.makedirs(version_dir)
+        np.save(os.path.join(version_dir, "date.npy"), np.asarray(history.dates, dtype='datetime64[D]'))
+        for name in COLUMNS:
+            np.save(os.path.join(version_dir, f"{name}.npy"), np.asarray(history.columns[name], dtype='float64'))
+
+        pointer_tmp = os.path.join(symbol_dir, f"CURRENT.{version}.tmp")
+        with open(pointer_tmp, "w") as f:
+            f.write(version)
+        previous = self._current_version(symbol_dir)
+        os.replace(pointer_tmp, os.path.join(symbol_dir, "CURRENT"))
+
+        # 清理更早的版本
+        for entry in os.listdir(symbol_dir):
+            if entry.startswith("v") and entry not in (version, previous):
+                shutil.rmtree(os.path.join(symbol_dir, entry), ignore_errors=True)
+
+    @staticmethod
+    def _current_version(symbol_dir):
+        try:
+            with open(os.path.join(symbol_dir, "CURRENT"), "r") as f:
+                return f.read().strip()
+        except OSError:
+            return None
+
+    def get(self, symbol, end_date=None):
+        """
+        获取指数日线，只下载本地没有的部分
+
+        Args:
+            symbol: 指数代码，如 sh000001
+            end_date: 需要的最后日期（YYYY-MM-DD），None 表示最新
+
+        Returns:
+            IndexHistory（end_date 之前的部分）
+        """
+        # 非交易日落到之前最后一个交易日（None 表示今天）
+        trading_day = resolve_trading_day(end_date)
+
+        with self._lock(symbol):
+            stored = self.load(symbol)
+
+            # 本地已覆盖所需的交易日，不访问上游
+            if stored is not None and len(stored) and stored.last_date >= np.datetime64(trading_day, 'D'):
+                return stored.until(end_date) if end_date is not None else stored
+
+            history = self._refresh(symbol, stored)
+
+        return history.until(end_date) if end_date is not None else history
+
+    def _refresh(self, symbol, stored):
+        """下载增量日线，已收盘的部分写入磁盘"""
+        from upstream import ak
+
+        today = np.datetime64(date.today(), 'D')
+
+        if stored is None or not len(stored):
+            full = history_from_frame(symbol, ak.stock_zh_index_daily(symbol=symbol))
+            self._persist_closed(full, stored, today)
+            return full
+
+        # 从最后一个已存交易日开始获取，重叠的一天用于校验数据源和成交量单位
+        start = str(stored.last_date).replace('-', '')
+        recent = history_from_frame(symbol, ak.stock_zh_index_daily_em(symbol=symbol, start_date=start))
+        recent = self._align_units(stored, recent)
+
+        if recent is None:
+            # 两个数据源对不上，重新下载全部历史
+            full = history_from_frame(symbol, ak.stock_zh_index_daily(symbol=symbol))
+            self._persist_closed(full, None, today)
+            return full
+
+        history = stored.append(recent)
+        self._persist_closed(history, stored, today)
+        return history
+
+    def _persist_closed(self, history, stored, today):
+        """把今天之前（已收盘）的日线写入磁盘，没有新增时不写"""
+        closed = history.until(today - 1)
+        if len(closed) and (stored is None or len(closed) > len(stored)):
+            self.save(closed)
+
+    @staticmethod
+    def _align_units(stored, recent):
+        """
+        用重叠的一天对齐增量数据的成交量单位
+
+        东方财富的指数成交量以手为单位，新浪以股为单位；按重叠日的比例换算。
+        重叠日收盘价不一致时返回 None。
+        """
+        if not len(recent):
+            return recent
+        if recent.dates[0] != stored.last_date:
+            return None
+
+        stored_close = float(stored.columns["close"][-1])
+        recent_close = float(recent.columns["close"][0])
+        if not stored_close or abs(recent_close - stored_close) / stored_close > 0.005:
+            return None
+
+        stored_volume = float(stored.columns["volume"][-1])
+        recent_volume = float(recent.columns["volume"][0])
+        if stored_volume > 0 and recent_volume > 0:
+            scale = 10 ** round(np.log10(stored_volume / recent_volume))
+            if scale != 1:
+                columns = dict(recent.columns)
+                columns["volume"] = recent.columns["volume"] * scale
+                recent = IndexHistory(recent.symbol, recent.dates, columns)
+        return recent
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_store():
+    """进程内共享的 HistoryStore"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = HistoryStore()
+        return _store
+
+def get_index_history(symbol, end_date=None):
+    """
+    获取指数日线（IndexHistory），关闭本地存储时直接下载全部历史
+
+    Args:
+        symbol: 指数代码，如 sh000001
+        end_date: 需要的最后日期（YYYY-MM-DD），None 表示最新
+    """
+    if not ENABLED:
+        from upstream import ak
+        history = history_from_frame(symbol, ak.stock_zh_index_daily(symbol=symbol))
+        return history.until(end_date) if end_date is not None else history
+    return get_store().get(symbol, end_date)
+
+def get_index_daily(symbol, end_date=None):
+    """
+    获取指数日线 DataFrame，可直接替换 ak.stock_zh_index_daily(symbol=symbol)
+
+    Args:
+        symbol: 指数代码，如 sh000001
+        end_date: 需要的最后日期（YYYY-MM-DD），None 表示最新
+    """
+    return get_index_history(symbol, end_date).to_frame()
@@ -0,0 +1,250 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+akshare HTTP 连接复用
+
+akshare 通过 requests.get/post 访问东方财富、新浪、中证指数等站点，每次调用都新建 Session，
+TCP+TLS 连接用完即关。install() 之后 akshare 子模块的这些调用改由共享的连接池发出:
+
+- keep-alive，同一站点的连接在调用之间复用（常驻的 worker.py 中省去大部分握手耗时）
+- 每个站点最多保持 POOL_SIZE 个空闲连接
+- 连接池本身不重试，重试只由 upstream 的 RetryPolicy（pycommon.resilience）负责，退避不超过调用方的期限
+
+只替换 akshare 子模块里的 requests 名字（bind_akshare()），requests 模块本身和其他库不受影响。
+Session 用完放回空闲列表供之后的请求复用（run_fetches 每个调用一个新线程，不按线程保存），
+每次请求前清空 cookie（与 requests.get 一样不在调用之间保留状态）。
+请求同时经过按站点的限流（见 rate_limit）；调用方设置了期限（pycommon.resilience.deadline）时，
+请求的超时不超过剩余时间。
+akshare 中直接创建 requests.Session 或不经 requests 的调用不受影响。
+requests 在 install() 时才导入，只读缓存的脚本不承担它的导入开销。
+"""
+
+import os
+import sys
+import types
+import threading
+from urllib.parse import urlsplit
+
+import rate_limit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from pycommon import resilience
+
+# 设置 AKSHARE_HTTP_POOL=false 关闭连接复用
+ENABLED = os.environ.get("AKSHARE_HTTP_POOL", "true") != "false"
+
+# 每个站点保持的连接数
+POOL_SIZE = int(os.environ.get("AKSHARE_HTTP_POOL_SIZE", "8"))
+
+# 保持连接池的站点数
+POOL_HOSTS = 16
+
+class PooledHTTP:
+    """
+    共享的连接池（一个 HTTPAdapter 同时处理 http 和 https），以及挂载它的 Session 空闲列表
+
+    Attributes:
+        stats: requests（发出的请求数）、errors（抛出异常的请求数）、sessions（创建的 Session 数）
+    """
+
+    def __init__(self, pool_size=POOL_SIZE, pool_hosts=POOL_HOSTS):
+        from requests.adapters import HTTPAdapter
+
+        # max_retries=0：重试由 upstream 负责，这里不再叠加一层
+        self.adapter = HTTPAdapter(pool_connections=pool_hosts, pool_maxsize=pool_size, max_retries=0)
+        self.lock = threading.Lock()
+        self.idle = []
+        self.stats = {"requests": 0, "errors": 0, "sessions": 0}
+
+    def _new_session(self):
+        import requests
+
+        session = requests.Session()
+        session.mount("https://", self.adapter)
+        session.mount("http://", self.adapter)
+        return session
+
+    def send(self, method, url, **kwargs):
+        """与 requests.request 相同，连接来自共享连接池"""
+        with self.lock:
+            self.stats["requests"] += 1
+            session = self.idle.pop() if self.idle else None
+            if session is None:
+                self.stats["sessions"] += 1
+        if session is None:
+            session = self._new_session()
+        session.cookies.clear()
+        try:
+            return session.request(method=method, url=url, **kwargs)
+        except Exception:
+            with self.lock:
+                self.stats["errors"] += 1
+            raise
+        finally:
+            # 空闲列表的长度不超过同时进行的请求数
+            with self.lock:
+                self.idle.append(session)
+
+    def get_stats(self):
+        """
+        连接复用统计
+
+        connections 为新建的连接数，reused = 经连接池发出的请求数 - 新建连接数；
+        按站点的明细只包含仍在连接池中的站点。
+        """
+        hosts = {}
+        pools = self.adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            requests_count = getattr(pool, "num_requests", 0)
+            connections = getattr(pool, "num_connections", 0)
+            hosts[f"{pool.scheme}://{pool.host}"] = {
+                "requests": requests_count,
+                "connections": connections,
+                "reused": max(0, requests_count - connections),
+            }
+
+        with self.lock:
+            stats = dict(self.stats)
+        stats["connections"] = sum(h["connections"] for h in hosts.values())
+        stats["reused"] = sum(h["reused"] for h in hosts.values())
+        pooled = sum(h["requests"] for h in hosts.values())
+        stats["reuseRate"] = round(stats["reused"] / pooled, 3) if pooled else 0.0
+        stats["hosts"] = hosts
+        return stats
+
+_pooled = None
+_requests = None
+_proxy = None
+_installed = False
+_lock = threading.Lock()
+
+def request(method, url, **kwargs):
+    """
+    akshare 子模块看到的 requests.request：按站点限流，经由共享连接池发出
+    """
+    left = resilience.remaining()
+    if left is not None:
+        if left <= 0:
+            raise resilience.DeadlineExceeded(f"请求 {url} 前期限已到")
+        timeout = kwargs.get("timeout")
+        if isinstance(timeout, tuple):
+            kwargs["timeout"] = tuple(left if t is None else min(t, left) for t in timeout)
+        else:
+            kwargs["timeout"] = left if timeout is None else min(timeout, left)
+    pooled = _pooled
+    send = pooled.send if pooled is not None else _requests.request
+    limiter = rate_limit.limiter
+    if limiter is None:
+        return send(method, url, **kwargs)
+    host = urlsplit(url).hostname or ""
+    return limiter.call(host, lambda: send(method, url, **kwargs))
+
+class _AkshareRequests(types.ModuleType):
+    """
+    替换 akshare 子模块中 requests 名字的模块对象
+
+    get/post 等与 requests.api 的同名函数参数相同，经由 request() 发出；
+    其他属性（Session、exceptions、adapters 等）来自真正的 requests
+    """
+
+    def __init__(self, real):
+        super().__init__(real.__name__, real.__doc__)
+        self._real = real
+
+    def __getattr__(self, name):
+        return getattr(self._real, name)
+
+    @staticmethod
+    def request(method, url, **kwargs):
+        return request(method, url, **kwargs)
+
+    @staticmethod
+    def get(url, params=None, **kwargs):
+        return request("get", url, params=params, **kwargs)
+
+    @staticmethod
+    def options(url, **kwargs):
+        return request("options", url, **kwargs)
+
+    @staticmethod
+    def head(url, **kwargs):
+        kwargs.setdefault("allow_redirects", False)
+        return request("head", url, **kwargs)
+
+    @staticmethod
+    def post(url, data=None, json=None, **kwargs):
+        return request("post", url, data=data, json=json, **kwargs)
+
+    @staticmethod
+    def put(url, data=None, **kwargs):
+        return request("put", url, data=data, **kwargs)
+
+    @staticmethod
+    def patch(url, data=None, **kwargs):
+        return request("patch", url, data=data, **kwargs)
+
+    @staticmethod
+    def delete(url, **kwargs):
+        return request("delete", url, **kwargs)
+
+def _akshare_modules():
+    return [module for name, module in list(sys.modules.items())
+            if module is not None and (name == "akshare" or name.startswith("akshare."))]
+
+def install():
+    """
+    准备共享连接池和限流器（重复调用无副作用）；之后导入的 akshare 子模块由 bind_akshare() 接入
+
+    Returns:
+        PooledHTTP 实例，连接复用关闭时返回 None
+    """
+    global _pooled, _requests, _proxy, _installed
+
+    with _lock:
+        if not _installed and (ENABLED or rate_limit.limiter is not None):
+            import requests
+
+            if ENABLED:
+                _pooled = PooledHTTP()
+            _requests = requests
+            _proxy = _AkshareRequests(requests)
+            _installed = True
+        return _pooled
+
+def bind_akshare():
+    """
+    让已导入的 akshare 子模块中的 requests.get/post 等经由共享连接池和限流器
+
+    只处理模块全局变量 requests 仍是真正 requests 模块的子模块，重复调用只处理新导入的子模块。
+    """
+    with _lock:
+        if not _installed:
+            return
+        for module in _akshare_modules():
+            if module.__dict__.get("requests") is _requests:
+                module.requests = _proxy
+
+def uninstall():
+    """恢复 akshare 子模块原来的 requests"""
+    global _pooled, _requests, _proxy, _installed
+
+    with _lock:
+        if not _installed:
+            return
+        for module in _akshare_modules():
+            if module.__dict__.get("requests") is _proxy:
+                module.requests = _requests
+        if _pooled is not None:
+            _pooled.adapter.close()
+        _pooled = None
+        _requests = None
+        _proxy = None
+        _installed = False
+
+def get_stats():
+    """连接复用统计，未启用时为 None"""
+    pooled = _pooled
+    return pooled.get_stats() if pooled is not None else None
@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+指数行情查询
+每个指数的日线以按日期排序的 NumPy 数组（date/close/volume/amount）保存在进程内，
+(代码, 日期) -> 涨跌幅/成交量/成交额 只需一次 searchsorted，多个日期一次向量化查询。
+
+- 指定日期没有日线时取之前最近的一个交易日
+- 涨跌幅 = 当日收盘相对前一交易日收盘的变化（%），没有前一交易日时为 0
+- 已收盘日期的日线在进程内复用，不再读取本地存储；当天的日线每次经由 history_store 获取
+"""
+
+import os
+import functools
+import threading
+from collections import OrderedDict
+from datetime import date
+
+import numpy as np
+
+from fetch_executor import run_fetches
+from history_store import get_index_history
+from trade_calendar import resolve_trading_day
+
+# 同时获取的指数数
+LOOKUP_CONCURRENCY = int(os.environ.get("AKSHARE_INDEX_CONCURRENCY", "4"))
+
+def empty_quote():
+    return {"pct_chg": 0, "volume": 0, "amt": 0}
+
+def quote_arrays(history, dates):
+    """
+    向量化查询一个指数在多个日期的行情
+
+    Args:
+        history: IndexHistory
+        dates: 日期数组（可转换为 datetime64[D]）
+
+    Returns:
+        (found, pct_chg, volume, amount)，均为与 dates 等长的数组；found 为 False 的位置没有数据
+    """
+    targets = np.asarray(dates, dtype='datetime64[D]')
+    if not len(history):
+        zeros = np.zeros(len(targets))
+        return np.zeros(len(targets), dtype=bool), zeros, zeros, zeros
+
+    rows = np.searchsorted(history.dates, targets, side='right') - 1
+    found = rows >= 0
+    rows = np.maximum(rows, 0)
+
+    closes = np.asarray(history.columns["close"], dtype='float64')
+    close = closes[rows]
+    prev_close = closes[np.maximum(rows - 1, 0)]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pct_chg = np.where(rows > 0, (close - prev_close) / prev_close * 100, 0.0)
+
+    volume = np.asarray(history.columns["volume"], dtype='float64')[rows]
+    amount = np.asarray(history.columns["amount"], dtype='float64')[rows]
+    # 部分数据源不含成交额
+    amount = np.where(np.isfinite(amount), amount, 0.0)
+    return found, pct_chg, volume, amount
+
+class IndexQuoteService:
+    """
+    指数行情查询服务
+    """
+
+    def __init__(self):
+        self.histories = {}
+        self.lock = threading.Lock()
+
+    def history(self, symbol, end_date):
+        """
+        获取覆盖 end_date 的日线
+
+        end_date 已收盘且进程内的日线已覆盖时直接复用，否则经由 history_store 获取
+        """
+        trading_day = resolve_trading_day(end_date)
+        with self.lock:
+            cached = self.histories.get(symbol)
+        if cached is not None and len(cached) and trading_day < date.today().isoformat() \
+                and cached.last_date >= np.datetime64(trading_day, 'D'):
+            return cached
+
+        history = get_index_history(symbol, end_date)
+        with self.lock:
+            current = self.histories.get(symbol)
+            if current is None or not len(current) or (len(history) and history.last_date >= current.last_date):
+                self.histories[symbol] = history
+        return history
+
+    def quotes(self, symbol, dates):
+        """
+        查询一个指数在多个日期的行情
+
+        Returns:
+            与 dates 对应的字典列表，包含 pct_chg、volume、amt
+        """
+        if not len(dates):
+            return []
+        history = self.history(symbol, max(dates))
+        found, pct_chg, volume, amount = quote_arrays(history, dates)
+        return [
+            {"pct_chg": round(pct, 2), "volume": vol, "amt": amt or 0} if ok else empty_quote()
+            for ok, pct, vol, amt in zip(found.tolist(), pct_chg.tolist(), volume.tolist(), amount.tolist())
+        ]
+
+    def lookup(self, pairs, max_concurrency=None):
+        """
+        批量查询 (指数代码, 日期)
+
+        同一指数只获取一次日线、做一次 searchsorted；不同指数并发获取。
+        某个指数获取失败时，它的每一项都带 error 字段。
+
+        Args:
+            pairs: [(symbol, 'YYYY-MM-DD'), ...]，symbol 如 sh000001
+            max_concurrency: 同时获取的指数数，默认 LOOKUP_CONCURRENCY
+
+        Returns:
+            与 pairs 顺序一致的字典列表
+        """
+        positions = OrderedDict()
+        for i, (symbol, day) in enumerate(pairs):
+            positions.setdefault(symbol, []).append(i)
+
+        calls = OrderedDict(
+            (symbol, functools.partial(self.quotes, symbol, [pairs[i][1] for i in indexes]))
+            for symbol, indexes in positions.items()
+        )
+        fetched = run_fetches(calls, max_concurrency=max_concurrency or LOOKUP_CONCURRENCY)
+
+        results = [None] * len(pairs)
+        for symbol, indexes in positions.items():
+            result = fetched[symbol]
+            if result.ok:
+                quotes = result.value
+            else:
+                quotes = [dict(empty_quote(), error=result.error) for _ in indexes]
+            for i, quote in zip(indexes, quotes):
+                results[i] = quote
+        return results
+
+_service = None
+_service_lock = threading.Lock()
+
+def get_service():
+    """进程内共享的 IndexQuoteService"""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = IndexQuoteService()
+        return _service
@@ -0,0 +1,47 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+本地缓存目录
+默认位于 server/.cache，可通过环境变量 AKSHARE_CACHE_DIR 修改
+"""
+
+import os
+import json
+import threading
+
+CACHE_ROOT = os.environ.get("AKSHARE_CACHE_DIR") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", ".cache"
+)
+
+def cache_path(*parts):
+    """
+    返回缓存目录下的路径，并确保上级目录存在
+
+    Args:
+        parts: 相对于缓存根目录的路径片段
+
+    Returns:
+        绝对路径
+    """
+    path = os.path.abspath(os.path.join(CACHE_ROOT, *parts))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
+
+def read_json(path, default=None):
+    """读取 JSON 文件，不存在或损坏时返回 default"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+def write_json(path, data):
+    """
+    原子写入 JSON 文件（先写临时文件再替换），避免并发读到半个文件
+
+    临时文件名带进程号和线程号，同一进程内多个线程同时写同一个文件时互不覆盖
+    """
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
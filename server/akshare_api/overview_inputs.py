@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+市场概况的输入数据获取（get_market_overview / v2 / v3 共用）
+
+多个上游调用同时进行，共用一个总期限；超过期限的调用被放弃，
+结果中报告每个输入的状态，调用方据此决定是否降级。
+"""
+
+import os
+import functools
+
+from fetch_executor import run_fetches
+from trade_calendar import resolve_trading_day
+
+# 用于估算市场情况的指数
+OVERVIEW_INDICES = ("sh000001", "sz399001")
+
+# 获取输入数据的总期限（秒）
+OVERVIEW_TIMEOUT = float(os.environ.get("AKSHARE_OVERVIEW_TIMEOUT", "120"))
+
+def latest_change_percent(df):
+    """最新一个交易日的日内涨跌幅（收盘相对开盘，%），没有数据时返回 None"""
+    if df is None or df.empty:
+        return None
+    latest = df.iloc[-1]
+    return ((latest['close'] - latest['open']) / latest['open']) * 100
+
+def _index_change(symbol, end_date=None):
+    from history_store import get_index_daily
+
+    change = latest_change_percent(get_index_daily(symbol, end_date=end_date))
+    if change is None:
+        raise ValueError(f"{symbol} 没有日线数据")
+    return change
+
+def fetch_index_changes(symbols=OVERVIEW_INDICES, total_timeout=None, date=None):
+    """
+    同时获取多个指数的最新涨跌幅
+
+    Args:
+        symbols: 指数代码列表
+        total_timeout: 总期限（秒），默认 OVERVIEW_TIMEOUT
+        date: 日期（YYYY-MM-DD），取该日（非交易日取之前最后一个交易日）的日线，None 表示最新
+
+    Returns:
+        (changes, inputs): changes 为按 symbols 顺序获取成功的涨跌幅列表，
+        inputs 为 {代码: {"status", "fetchMs", "error"}}
+    """
+    if total_timeout is None:
+        total_timeout = OVERVIEW_TIMEOUT
+    end_date = resolve_trading_day(date) if date else None
+    calls = {symbol: functools.partial(_index_change, symbol, end_date) for symbol in symbols}
+    results = run_fetches(calls, max_concurrency=len(calls), total_timeout=total_timeout)
+
+    changes = [result.value for result in results.values() if result.ok]
+    inputs = {symbol: result.to_dict() for symbol, result in results.items()}
+    return changes, inputs
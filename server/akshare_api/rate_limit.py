@@ -0,0 +1,253 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+按站点的自适应限流
+
+板块、指数并发获取时东方财富会限流或断开连接，脚本只能退回默认数据。每个站点一个限流器:
+
+- 令牌桶: 限制每秒发出的请求数（rate），允许 burst 个突发
+- AIMD 并发上限: 请求正常时并发上限缓慢增加（每轮约 +1），
+  遇到错误、429/403/5xx 或响应过慢时乘性减小（同一冷却期内只减一次）
+
+所有 akshare HTTP 请求经由 http_session 共享同一组限流器，站点健康时逐步提高吞吐，
+被限流时迅速退让。等待名额的时间不超过调用方的期限（pycommon.resilience.deadline），
+因期限到达而放弃等待时抛出 DeadlineExceeded，而不是 RateLimitTimeout。
+因调用方期限结束的请求（DeadlineExceeded，或超时被截短到剩余时间后超时）不反映站点状况，
+既不减小也不增加并发上限。
+"""
+
+import os
+import sys
+import time
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from pycommon import resilience
+
+# 设置 AKSHARE_RATE_LIMIT=false 关闭限流
+ENABLED = os.environ.get("AKSHARE_RATE_LIMIT", "true") != "false"
+
+# 等待令牌/并发名额的最长时间（秒）
+MAX_WAIT = float(os.environ.get("AKSHARE_RATE_LIMIT_WAIT", "30"))
+
+# 视为被限流的状态码
+THROTTLE_STATUSES = frozenset([403, 429, 500, 502, 503, 504])
+
+# 请求超时时调用方期限剩余不到这么多秒，视为超时由期限截短引起
+DEADLINE_SLACK = 0.05
+
+class RateLimitTimeout(Exception):
+    """等待限流名额超时"""
+
+class HostPolicy:
+    """
+    单个站点的限流参数
+
+    Args:
+        rate: 每秒请求数
+        burst: 令牌桶容量
+        concurrency: 初始并发上限
+        min_concurrency / max_concurrency: 并发上限的范围
+        slow: 超过此耗时（秒）的响应视为过慢
+        cooldown: 乘性减小的冷却期（秒），冷却期内的其他失败不再减小
+    """
+
+    __slots__ = ("rate", "burst", "concurrency", "min_concurrency", "max_concurrency", "slow", "cooldown")
+
+    def __init__(self, rate, burst, concurrency, min_concurrency=1, max_concurrency=16, slow=5.0, cooldown=5.0):
+        self.rate = rate
+        self.burst = burst
+        self.concurrency = concurrency
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.slow = slow
+        self.cooldown = cooldown
+
+# 按域名后缀匹配，越具体的越靠前
+HOST_POLICIES = (
+    ("eastmoney.com", HostPolicy(rate=8, burst=8, concurrency=4, max_concurrency=12, slow=5.0)),
+    ("sina.com.cn", HostPolicy(rate=10, burst=10, concurrency=4, max_concurrency=12, slow=5.0)),
+    ("csindex.com.cn", HostPolicy(rate=5, burst=5, concurrency=2, max_concurrency=6, slow=10.0, cooldown=10.0)),
+)
+DEFAULT_POLICY = HostPolicy(rate=10, burst=10, concurrency=4, max_concurrency=16, slow=10.0, cooldown=10.0)
+
+# 乘性减小的比例
+DECREASE = 0.5
+
+def policy_for(host):
+    for suffix, policy in HOST_POLICIES:
+        if host == suffix or host.endswith("." + suffix):
+            return policy
+    return DEFAULT_POLICY
+
+class HostLimiter:
+    """
+    单个站点的令牌桶 + AIMD 并发上限
+
+    Args:
+        host: 站点域名
+        policy: HostPolicy
+    """
+
+    def __init__(self, host, policy):
+        self.host = host
+        self.policy = policy
+        self.cond = threading.Condition()
+        self.tokens = float(policy.burst)
+        self.refilled_at = time.monotonic()
+        self.limit = float(policy.concurrency)
+        self.in_flight = 0
+        self.decreased_at = 0.0
+        self.stats = {"requests": 0, "ok": 0, "throttled": 0, "errors": 0, "slow": 0,
+                      "cancelled": 0, "timeouts": 0, "waited": 0, "waitMs": 0.0}
+
+    def _refill(self, now):
+        elapsed = now - self.refilled_at
+        if elapsed > 0:
+            self.tokens = min(float(self.policy.burst), self.tokens + elapsed * self.policy.rate)
+            self.refilled_at = now
+
+    def acquire(self, timeout=MAX_WAIT, deadline_bound=False):
+        """
+        等待一个令牌和一个并发名额
+
+        Args:
+            timeout: 最长等待时间（秒）
+            deadline_bound: timeout 是否由调用方的剩余期限决定（而不是 MAX_WAIT）
+
+        Raises:
+            RateLimitTimeout: 超过 timeout 秒仍未获得名额
+            DeadlineExceeded: deadline_bound 时，等到调用方的期限仍未获得名额
+        """
+        started = time.monotonic()
+        deadline = started + timeout
+        with self.cond:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                if self.in_flight < int(self.limit) and self.tokens >= 1:
+                    self.tokens -= 1
+                    self.in_flight += 1
+                    self.stats["requests"] += 1
+                    waited = now - started
+                    if waited > 0.001:
+                        self.stats["waited"] += 1
+                        self.stats["waitMs"] += waited * 1000
+                    return
+                if now >= deadline:
+                    self.stats["timeouts"] += 1
+                    if deadline_bound:
+                        raise resilience.DeadlineExceeded(f"等待 {self.host} 限流名额超过期限")
+                    raise RateLimitTimeout(f"{self.host} 限流等待超过 {timeout:g} 秒")
+                # 缺令牌时等到下一个令牌生成，缺并发名额时等 release 通知
+                wait = deadline - now
+                if self.tokens < 1:
+                    wait = min(wait, (1 - self.tokens) / self.policy.rate)
+                self.cond.wait(wait)
+
+    def release(self, elapsed, status=None, error=False, cancelled=False):
+        """
+        请求结束，按结果调整并发上限
+
+        Args:
+            elapsed: 请求耗时（秒）
+            status: HTTP 状态码，没有响应时为 None
+            error: 是否抛出异常
+            cancelled: 是否因调用方的期限结束，此时不调整并发上限
+        """
+        with self.cond:
+            self.in_flight -= 1
+            if cancelled:
+                self.stats["cancelled"] += 1
+            elif error:
+                self.stats["errors"] += 1
+                self._decrease()
+            elif status in THROTTLE_STATUSES:
+                self.stats["throttled"] += 1
+                self._decrease()
+            elif elapsed > self.policy.slow:
+                self.stats["slow"] += 1
+                self._decrease()
+            else:
+                self.stats["ok"] += 1
+                # 加性增加: 每个并发上限的请求数增加约 1
+                self.limit = min(float(self.policy.max_concurrency), self.limit + 1.0 / self.limit)
+            self.cond.notify_all()
+
+    def _decrease(self):
+        """乘性减小（调用方持有锁）；同一批进行中的请求失败只减一次"""
+        now = time.monotonic()
+        if now - self.decreased_at < self.policy.cooldown:
+            return
+        self.decreased_at = now
+        self.limit = max(float(self.policy.min_concurrency), self.limit * DECREASE)
+
+    def get_stats(self):
+        with self.cond:
+            stats = dict(self.stats)
+            stats["waitMs"] = round(stats["waitMs"], 1)
+            stats["limit"] = round(self.limit, 2)
+            stats["inFlight"] = self.in_flight
+            stats["rate"] = self.policy.rate
+        return stats
+
+def _deadline_caused(error):
+    """异常是否由调用方的期限引起: DeadlineExceeded，或期限已（几乎）用完时的超时"""
+    if isinstance(error, resilience.DeadlineExceeded):
+        return True
+    left = resilience.remaining()
+    if left is None or left > DEADLINE_SLACK:
+        return False
+    if isinstance(error, TimeoutError):
+        return True
+    # requests 的异常只会来自已经导入的 requests，这里不为判断而导入它
+    requests = sys.modules.get("requests")
+    return requests is not None and isinstance(error, requests.exceptions.Timeout)
+
+class RateLimiter:
+    """按站点分配 HostLimiter"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.hosts = {}
+
+    def host(self, host):
+        with self.lock:
+            limiter = self.hosts.get(host)
+            if limiter is None:
+                limiter = HostLimiter(host, policy_for(host))
+                self.hosts[host] = limiter
+            return limiter
+
+    def call(self, host, func):
+        """
+        在 host 的限流下执行 func（返回 requests.Response 的无参可调用对象）
+        """
+        limiter = self.host(host)
+        left = resilience.remaining()
+        if left is not None and left < MAX_WAIT:
+            limiter.acquire(max(0.0, left), deadline_bound=True)
+        else:
+            limiter.acquire(MAX_WAIT)
+        started = time.monotonic()
+        try:
+            response = func()
+        except BaseException as e:
+            if _deadline_caused(e):
+                limiter.release(time.monotonic() - started, cancelled=True)
+            else:
+                limiter.release(time.monotonic() - started, error=True)
+            raise
+        limiter.release(time.monotonic() - started, status=getattr(response, "status_code", None))
+        return response
+
+    def get_stats(self):
+        with self.lock:
+            limiters = list(self.hosts.items())
+        return {host: limiter.get_stats() for host, limiter in limiters}
+
+limiter = RateLimiter() if ENABLED else None
+
+def get_stats():
+    """各站点的限流状态，未启用时为 None"""
+    return limiter.get_stats() if limiter is not None else None
@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+板块成分股映射缓存
+保存 板块名称 -> 成分股代码列表，每天刷新一次
+
+成分股构成在一天内基本不变，缓存后板块统计只需要一份全市场行情快照，
+不必每个板块都调用一次 stock_board_industry_cons_em
+"""
+
+import threading
+from datetime import date
+
+from local_cache import cache_path, read_json, write_json
+
+class MembershipStore:
+    """
+    板块成分股映射（内存 + 磁盘 JSON）
+
+    Args:
+        path: 缓存文件路径，默认 .cache/sector_membership.json
+    """
+
+    def __init__(self, path=None):
+        self.path = path or cache_path("sector_membership.json")
+        self.lock = threading.Lock()
+        self.data = None
+
+    def _load(self):
+        if self.data is None:
+            self.data = read_json(self.path, default=None) or {"asOf": None, "sectors": {}}
+        return self.data
+
+    def get_fresh(self, sector_names, today=None):
+        """
+        获取当天已刷新过的成分股映射
+
+        Args:
+            sector_names: 需要的板块名称列表
+            today: 当天日期字符串，默认系统日期
+
+        Returns:
+            (membership, missing): membership 为 {板块名称: [代码]}，missing 为需要刷新的板块列表
+        """
+        today = today or date.today().isoformat()
+        with self.lock:
+            data = self._load()
+            sectors = data["sectors"] if data.get("asOf") == today else {}
+
+        membership = {}
+        missing = []
+        for name in sector_names:
+            if name in sectors:
+                membership[name] = sectors[name]
+            elif name not in missing:
+                missing.append(name)
+        return membership, missing
+
+    def update(self, membership, today=None):
+        """
+        写入刷新后的成分股映射，跨天时丢弃前一天的映射
+
+        Args:
+            membership: {板块名称: [代码]}
+            today: 当天日期字符串，默认系统日期
+        """
+        if not membership:
+            return
+        today = today or date.today().isoformat()
+        with self.lock:
+            data = self._load()
+            if data.get("asOf") != today:
+                data = {"asOf": today, "sectors": {}}
+            data["sectors"].update(membership)
+            self.data = data
+            write_json(self.path, data)
+
+def codes_from_constituents(constituents_df):
+    """从成分股行情中提取股票代码列表（保持原顺序）"""
+    if constituents_df is None or '代码' not in constituents_df.columns:
+        return None
+    return [str(code) for code in constituents_df['代码'].tolist()]
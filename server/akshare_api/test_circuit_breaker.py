@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+测试熔断器（circuit_breaker.CircuitBreaker）
+用假时钟检查打开、半开时只放行一个探测调用、探测成功关闭和探测失败重新打开
+
+用法:
+    python3 -m pytest test_circuit_breaker.py
+"""
+
+import os
+import sys
+from contextlib import contextmanager
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import circuit_breaker
+from circuit_breaker import CircuitBreaker, CircuitOpenError, CLOSED, OPEN, HALF_OPEN
+from pycommon import resilience
+
+class FakeClock:
+    """代替 time 模块，只在 advance() 时前进"""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+@contextmanager
+def fake_clock():
+    clock = FakeClock()
+    original = circuit_breaker.time
+    circuit_breaker.time = clock
+    try:
+        yield clock
+    finally:
+        circuit_breaker.time = original
+
+def fail():
+    raise ConnectionError("连接被重置")
+
+def call_failing(breaker):
+    try:
+        breaker.call(fail)
+    except ConnectionError:
+        pass
+
+def open_breaker(threshold=3, reset_timeout=30):
+    breaker = CircuitBreaker("stock_zh_a_spot_em", failure_threshold=threshold, reset_timeout=reset_timeout)
+    for _ in range(threshold):
+        call_failing(breaker)
+    assert breaker.state == OPEN, breaker.state
+    return breaker
+
+def test_opens_after_consecutive_failures():
+    """连续失败达到阈值后打开，打开后不再调用上游"""
+    with fake_clock():
+        breaker = CircuitBreaker("f", failure_threshold=3, reset_timeout=30)
+        call_failing(breaker)
+        call_failing(breaker)
+        assert breaker.state == CLOSED
+        breaker.call(lambda: "ok")
+        assert breaker.failures == 0
+        for _ in range(3):
+            call_failing(breaker)
+        assert breaker.state == OPEN
+
+        called = []
+        try:
+            breaker.call(lambda: called.append(1))
+            assert False, "打开时应抛出 CircuitOpenError"
+        except CircuitOpenError as e:
+            assert e.retry_in == 30
+        assert not called
+
+def test_half_open_allows_single_probe():
+    """半开时只放行一个探测调用，探测完成前其他调用被拒绝"""
+    with fake_clock() as clock:
+        breaker = open_breaker()
+        clock.advance(29)
+        try:
+            breaker.before_call()
+            assert False, "未到半开时间应拒绝"
+        except CircuitOpenError:
+            pass
+
+        clock.advance(1)
+        breaker.before_call()
+        assert breaker.state == HALF_OPEN and breaker.probing
+        for _ in range(3):
+            try:
+                breaker.before_call()
+                assert False, "已有探测调用时应拒绝"
+            except CircuitOpenError as e:
+                assert e.retry_in == 0
+
+        breaker.record()
+        assert breaker.state == CLOSED and not breaker.probing
+        assert breaker.call(lambda: "ok") == "ok"
+
+def test_failed_probe_reopens():
+    """探测失败立即重新打开（不需要再次达到阈值），并重新计时"""
+    with fake_clock() as clock:
+        breaker = open_breaker(threshold=3, reset_timeout=30)
+        clock.advance(30)
+        call_failing(breaker)
+        assert breaker.state == OPEN
+        assert breaker.opened_at == clock.now
+        assert breaker.stats["opens"] == 2
+        try:
+            breaker.before_call()
+            assert False, "重新打开后应拒绝"
+        except CircuitOpenError as e:
+            assert e.retry_in == 30
+
+def test_non_upstream_errors_do_not_count():
+    """参数错误和调用方期限到达不计入上游故障；探测调用因期限到达结束时保持半开"""
+    with fake_clock() as clock:
+        breaker = CircuitBreaker("f", failure_threshold=1, reset_timeout=30)
+        for error in (ValueError("参数错误"), KeyError("列不存在")):
+            breaker.before_call()
+            breaker.record(error)
+        assert breaker.state == CLOSED
+
+        breaker = open_breaker(threshold=1)
+        clock.advance(30)
+        breaker.before_call()
+        breaker.record(resilience.DeadlineExceeded("期限已到"))
+        assert breaker.state == HALF_OPEN
+        # 探测名额已释放，下一个调用可以探测
+        breaker.before_call()
+        assert breaker.probing
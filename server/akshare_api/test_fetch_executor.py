@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+测试有界并发抓取执行器（fetch_executor.run_fetches）
+用可控的假调用检查并发上限、单次期限、总期限和期限的传递
+
+用法:
+    python3 -m pytest test_fetch_executor.py
+"""
+
+import os
+import sys
+import time
+import threading
+from collections import OrderedDict
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from fetch_executor import run_fetches
+from pycommon import resilience
+
+def sleeper(seconds, value):
+    """睡眠 seconds 秒后返回 value 的假调用"""
+    def call():
+        time.sleep(seconds)
+        return value
+    return call
+
+def test_results_in_call_order():
+    """结果顺序与 calls 一致，与完成顺序无关"""
+    calls = OrderedDict([("slow", sleeper(0.1, 1)), ("fast", sleeper(0, 2)), ("mid", sleeper(0.05, 3))])
+    results = run_fetches(calls, max_concurrency=3)
+    assert list(results) == ["slow", "fast", "mid"]
+    assert [results[key].value for key in results] == [1, 2, 3]
+    assert all(result.ok for result in results.values())
+
+def test_max_concurrency():
+    """同时进行的调用数不超过 max_concurrency"""
+    lock = threading.Lock()
+    active = [0]
+    peak = [0]
+
+    def call():
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.05)
+        with lock:
+            active[0] -= 1
+        return True
+
+    results = run_fetches(OrderedDict((i, call) for i in range(8)), max_concurrency=2)
+    assert all(result.ok for result in results.values())
+    assert peak[0] == 2, peak[0]
+
+def test_call_timeout_abandons_only_slow_call():
+    """超过单次期限的调用被放弃，其余调用照常完成，不等被放弃的调用结束"""
+    release = threading.Event()
+
+    def stuck():
+        release.wait(5)
+        return "late"
+
+    calls = OrderedDict([("stuck", stuck), ("a", sleeper(0, "a")), ("b", sleeper(0.02, "b"))])
+    started = time.monotonic()
+    try:
+        results = run_fetches(calls, max_concurrency=3, call_timeout=0.2)
+    finally:
+        release.set()
+    elapsed = time.monotonic() - started
+
+    assert results["stuck"].status == "timeout", results["stuck"].status
+    assert results["stuck"].elapsed >= 0.2
+    assert results["a"].ok and results["b"].ok
+    assert elapsed < 1.0, elapsed
+
+def test_total_timeout_abandons_running_and_skips_pending():
+    """总期限到达时，进行中的调用为 timeout，未开始的为 skipped"""
+    calls = OrderedDict((i, sleeper(0.2, i)) for i in range(4))
+    started = time.monotonic()
+    results = run_fetches(calls, max_concurrency=1, total_timeout=0.5)
+    elapsed = time.monotonic() - started
+
+    assert [results[i].status for i in range(4)] == ["ok", "ok", "timeout", "skipped"], \
+        [results[i].status for i in range(4)]
+    assert results[3].elapsed == 0
+    assert elapsed < 0.8, elapsed
+
+def test_deadline_passed_to_call():
+    """调用内可见的期限为单次期限与剩余总期限中更早的一个"""
+    seen = {}
+
+    def call(key):
+        def run():
+            seen[key] = resilience.remaining()
+            return key
+        return run
+
+    run_fetches(OrderedDict([("a", call("a"))]), call_timeout=5, total_timeout=1)
+    assert 0 < seen["a"] <= 1, seen
+    run_fetches(OrderedDict([("b", call("b"))]), call_timeout=0.5, total_timeout=10)
+    assert 0 < seen["b"] <= 0.5, seen
+
+def test_deadline_exceeded_is_timeout():
+    """调用内部因期限抛出 DeadlineExceeded 时记为 timeout，其他异常记为 error"""
+    def expired():
+        raise resilience.DeadlineExceeded("期限已到")
+
+    def broken():
+        raise ValueError("参数错误")
+
+    results = run_fetches(OrderedDict([("expired", expired), ("broken", broken)]))
+    assert results["expired"].status == "timeout"
+    assert results["broken"].status == "error"
+    assert isinstance(results["broken"].exception, ValueError)
+    assert results["broken"].to_dict()["error"] == "参数错误"
@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+测试板块成分股的并发获取和板块统计（get_sectors）
+用假的 akshare 检查 fetch_constituents 的并发、期限和 partial 标记，
+用随机行情检查 summarize_from_spot 与逐个板块的 summarize_constituents 一致
+
+用法:
+    python3 -m pytest test_get_sectors.py
+"""
+
+import os
+import sys
+import time
+import random
+import threading
+from contextlib import contextmanager
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import get_sectors
+from get_sectors import (BoardSnapshot, fetch_constituents, get_sector_data,
+                         summarize_constituents, summarize_from_spot)
+
+class FakeAk:
+    """
+    假的 akshare：stock_board_industry_cons_em 按板块代码返回成分股，
+    delays 中的板块先睡眠，errors 中的板块抛出异常
+    """
+
+    def __init__(self, delays=None, errors=None):
+        self.delays = delays or {}
+        self.errors = errors or {}
+        self.symbols = []
+        self.lock = threading.Lock()
+        self.active = 0
+        self.peak = 0
+
+    def stock_board_industry_cons_em(self, symbol):
+        with self.lock:
+            self.symbols.append(symbol)
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            time.sleep(self.delays.get(symbol, 0.02))
+            if symbol in self.errors:
+                raise self.errors[symbol]
+            return pd.DataFrame({'代码': ['600000'], '名称': [symbol], '涨跌幅': [1.0]})
+        finally:
+            with self.lock:
+                self.active -= 1
+
+@contextmanager
+def fake_ak(**kwargs):
+    fake = FakeAk(**kwargs)
+    original = get_sectors.ak
+    get_sectors.ak = fake
+    try:
+        yield fake
+    finally:
+        get_sectors.ak = original
+
+def make_snapshot(names):
+    """板块代码为 BK + 序号的行情快照"""
+    return BoardSnapshot(pd.DataFrame({
+        '板块名称': names,
+        '板块代码': [f"BK{i:04d}" for i in range(len(names))],
+        '涨跌幅': [0.5] * len(names),
+    }))
+
+def test_fetch_constituents_uses_board_code_and_skips_unknown():
+    """按板块代码获取，快照中没有的板块和重复的板块不获取"""
+    snapshot = make_snapshot(["银行", "证券"])
+    with fake_ak() as fake:
+        fetched = fetch_constituents(snapshot, ["银行", "证券", "银行", "不存在"], max_concurrency=2)
+    assert list(fetched) == ["银行", "证券"]
+    assert sorted(fake.symbols) == ["BK0000", "BK0001"]
+    assert all(result.ok for result in fetched.values())
+
+def test_fetch_constituents_concurrency_limit():
+    """同时获取的板块数不超过并发上限"""
+    names = [f"板块{i}" for i in range(8)]
+    with fake_ak() as fake:
+        fetched = fetch_constituents(make_snapshot(names), names, max_concurrency=3)
+    assert len(fetched) == 8
+    assert fake.peak == 3, fake.peak
+
+def test_slow_and_failed_sectors_are_partial():
+    """超时或失败的板块带 partial 和 error，其余板块照常返回，整体不等慢板块"""
+    names = ["银行", "证券", "保险"]
+    snapshot = make_snapshot(names)
+    with fake_ak(delays={"BK0001": 2}, errors={"BK0002": ConnectionError("连接被重置")}):
+        started = time.monotonic()
+        fetched = fetch_constituents(snapshot, names, max_concurrency=3, call_timeout=0.2)
+        elapsed = time.monotonic() - started
+    assert elapsed < 1.0, elapsed
+
+    ok = get_sector_data("银行", snapshot, fetched, {})
+    assert "partial" not in ok and ok["upCount"] == 1 and ok["fetchMs"] >= 0
+    slow = get_sector_data("证券", snapshot, fetched, {})
+    assert slow["partial"] and fetched["证券"].status == "timeout"
+    assert slow["fetchMs"] >= 200
+    failed = get_sector_data("保险", snapshot, fetched, {})
+    assert failed["partial"] and failed["error"] == "连接被重置"
+    assert failed["changePercent"] == 0.5 and failed["upCount"] == 0
+
+def test_total_timeout_skips_remaining_sectors():
+    """总期限到达后未开始的板块为 skipped，同样带 partial"""
+    names = ["银行", "证券", "保险"]
+    snapshot = make_snapshot(names)
+    with fake_ak(delays={"BK0000": 0.3, "BK0001": 0.3, "BK0002": 0.3}):
+        fetched = fetch_constituents(snapshot, names, max_concurrency=1, total_timeout=0.4)
+    assert [fetched[name].status for name in names] == ["ok", "timeout", "skipped"]
+    assert get_sector_data("保险", snapshot, fetched, {})["partial"]
+
+def test_summarize_from_spot_matches_per_sector():
+    """一次统计所有板块的结果与逐个板块统计一致，包括并列和缺失的涨跌幅"""
+    rng = random.Random(1)
+    codes = [f"{i:06d}" for i in range(200)]
+    pcts = [rng.choice([None, 0.0, round(rng.uniform(-10, 10), 1)]) for _ in codes]
+    spot = pd.DataFrame({'代码': codes, '名称': [f"股票{code}" for code in codes], '涨跌幅': pcts})
+    membership = {f"板块{i}": rng.sample(codes, rng.randint(1, 40)) for i in range(20)}
+    membership["空板块"] = []
+
+    result = summarize_from_spot(spot, membership)
+    by_code = spot.set_index('代码')
+    for name, members in membership.items():
+        constituents = by_code.loc[members].reset_index() if members else pd.DataFrame(columns=['代码', '名称', '涨跌幅'])
+        assert result[name] == summarize_constituents(constituents), name
+
+def test_summarize_from_spot_reports_missing_codes():
+    """行情快照中没有的成分股按 0 计入，并报告个数"""
+    spot = pd.DataFrame({'代码': ['1', '2'], '名称': ['a', 'b'], '涨跌幅': [1.0, -2.0]})
+    result = summarize_from_spot(spot, {"x": ['1', '2', '9'], "y": ['1']})
+    assert result["x"]["missingCount"] == 1
+    assert result["x"]["upCount"] == 1 and result["x"]["downCount"] == 1
+    assert "missingCount" not in result["y"]
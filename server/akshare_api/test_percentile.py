@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+测试分位数计算（pycommon.percentile）
+与逐点遍历的暴力计算对比，包括重复值、NaN 和空历史
+
+用法:
+    python3 -m pytest test_percentile.py
+"""
+
+import os
+import sys
+import random
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from pycommon.percentile import (PercentileIndex, full_history_percentiles, expanding_percentiles,
+                                 trailing_percentiles, prefix_percentiles)
+
+def brute_percentile(value, history):
+    """分位数 = 历史值中 <= 当前值的个数 / 历史值个数 × 100（NaN 计入总数，不计入排名）"""
+    if not len(history):
+        return 0.0
+    if value != value:
+        return 0.0
+    return sum(1 for item in history if item <= value) / len(history) * 100
+
+def random_series(rng, n):
+    """含重复值和 NaN 的随机序列"""
+    values = [round(rng.uniform(-3, 3), 1) for _ in range(n)]
+    for i in rng.sample(range(n), n // 10):
+        values[i] = float('nan')
+    return values
+
+def test_percentile_index():
+    """PercentileIndex 与暴力计算一致"""
+    rng = random.Random(1)
+    for n in (0, 1, 2, 50, 300):
+        history = random_series(rng, n)
+        index = PercentileIndex(history)
+        queries = history + [rng.uniform(-4, 4) for _ in range(20)] + [float('nan')]
+        expected = [brute_percentile(value, history) for value in queries]
+        assert np.allclose(index.percentiles(queries), expected), n
+        for value in queries:
+            assert index.percentile(value) == round(brute_percentile(value, history), 2), (n, value)
+
+def test_full_history_percentiles():
+    """全历史分位数与暴力计算一致"""
+    rng = random.Random(3)
+    for n in (0, 1, 50, 300):
+        values = random_series(rng, n)
+        expected = [brute_percentile(value, values) for value in values]
+        assert np.allclose(full_history_percentiles(values), expected), n
+
+def test_expanding_percentiles():
+    """扩展窗口分位数：每个点只相对它之前（含）的历史"""
+    rng = random.Random(4)
+    for n in (0, 1, 2, 50, 300):
+        values = random_series(rng, n)
+        expected = [brute_percentile(value, values[:i + 1]) for i, value in enumerate(values)]
+        assert np.allclose(expanding_percentiles(values), expected), n
+
+def test_trailing_percentiles_by_periods():
+    """按点数的滚动窗口（含当前点）"""
+    rng = random.Random(5)
+    for n in (0, 1, 50, 300):
+        values = random_series(rng, n)
+        for periods in (1, 3, 60):
+            expected = [brute_percentile(value, values[max(i - periods + 1, 0):i + 1])
+                        for i, value in enumerate(values)]
+            assert np.allclose(trailing_percentiles(values, periods=periods), expected), (n, periods)
+
+def test_trailing_percentiles_by_years():
+    """按年数的滚动窗口为 (日期 - years 年, 日期]，日期间隔不均匀"""
+    rng = random.Random(6)
+    for n in (0, 1, 50, 300):
+        values = random_series(rng, n)
+        days = np.cumsum([rng.randint(1, 60) for _ in range(n)])
+        dates = np.datetime64('2005-01-01') + days.astype('timedelta64[D]')
+        for years in (1, 5, 10):
+            span = np.timedelta64(int(round(years * 365.25)), 'D')
+            expected = [brute_percentile(value, [values[k] for k in range(i + 1) if dates[k] > dates[i] - span])
+                        for i, value in enumerate(values)]
+            assert np.allclose(trailing_percentiles(values, dates=dates, years=years), expected), (n, years)
+
+def test_trailing_percentiles_requires_window():
+    """没有给出窗口时报错"""
+    try:
+        trailing_percentiles([1.0, 2.0], years=5)
+        assert False, "缺少 dates 时应抛出 ValueError"
+    except ValueError:
+        pass
+
+def test_prefix_percentiles():
+    """prefix_percentiles 与逐个查询截取历史后的暴力计算一致"""
+    rng = random.Random(2)
+    for n in (0, 1, 40, 300):
+        history = random_series(rng, n)
+        m = 60
+        lengths = [rng.randint(0, n) for _ in range(m)]
+        values = [round(rng.uniform(-3, 3), 1) for _ in range(m)]
+        values[0] = float('nan')
+        queries = [round(value, 0) for value in values]
+
+        result = prefix_percentiles(history, lengths, values, queries)
+        expected = [brute_percentile(query, history[:length] + [value])
+                    for length, value, query in zip(lengths, values, queries)]
+        assert np.allclose(result, expected), n
+
+        # queries 默认等于 values
+        result = prefix_percentiles(history, lengths, values)
+        expected = [brute_percentile(value, history[:length] + [value])
+                    for length, value in zip(lengths, values)]
+        assert np.allclose(result, expected), n
+
+def test_prefix_percentiles_empty():
+    """没有查询时返回空数组"""
+    assert len(prefix_percentiles([1.0, 2.0], [], [])) == 0
@@ -0,0 +1,180 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+测试按站点的自适应限流（rate_limit）
+用假时钟检查 AIMD 并发上限的加性增加、乘性减小和冷却期，以及令牌桶和等待期限
+
+用法:
+    python3 -m pytest test_rate_limit.py
+"""
+
+import os
+import sys
+import threading
+from contextlib import contextmanager
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import rate_limit
+from rate_limit import HostLimiter, HostPolicy, RateLimiter, RateLimitTimeout
+from pycommon import resilience
+
+class FakeClock:
+    """代替 time 模块，只在 advance() 时前进"""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def monotonic(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+@contextmanager
+def fake_clock():
+    clock = FakeClock()
+    original = rate_limit.time
+    rate_limit.time = clock
+    try:
+        yield clock
+    finally:
+        rate_limit.time = original
+
+def make_limiter(**kwargs):
+    options = dict(rate=100, burst=100, concurrency=2, min_concurrency=1, max_concurrency=4, slow=5.0, cooldown=5.0)
+    options.update(kwargs)
+    return HostLimiter("push2.eastmoney.com", HostPolicy(**options))
+
+def complete(limiter, **result):
+    """发出并结束一个请求"""
+    limiter.acquire(0)
+    limiter.release(result.pop("elapsed", 0.1), **result)
+
+def test_additive_increase():
+    """每个成功的请求让并发上限增加 1/上限，每轮约 +1，不超过 max_concurrency"""
+    with fake_clock():
+        limiter = make_limiter()
+        expected = 2.0
+        for _ in range(5):
+            complete(limiter, status=200)
+            expected = min(4.0, expected + 1.0 / expected)
+            assert abs(limiter.limit - expected) < 1e-9, (limiter.limit, expected)
+        for _ in range(50):
+            complete(limiter, status=200)
+        assert limiter.limit == 4.0
+        assert limiter.stats["ok"] == 55
+
+def test_multiplicative_decrease_with_cooldown():
+    """限流状态码、异常、过慢的响应让上限减半；冷却期内只减一次，不低于 min_concurrency"""
+    with fake_clock() as clock:
+        limiter = make_limiter(concurrency=4, cooldown=2.0, slow=10.0)
+        complete(limiter, status=429)
+        assert limiter.limit == 2.0
+        # 同一批进行中的请求先后失败，冷却期内不再减小
+        complete(limiter, status=503)
+        complete(limiter, error=True)
+        assert limiter.limit == 2.0
+
+        # 冷却期由 cooldown 决定，与判定过慢的 slow 无关
+        clock.advance(2.0)
+        complete(limiter, elapsed=11.0, status=200)
+        assert limiter.limit == 1.0
+        assert limiter.stats["slow"] == 1
+
+        clock.advance(2.0)
+        complete(limiter, error=True)
+        assert limiter.limit == 1.0
+        assert limiter.stats["throttled"] == 2 and limiter.stats["errors"] == 2
+
+def test_token_bucket_refill():
+    """令牌用完后按 rate 补充，补充前的请求等待"""
+    with fake_clock() as clock:
+        limiter = make_limiter(rate=2, burst=2, concurrency=4)
+        complete(limiter, status=200)
+        complete(limiter, status=200)
+        assert limiter.tokens < 1
+        clock.advance(0.5)
+        complete(limiter, status=200)
+        assert limiter.stats["requests"] == 3
+
+def test_wait_timeout_raises_rate_limit_timeout():
+    """没有期限时，等待名额超过上限抛出 RateLimitTimeout"""
+    limiter = make_limiter(concurrency=1)
+    limiter.acquire(0)
+    try:
+        limiter.acquire(0.05)
+        assert False, "没有并发名额时应超时"
+    except RateLimitTimeout:
+        pass
+    assert limiter.stats["timeouts"] == 1
+
+def test_caller_deadline_raises_deadline_exceeded():
+    """调用方的期限先到时抛出 DeadlineExceeded，请求不发出"""
+    limiter = RateLimiter()
+    host = make_limiter(concurrency=1)
+    limiter.hosts[host.host] = host
+    host.acquire(0)
+
+    sent = []
+    with resilience.deadline(0.05):
+        try:
+            limiter.call("push2.eastmoney.com", lambda: sent.append(1))
+            assert False, "期限内拿不到名额时应抛出 DeadlineExceeded"
+        except resilience.DeadlineExceeded:
+            pass
+    assert not sent
+
+def test_deadline_caused_failures_are_neutral():
+    """调用方期限引起的失败不调整并发上限，站点自身的错误仍然减半"""
+    limiter = RateLimiter()
+    host = make_limiter(concurrency=4)
+    limiter.hosts[host.host] = host
+
+    def expired():
+        raise resilience.DeadlineExceeded("期限已到")
+
+    def capped_timeout():
+        # 模拟请求超时被截短到剩余时间：超时发生时期限已经用完
+        while resilience.remaining() > 0:
+            threading.Event().wait(0.01)
+        raise TimeoutError("读取超时")
+
+    for func in (expired, capped_timeout):
+        with resilience.deadline(0.05):
+            try:
+                limiter.call(host.host, func)
+                assert False, "应抛出原来的异常"
+            except TimeoutError:
+                pass
+    assert host.limit == 4.0 and host.in_flight == 0
+    assert host.stats["cancelled"] == 2 and host.stats["errors"] == 0
+
+    # 期限还很宽裕时超时说明站点慢，照常减半
+    def host_timeout():
+        raise TimeoutError("读取超时")
+
+    with resilience.deadline(60):
+        try:
+            limiter.call(host.host, host_timeout)
+            assert False, "应抛出原来的异常"
+        except TimeoutError:
+            pass
+    assert host.limit == 2.0 and host.stats["errors"] == 1
+
+def test_release_wakes_waiter():
+    """请求结束后唤醒等待并发名额的请求"""
+    limiter = make_limiter(concurrency=1)
+    limiter.acquire(0)
+    acquired = threading.Event()
+
+    def waiter():
+        limiter.acquire(5)
+        acquired.set()
+
+    thread = threading.Thread(target=waiter)
+    thread.start()
+    assert not acquired.wait(0.05)
+    limiter.release(0.1, status=200)
+    assert acquired.wait(1)
+    thread.join()
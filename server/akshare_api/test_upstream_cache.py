@@ -0,0 +1,188 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+测试上游数据缓存（upstream_cache.UpstreamCache）
+用假时钟和假上游检查有效期、stale-while-revalidate、同步刷新、熔断回退和按字节数的 LRU 淘汰
+
+用法:
+    python3 -m pytest test_upstream_cache.py
+"""
+
+import os
+import sys
+import threading
+from contextlib import contextmanager
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import upstream_cache
+from upstream_cache import UpstreamCache, CachePolicy
+from circuit_breaker import CircuitOpenError
+
+class FakeClock:
+    """代替 time 模块，只在 advance() 时前进"""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+@contextmanager
+def fake_clock():
+    clock = FakeClock()
+    original = upstream_cache.time
+    upstream_cache.time = clock
+    try:
+        yield clock
+    finally:
+        upstream_cache.time = original
+
+class Upstream:
+    """假上游: 每次调用返回递增的版本号，可以让调用失败或阻塞"""
+
+    def __init__(self):
+        self.calls = 0
+        self.error = None
+        self.gate = None
+
+    def __call__(self):
+        if self.gate is not None:
+            self.gate.wait(5)
+        if self.error is not None:
+            raise self.error
+        self.calls += 1
+        return [self.calls]
+
+class Blob:
+    """estimate_size 按 nbytes 计算大小的值"""
+
+    def __init__(self, nbytes):
+        self.nbytes = nbytes
+
+POLICIES = {"spot": CachePolicy(ttl=10, stale=30)}
+
+def test_fresh_hit():
+    """有效期内直接返回缓存，返回的是副本"""
+    with fake_clock() as clock:
+        cache = UpstreamCache(policies=POLICIES)
+        fetch = Upstream()
+        first = cache.get("spot", ("spot",), fetch)
+        first.append("modified")
+        clock.advance(9)
+        assert cache.get("spot", ("spot",), fetch) == [1]
+        assert fetch.calls == 1
+        assert cache.get_stats()["hits"] == 1
+
+def test_uncached_function_always_fetches():
+    """没有策略的函数不缓存"""
+    cache = UpstreamCache(policies=POLICIES)
+    fetch = Upstream()
+    cache.get("other", ("other",), fetch)
+    cache.get("other", ("other",), fetch)
+    assert fetch.calls == 2
+
+def test_stale_while_revalidate():
+    """容忍期内先返回旧值，后台只刷新一次，刷新完成后返回新值"""
+    with fake_clock() as clock:
+        cache = UpstreamCache(policies=POLICIES, background=True)
+        fetch = Upstream()
+        cache.get("spot", ("spot",), fetch)
+        clock.advance(15)
+
+        fetch.gate = threading.Event()
+        assert cache.get("spot", ("spot",), fetch) == [1]
+        assert cache.get("spot", ("spot",), fetch) == [1]
+        stats = cache.get_stats()
+        assert stats["staleHits"] == 2 and stats["revalidations"] == 1, stats
+
+        fetch.gate.set()
+        for _ in range(100):
+            if cache.entries[("spot",)].value == [2]:
+                break
+            threading.Event().wait(0.01)
+        assert cache.get("spot", ("spot",), fetch) == [2]
+        assert fetch.calls == 2
+
+def test_failed_revalidation_keeps_old_value():
+    """后台刷新失败时保留旧值，并允许下一次刷新"""
+    with fake_clock() as clock:
+        cache = UpstreamCache(policies=POLICIES, background=True)
+        fetch = Upstream()
+        cache.get("spot", ("spot",), fetch)
+        clock.advance(15)
+
+        fetch.error = ConnectionError("连接被重置")
+        assert cache.get("spot", ("spot",), fetch) == [1]
+        entry = cache.entries[("spot",)]
+        for _ in range(100):
+            if not entry.refreshing:
+                break
+            threading.Event().wait(0.01)
+        assert not entry.refreshing
+        assert cache.get_stats()["revalidateErrors"] == 1
+
+        fetch.error = None
+        cache.get("spot", ("spot",), fetch)
+        assert cache.get_stats()["revalidations"] == 2
+
+def test_stale_refreshes_synchronously_without_background():
+    """未开启后台刷新（一次性脚本）时容忍期内同步获取，失败时返回旧值"""
+    with fake_clock() as clock:
+        cache = UpstreamCache(policies=POLICIES)
+        fetch = Upstream()
+        cache.get("spot", ("spot",), fetch)
+        clock.advance(15)
+        assert cache.get("spot", ("spot",), fetch) == [2]
+
+        clock.advance(15)
+        fetch.error = ConnectionError("连接被重置")
+        assert cache.get("spot", ("spot",), fetch) == [2]
+        stats = cache.get_stats()
+        assert stats["revalidations"] == 2 and stats["revalidateErrors"] == 1, stats
+
+def test_expired_fetches_and_breaker_falls_back():
+    """超过容忍期同步获取；熔断器打开时返回最后一次的值"""
+    with fake_clock() as clock:
+        cache = UpstreamCache(policies=POLICIES, background=True)
+        fetch = Upstream()
+        cache.get("spot", ("spot",), fetch)
+        clock.advance(41)
+        assert cache.get("spot", ("spot",), fetch) == [2]
+
+        clock.advance(41)
+        fetch.error = CircuitOpenError("spot", 30)
+        assert cache.get("spot", ("spot",), fetch) == [2]
+        assert cache.get_stats()["breakerFallbacks"] == 1
+
+        try:
+            cache.get("spot", ("spot", "other"), fetch)
+            assert False, "没有缓存时应抛出 CircuitOpenError"
+        except CircuitOpenError:
+            pass
+
+def test_lru_byte_eviction():
+    """超过字节上限时淘汰最久未使用的值，超过上限的单个值不进入内存层"""
+    policies = {"daily": CachePolicy(ttl=60)}
+    cache = UpstreamCache(policies=policies, max_bytes=250)
+    for name in ("a", "b"):
+        cache.get("daily", name, lambda: Blob(100))
+    # 访问 a 后 b 成为最久未使用的
+    cache.get("daily", "a", lambda: Blob(100))
+    cache.get("daily", "c", lambda: Blob(100))
+    assert list(cache.entries) == ["a", "c"], list(cache.entries)
+    stats = cache.get_stats()
+    assert stats["bytes"] == 200 and stats["evictions"] == 1, stats
+
+    cache.get("daily", "huge", lambda: Blob(300))
+    assert "huge" not in cache.entries
+    assert cache.get_stats()["bytes"] == 200
+
+    # 替换已有的值时先减去旧值的大小，再按新值淘汰
+    cache.entries["a"].fetched_at = 0
+    cache.get("daily", "a", lambda: Blob(160))
+    assert list(cache.entries) == ["a"], list(cache.entries)
+    assert cache.get_stats()["bytes"] == 160
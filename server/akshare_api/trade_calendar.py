@@ -0,0 +1,232 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+A 股交易日历
+基于 ak.tool_trade_date_hist_sina，按日期字符串（YYYY-MM-DD）排序保存，用 bisect 查找
+
+- previous: 之前最后一个交易日
+- next: 之后第一个交易日
+- nearest: 最近的交易日（距离相同时取之前的）
+
+日历只在进程内保存一份，当天获取的日历另以 JSON 保存在本地缓存目录（trade_calendar.json），
+同一天的一次性脚本直接读取，不需要导入 akshare/pandas。获取失败或日期超出日历范围时，
+按周一至周五近似（不考虑节假日），调用方不会因为日历不可用而失败。
+
+用法:
+    python3 trade_calendar.py previous|next|nearest|is_trading_day 2024-01-15
+"""
+
+import sys
+import json
+import time
+import bisect
+import threading
+from datetime import date, datetime, timedelta
+
+from upstream import ak
+from local_cache import cache_path, read_json, write_json
+
+# 获取失败后多少秒内不再重试
+RETRY_AFTER = 60
+
+def _to_str(value):
+    """把 date/datetime/Timestamp/字符串统一为 YYYY-MM-DD"""
+    if isinstance(value, str):
+        return value[:10]
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d')
+    if isinstance(value, date):
+        return value.isoformat()
+    return str(value)[:10]
+
+def _parse(value):
+    return datetime.strptime(_to_str(value), '%Y-%m-%d').date()
+
+class TradingCalendar:
+    """
+    交易日历
+
+    Args:
+        days: 交易日列表（任意顺序，可以是 date 或字符串）
+    """
+
+    def __init__(self, days):
+        self.days = sorted({_to_str(day) for day in days})
+
+    def __len__(self):
+        return len(self.days)
+
+    @property
+    def first(self):
+        return self.days[0] if self.days else None
+
+    @property
+    def last(self):
+        return self.days[-1] if self.days else None
+
+    def covers(self, day):
+        """日期是否在日历范围内"""
+        day = _to_str(day)
+        return bool(self.days) and self.first <= day <= self.last
+
+    def is_trading_day(self, day):
+        day = _to_str(day)
+        i = bisect.bisect_left(self.days, day)
+        return i < len(self.days) and self.days[i] == day
+
+    def previous(self, day, inclusive=False):
+        """day 之前（inclusive 时含 day）最后一个交易日，没有时返回 None"""
+        day = _to_str(day)
+        i = bisect.bisect_right(self.days, day) if inclusive else bisect.bisect_left(self.days, day)
+        return self.days[i - 1] if i > 0 else None
+
+    def next(self, day, inclusive=False):
+        """day 之后（inclusive 时含 day）第一个交易日，没有时返回 None"""
+        day = _to_str(day)
+        i = bisect.bisect_left(self.days, day) if inclusive else bisect.bisect_right(self.days, day)
+        return self.days[i] if i < len(self.days) else None
+
+    def between(self, start, end):
+        """[start, end] 内的全部交易日"""
+        lo = bisect.bisect_left(self.days, _to_str(start))
+        hi = bisect.bisect_right(self.days, _to_str(end))
+        return self.days[lo:hi]
+
+    def nearest(self, day):
+        """最近的交易日，距离相同时取之前的"""
+        before = self.previous(day, inclusive=True)
+        after = self.next(day, inclusive=True)
+        if before is None or after is None:
+            return before or after
+        target = _parse(day)
+        if (target - _parse(before)) <= (_parse(after) - target):
+            return before
+        return after
+
+_calendar = None
+_loaded_on = None
+_failed_at = 0.0
+_lock = threading.Lock()
+
+def get_calendar():
+    """
+    进程内共享的交易日历，每天最多重新获取一次（新浪在年底前后发布下一年的日历）
+
+    获取失败时返回上一次的日历或 None，RETRY_AFTER 秒内不重试
+    """
+    global _calendar, _loaded_on, _failed_at
+    with _lock:
+        today = date.today().isoformat()
+        if _calendar is not None and _loaded_on == today:
+            return _calendar
+        if time.time() - _failed_at < RETRY_AFTER:
+            return _calendar
+        path = cache_path("trade_calendar.json")
+        stored = read_json(path)
+        if isinstance(stored, dict) and stored.get("loadedOn") == today and stored.get("days"):
+            _calendar = TradingCalendar(stored["days"])
+            _loaded_on = today
+            return _calendar
+        try:
+            df = ak.tool_trade_date_hist_sina()
+            _calendar = TradingCalendar(df['trade_date'].tolist())
+            _loaded_on = today
+            _save(path, _calendar, today)
+        except Exception as e:
+            _failed_at = time.time()
+            print(f"Warning: 获取交易日历失败，按工作日近似: {e}", file=sys.stderr)
+        return _calendar
+
+def _save(path, calendar, today):
+    try:
+        write_json(path, {"loadedOn": today, "days": calendar.days})
+    except OSError as e:
+        print(f"Warning: 保存交易日历失败: {e}", file=sys.stderr)
+
+def _weekday_step(day, step, inclusive):
+    """不考虑节假日，按周一至周五近似"""
+    current = _parse(day)
+    if not (inclusive and current.weekday() < 5):
+        current += timedelta(days=step)
+        while current.weekday() >= 5:
+            current += timedelta(days=step)
+    return current.isoformat()
+
+def previous_trading_day(day, inclusive=False):
+    """
+    day 之前（inclusive 时含 day）最后一个交易日（YYYY-MM-DD）
+
+    日历不可用或超出范围时按工作日近似
+    """
+    calendar = get_calendar()
+    if calendar is not None and calendar.covers(day):
+        result = calendar.previous(day, inclusive)
+        if result is not None:
+            return result
+    return _weekday_step(day, -1, inclusive)
+
+def next_trading_day(day, inclusive=False):
+    """day 之后（inclusive 时含 day）第一个交易日（YYYY-MM-DD）"""
+    calendar = get_calendar()
+    if calendar is not None and calendar.covers(day):
+        result = calendar.next(day, inclusive)
+        if result is not None:
+            return result
+    return _weekday_step(day, 1, inclusive)
+
+def nearest_trading_day(day):
+    """最近的交易日（YYYY-MM-DD），距离相同时取之前的"""
+    calendar = get_calendar()
+    if calendar is not None and calendar.covers(day):
+        return calendar.nearest(day)
+    before = _weekday_step(day, -1, True)
+    after = _weekday_step(day, 1, True)
+    target = _parse(day)
+    return before if (target - _parse(before)) <= (_parse(after) - target) else after
+
+def is_trading_day(day):
+    """是否为交易日，日历不可用时按工作日近似"""
+    calendar = get_calendar()
+    if calendar is not None and calendar.covers(day):
+        return calendar.is_trading_day(day)
+    return _parse(day).weekday() < 5
+
+def trading_days_between(start, end):
+    """
+    [start, end] 内的全部交易日（YYYY-MM-DD 列表）
+
+    日历不可用或区间超出日历范围时按工作日近似
+    """
+    calendar = get_calendar()
+    if calendar is not None and calendar.covers(start) and calendar.covers(end):
+        return calendar.between(start, end)
+    days = []
+    current, last = _parse(start), _parse(end)
+    while current <= last:
+        if current.weekday() < 5:
+            days.append(current.isoformat())
+        current += timedelta(days=1)
+    return days
+
+def resolve_trading_day(day):
+    """
+    把请求日期落到当天或之前最后一个交易日（非交易日取前一个交易日）
+
+    Args:
+        day: 日期（YYYY-MM-DD），None 表示今天
+    """
+    return previous_trading_day(day or date.today().isoformat(), inclusive=True)
+
+LOOKUPS = {
+    "previous": previous_trading_day,
+    "next": next_trading_day,
+    "nearest": nearest_trading_day,
+    "is_trading_day": is_trading_day,
+}
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or sys.argv[1] not in LOOKUPS:
+        print(json.dumps({"error": f"参数不足，需要: {'|'.join(LOOKUPS)} date"}))
+        sys.exit(1)
+
+    print(json.dumps(LOOKUPS[sys.argv[1]](sys.argv[2]), ensure_ascii=False))
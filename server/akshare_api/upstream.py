@@ -0,0 +1,270 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+akshare 上游调用入口
+
+所有脚本通过 `from upstream import ak` 调用 akshare，用法与 `import akshare as ak` 相同:
+
+    df = ak.stock_zh_a_spot_em()
+
+- 缓存: 按数据集的有效期缓存结果，过期后同步刷新，常驻工作进程中先返回旧值再后台刷新（见 upstream_cache）
+- single-flight: 参数相同的并发调用只向上游发起一次，其余调用等待并共享结果
+  （例如缓存预加载和用户请求同时获取 stock_zh_index_daily('sh000300')）
+
+返回的 DataFrame 是每个调用方各自的副本，调用方可以随意修改。
+
+- 连接复用与限流: akshare 的 HTTP 请求经由共享的 keep-alive 连接池和按站点的限流器
+  （见 http_session、rate_limit）
+- 重试: 连接失败、超时等可重试的错误按指数退避重试，不超过调用方的期限（见 pycommon.resilience）
+- 熔断: 某个函数连续失败后直接抛出 CircuitOpenError，有缓存时返回最后一次的值（见 circuit_breaker）
+
+akshare 在第一次实际发出上游调用时才导入，并且只导入被调用函数所在的子模块（见 akshare_loader，
+AKSHARE_LAZY_IMPORT=false 时导入完整的 akshare）；缓存命中的调用不导入 akshare。UPSTREAM_MODE=record/replay 时录制或回放每次调用的结果
+（见 pycommon.recorder），回放时不导入 akshare，也不写缓存的磁盘层。
+SCRIPT_TIMINGS 开启时每次实际发出的上游调用记为 upstream.<函数名> 阶段，其中第一次调用时的子模块导入
+另记为 import.akshare 阶段（见 pycommon.timings）。
+"""
+
+import os
+import sys
+import functools
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from pycommon import resilience, timings
+from pycommon.recorder import Recorder
+
+import http_session
+import rate_limit
+import akshare_loader
+import circuit_breaker
+import upstream_cache
+from upstream_cache import UpstreamCache, private_copy
+
+class _Call:
+    """进行中的一次上游调用"""
+
+    __slots__ = ("done", "value", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+        self.waiters = 0
+
+class SingleFlight:
+    """
+    相同 key 的并发调用合并为一次
+
+    Attributes:
+        stats: calls（总调用数）、upstream（实际发起数）、deduplicated（合并掉的调用数）、errors
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.in_flight = {}
+        self.stats = {"calls": 0, "upstream": 0, "deduplicated": 0, "errors": 0}
+        self.by_function = {}
+
+    def _count(self, name, field):
+        self.stats[field] += 1
+        counters = self.by_function.setdefault(name, {"calls": 0, "upstream": 0, "deduplicated": 0, "errors": 0})
+        counters[field] += 1
+
+    def do(self, key, func, name=None):
+        """
+        执行 func，key 相同的调用正在进行时等待它的结果
+
+        Args:
+            key: 调用标识（可哈希）
+            func: 无参可调用对象
+            name: 统计用的函数名
+        """
+        name = name or str(key)
+        with self.lock:
+            self._count(name, "calls")
+            call = self.in_flight.get(key)
+            if call is not None:
+                call.waiters += 1
+                self._count(name, "deduplicated")
+                leader = False
+            else:
+                call = _Call()
+                self.in_flight[key] = call
+                self._count(name, "upstream")
+                leader = True
+
+        if not leader:
+            # 最多等到自己的期限
+            left = resilience.remaining()
+            if not call.done.wait(None if left is None else max(0.0, left)):
+                raise resilience.DeadlineExceeded(f"等待 {name} 超过期限")
+            if call.error is not None:
+                raise call.error
+            return private_copy(call.value)
+
+        try:
+            call.value = func()
+        except BaseException as e:
+            call.error = e
+        finally:
+            # 先移出 in_flight，之后到来的调用会重新发起
+            with self.lock:
+                del self.in_flight[key]
+                shared = call.waiters > 0
+                if call.error is not None:
+                    self._count(name, "errors")
+            call.done.set()
+
+        if call.error is not None:
+            raise call.error
+        # 有其他调用方共享时，原对象只作为复制的来源，不交给任何调用方
+        return private_copy(call.value) if shared else call.value
+
+    def get_stats(self):
+        """统计数据（含按函数的明细）"""
+        with self.lock:
+            stats = dict(self.stats)
+            stats["inFlight"] = len(self.in_flight)
+            stats["byFunction"] = {name: dict(counters) for name, counters in self.by_function.items()}
+        return stats
+
+# 上游调用的重试策略（HTTP 连接池不重试，这里是唯一的重试）
+RETRY_POLICY = resilience.RetryPolicy(attempts=3, base=0.5, cap=2.0)
+
+def _call_key(name, args, kwargs):
+    key = (name, args, tuple(sorted(kwargs.items())))
+    try:
+        hash(key)
+        return key
+    except TypeError:
+        return (name, repr(args), repr(sorted(kwargs.items())))
+
+class AkshareProxy:
+    """
+    akshare 模块的代理，函数调用经过缓存、single-flight、熔断和重试
+
+    Args:
+        flight: SingleFlight 实例
+        cache: UpstreamCache 实例，None 表示不缓存
+        breakers: circuit_breaker.BreakerRegistry 实例，None 表示不熔断
+        recorder: pycommon.recorder.Recorder 实例，None 表示直接调用上游
+    """
+
+    def __init__(self, flight, cache=None, breakers=None, recorder=None):
+        self._flight = flight
+        self._cache = cache
+        self._breakers = breakers
+        self._recorder = recorder
+        self._loader = akshare_loader.loader
+        self._wrappers = {}
+
+    def _akshare(self):
+        """导入完整的 akshare"""
+        http_session.install()
+        module = self._loader.load_all()
+        http_session.bind_akshare()
+        return module
+
+    def _resolve(self, name):
+        """只导入 name 所在的子模块"""
+        http_session.install()
+        target = self._loader.resolve(name)
+        http_session.bind_akshare()
+        return target
+
+    def _target(self, name):
+        """
+        上游函数；索引中有这个名字时推迟到第一次实际调用时再导入
+
+        Returns:
+            (可调用对象, 不可调用时的属性值)
+        """
+        if self._loader.is_exported(name):
+            resolved = []
+
+            def target(*args, **kwargs):
+                if not resolved:
+                    with timings.span("import.akshare", function=name):
+                        resolved.append(self._resolve(name))
+                return resolved[0](*args, **kwargs)
+            return target, None
+
+        value = getattr(self._akshare(), name)
+        if not callable(value):
+            return None, value
+        return value, None
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        wrapper = self._wrappers.get(name)
+        if wrapper is not None:
+            return wrapper
+
+        recorder = self._recorder
+        if recorder is not None and recorder.replaying:
+            target = recorder.wrap(name, None)
+        else:
+            target, value = self._target(name)
+            if target is None:
+                return value
+            if recorder is not None:
+                target = recorder.wrap(name, target)
+
+        flight = self._flight
+        cache = self._cache
+        breaker = self._breakers.get(name) if self._breakers is not None else None
+
+        def wrapper(*args, **kwargs):
+            key = _call_key(name, args, kwargs)
+
+            def call_upstream():
+                upstream_call = functools.partial(target, *args, **kwargs)
+                retried = functools.partial(resilience.call, upstream_call, policy=RETRY_POLICY, name=name)
+                with timings.span(f"upstream.{name}"):
+                    return breaker.call(retried) if breaker is not None else retried()
+
+            def fetch():
+                return flight.do(key, call_upstream, name=name)
+
+            if cache is None:
+                return fetch()
+            return cache.get(name, key, fetch)
+
+        wrapper.__name__ = name
+        self._wrappers[name] = wrapper
+        return wrapper
+
+recorder = Recorder("akshare")
+flight = SingleFlight()
+cache = None
+if upstream_cache.ENABLED:
+    # 回放时不读写磁盘层，结果只由录制文件决定
+    use_disk = upstream_cache.DISK_ENABLED and not recorder.replaying
+    cache = UpstreamCache(disk_root=upstream_cache.default_disk_root() if use_disk else None)
+ak = AkshareProxy(flight, cache, circuit_breaker.registry, recorder)
+
+def preload():
+    """立即导入完整的 akshare（常驻进程启动时调用，避免第一个请求承担导入开销）"""
+    if not recorder.replaying:
+        ak._akshare()
+
+def get_stats():
+    """
+    上游调用统计: single-flight 合并情况，cache 字段为缓存命中情况，
+    http 字段为连接复用情况，rateLimit 字段为各站点的限流状态，breakers 字段为熔断器状态
+    """
+    stats = flight.get_stats()
+    if cache is not None:
+        stats["cache"] = cache.get_stats()
+    http_stats = http_session.get_stats()
+    if http_stats is not None:
+        stats["http"] = http_stats
+    rate_stats = rate_limit.get_stats()
+    if rate_stats is not None:
+        stats["rateLimit"] = rate_stats
+    stats["breakers"] = circuit_breaker.get_states()
+    if recorder.recording or recorder.replaying:
+        stats["recorder"] = recorder.get_stats()
+    return stats
@@ -0,0 +1,306 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+akshare 上游数据缓存（stale-while-revalidate）
+
+每个数据集有自己的有效期:
+- 未过期（age < ttl）: 直接返回缓存
+- 已过期但在容忍期内（age < ttl + stale）: 返回旧值，同时在后台刷新
+- 超过容忍期或没有缓存: 同步获取
+
+后台刷新只在常驻工作进程中开启（background=True）。一次性脚本返回后进程就退出，
+后台线程来不及完成，所以容忍期内也同步获取，获取失败时才返回旧值。
+
+内存层是按字节数限制的 LRU，超过上限时淘汰最久未使用的数据；
+按天变化的数据集另有磁盘层（pickle），一次性脚本和重启后的工作进程也能命中。
+没有配置策略的函数不缓存。
+
+上游的熔断器打开（CircuitOpenError）时，即使缓存已超过容忍期也返回最后一次的值，
+不让调用方立即失败。
+"""
+
+import os
+import sys
+import copy
+import time
+import pickle
+import hashlib
+import threading
+from collections import OrderedDict
+
+from local_cache import cache_path
+from circuit_breaker import CircuitOpenError
+
+class CachePolicy:
+    """
+    单个数据集的缓存策略
+
+    Args:
+        ttl: 有效期（秒）
+        stale: 过期后仍可返回旧值并后台刷新的时长（秒）
+        disk: 是否写入磁盘层
+    """
+
+    __slots__ = ("ttl", "stale", "disk")
+
+    def __init__(self, ttl, stale=0, disk=False):
+        self.ttl = ttl
+        self.stale = stale
+        self.disk = disk
+
+MINUTE = 60
+HOUR = 60 * MINUTE
+DAY = 24 * HOUR
+
+# 各数据集的缓存策略
+POLICIES = {
+    # 盘中行情快照，几秒就过时
+    "stock_zh_a_spot_em": CachePolicy(ttl=15, stale=45),
+    "stock_zh_a_spot": CachePolicy(ttl=15, stale=45),
+    "stock_board_industry_name_em": CachePolicy(ttl=15, stale=45),
+    # 板块成分股一天内基本不变，行情字段由快照提供
+    "stock_board_industry_cons_em": CachePolicy(ttl=MINUTE, stale=5 * MINUTE),
+    # 指数日线：已收盘的部分不会变化（由 history_store 持久化），只有当天的日线在变
+    "stock_zh_index_daily": CachePolicy(ttl=MINUTE, stale=5 * MINUTE),
+    "stock_zh_index_daily_em": CachePolicy(ttl=MINUTE, stale=5 * MINUTE),
+    # 每天更新一次的数据
+    "bond_zh_us_rate": CachePolicy(ttl=HOUR, stale=DAY, disk=True),
+    "stock_zh_index_value_csindex": CachePolicy(ttl=HOUR, stale=DAY, disk=True),
+    "stock_index_pb_lg": CachePolicy(ttl=HOUR, stale=DAY, disk=True),
+    "tool_trade_date_hist_sina": CachePolicy(ttl=DAY, stale=7 * DAY, disk=True),
+}
+
+# 设置 AKSHARE_UPSTREAM_CACHE=false 关闭缓存（single-flight 仍然生效）
+ENABLED = os.environ.get("AKSHARE_UPSTREAM_CACHE", "true") != "false"
+
+# 设置 AKSHARE_UPSTREAM_DISK_CACHE=false 关闭磁盘层
+DISK_ENABLED = os.environ.get("AKSHARE_UPSTREAM_DISK_CACHE", "true") != "false"
+
+# 内存层上限（字节）
+MAX_BYTES = int(os.environ.get("AKSHARE_UPSTREAM_CACHE_BYTES", str(256 * 1024 * 1024)))
+
+def estimate_size(value):
+    """估算缓存值占用的字节数"""
+    memory_usage = getattr(value, "memory_usage", None)
+    if memory_usage is not None:
+        try:
+            return int(memory_usage(index=True, deep=True).sum())
+        except TypeError:
+            pass
+    nbytes = getattr(value, "nbytes", None)
+    if isinstance(nbytes, int):
+        return nbytes
+    try:
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return sys.getsizeof(value)
+
+def private_copy(value):
+    """DataFrame 等可变结果复制一份，避免共享同一对象的调用方互相影响"""
+    if hasattr(value, "copy"):
+        try:
+            return value.copy()
+        except TypeError:
+            pass
+    return copy.copy(value)
+
+class _Entry:
+    __slots__ = ("value", "size", "fetched_at", "refreshing")
+
+    def __init__(self, value, size, fetched_at):
+        self.value = value
+        self.size = size
+        self.fetched_at = fetched_at
+        self.refreshing = False
+
+class UpstreamCache:
+    """
+    按数据集策略缓存上游调用结果
+
+    Args:
+        policies: {函数名: CachePolicy}
+        max_bytes: 内存层上限（字节）
+        disk_root: 磁盘层目录，None 表示不使用磁盘层
+        background: 容忍期内是否先返回旧值再后台刷新，False 时同步获取
+    """
+
+    def __init__(self, policies=None, max_bytes=MAX_BYTES, disk_root=None, background=False):
+        self.policies = POLICIES if policies is None else policies
+        self.max_bytes = max_bytes
+        self.disk_root = disk_root
+        self.background = background
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.stats = {"hits": 0, "staleHits": 0, "misses": 0, "diskHits": 0, "breakerFallbacks": 0,
+                      "revalidations": 0, "revalidateErrors": 0, "evictions": 0}
+
+    def policy(self, name):
+        return self.policies.get(name)
+
+    def get(self, name, key, fetch):
+        """
+        获取 name 数据集中 key 对应的值
+
+        Args:
+            name: akshare 函数名（决定缓存策略）
+            key: 调用标识（函数名 + 参数）
+            fetch: 无参可调用对象，从上游获取数据
+
+        Returns:
+            值的副本
+        """
+        policy = self.policy(name)
+        if policy is None:
+            return fetch()
+
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+
+        if entry is None and policy.disk:
+            entry = self._load_disk(name, key)
+
+        if entry is not None:
+            age = now - entry.fetched_at
+            if age < policy.ttl:
+                self._count("hits")
+                return private_copy(entry.value)
+            if age < policy.ttl + policy.stale:
+                if self.background:
+                    self._count("staleHits")
+                    self._revalidate(name, key, entry, fetch)
+                    return private_copy(entry.value)
+                return self._refresh(name, key, entry, fetch)
+
+        self._count("misses")
+        try:
+            value = fetch()
+        except CircuitOpenError:
+            if entry is None:
+                raise
+            # 上游熔断中，返回最后一次的值
+            self._count("breakerFallbacks")
+            return private_copy(entry.value)
+        self._store(name, key, value, time.time())
+        return private_copy(value)
+
+    def _count(self, field):
+        with self.lock:
+            self.stats[field] += 1
+
+    def _refresh(self, name, key, entry, fetch):
+        """同步刷新容忍期内的数据，获取失败时返回旧值"""
+        with self.lock:
+            self.stats["revalidations"] += 1
+        try:
+            value = fetch()
+        except Exception as e:
+            self._count("revalidateErrors")
+            print(f"Warning: 刷新 {name} 失败，使用旧值: {e}", file=sys.stderr)
+            return private_copy(entry.value)
+        self._store(name, key, value, time.time())
+        return private_copy(value)
+
+    def _revalidate(self, name, key, entry, fetch):
+        """后台刷新过期的数据，同一时间每个 key 只刷新一次"""
+        with self.lock:
+            if entry.refreshing:
+                return
+            entry.refreshing = True
+            self.stats["revalidations"] += 1
+
+        def run():
+            try:
+                value = fetch()
+            except Exception as e:
+                # 刷新失败时保留旧值，超过容忍期后由请求同步获取
+                with self.lock:
+                    entry.refreshing = False
+                    self.stats["revalidateErrors"] += 1
+                print(f"Warning: 后台刷新 {name} 失败: {e}", file=sys.stderr)
+                return
+            self._store(name, key, value, time.time())
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def _store(self, name, key, value, fetched_at):
+        """写入内存层（按字节数淘汰），需要时写入磁盘层"""
+        size = estimate_size(value)
+        entry = _Entry(value, size, fetched_at)
+        with self.lock:
+            self._put(key, entry)
+
+        policy = self.policy(name)
+        if policy is not None and policy.disk:
+            self._save_disk(name, key, entry)
+
+    def _put(self, key, entry):
+        """写入内存层（调用方持有锁）"""
+        old = self.entries.pop(key, None)
+        if old is not None:
+            self.bytes -= old.size
+        if entry.size > self.max_bytes:
+            # 单个值超过上限，不进入内存层
+            return
+        self.entries[key] = entry
+        self.bytes += entry.size
+        while self.bytes > self.max_bytes and self.entries:
+            _, evicted = self.entries.popitem(last=False)
+            self.bytes -= evicted.size
+            self.stats["evictions"] += 1
+
+    def _disk_path(self, name, key):
+        digest = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+        return os.path.join(self.disk_root, name, f"{digest}.pkl")
+
+    def _load_disk(self, name, key):
+        if self.disk_root is None:
+            return None
+        path = self._disk_path(name, key)
+        try:
+            with open(path, "rb") as f:
+                stored_key, fetched_at, value = pickle.load(f)
+        except (OSError, EOFError, ValueError, pickle.UnpicklingError, ImportError, AttributeError):
+            return None
+        if stored_key != repr(key):
+            return None
+
+        entry = _Entry(value, estimate_size(value), fetched_at)
+        with self.lock:
+            self.stats["diskHits"] += 1
+            self._put(key, entry)
+        return entry
+
+    def _save_disk(self, name, key, entry):
+        if self.disk_root is None:
+            return
+        path = self._disk_path(name, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                pickle.dump((repr(key), entry.fetched_at, entry.value), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except (OSError, pickle.PicklingError) as e:
+            print(f"Warning: 写入磁盘缓存 {name} 失败: {e}", file=sys.stderr)
+
+    def clear(self):
+        """清空内存层"""
+        with self.lock:
+            self.entries.clear()
+            self.bytes = 0
+
+    def get_stats(self):
+        with self.lock:
+            stats = dict(self.stats)
+            stats["entries"] = len(self.entries)
+            stats["bytes"] = self.bytes
+            stats["maxBytes"] = self.max_bytes
+        return stats
+
+def default_disk_root():
+    """磁盘层目录 .cache/upstream"""
+    return os.path.dirname(cache_path("upstream", "_"))
@@ -0,0 +1,199 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+AKShare 常驻工作进程
+只导入一次 akshare/pandas，通过 stdin/stdout 上的 JSON-RPC 提供数据接口，
+避免每个请求都重新启动解释器并导入 akshare
+
+协议（每行一个 JSON 对象）:
+    请求: {"id": 1, "method": "get_sectors_data", "params": ["2024-01-15"]}
+    成功: {"id": 1, "result": [...]}
+    失败: {"id": 1, "error": {"message": "..."}}
+
+params 可以是数组（按位置传参）或对象（按关键字传参）。
+请求可带 "deadlineMs"（毫秒），上游重试和等待不会超过这个期限。
+请求带 "timings": true（或设置了 SCRIPT_TIMINGS）时，响应带 "timings" 字段，为该请求的分阶段耗时
+（上游调用、数据处理、序列化，见 pycommon.timings）。
+设置 SCRIPT_PROFILE_DIR 时每个请求写出 cProfile 和 tracemalloc 结果（见 pycommon.profiling），
+这些请求逐个执行。
+请求在线程池中并发执行，响应按完成顺序返回，调用方用 id 对应请求。
+
+用法:
+    python3 worker.py [--threads 4] [--snapshot-ttl 30]
+"""
+
+import sys
+import json
+import os
+import time
+import threading
+import argparse
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+
+# 禁用进度条和警告，必须在导入 akshare 之前设置
+os.environ['TQDM_DISABLE'] = '1'
+os.environ['PYTHONWARNINGS'] = 'ignore'
+
+import warnings
+warnings.filterwarnings('ignore')
+
+import upstream
+from pycommon import profiling, resilience, timings
+import get_sectors
+import get_indices
+import get_equity_bond_spread
+import get_market_overview_v3
+import trade_calendar
+import circuit_breaker
+
+# 可调用的方法
+METHODS = {
+    "get_sectors_data": get_sectors.get_sectors_data,
+    "get_indices_data": get_indices.get_indices_data,
+    "get_equity_bond_spread": get_equity_bond_spread.get_equity_bond_spread,
+    "get_equity_bond_spread_batch": get_equity_bond_spread.get_equity_bond_spread_batch,
+    "get_market_overview_fast": get_market_overview_v3.get_market_overview_fast,
+    "previous_trading_day": trade_calendar.previous_trading_day,
+    "next_trading_day": trade_calendar.next_trading_day,
+    "nearest_trading_day": trade_calendar.nearest_trading_day,
+    "is_trading_day": trade_calendar.is_trading_day,
+    "get_breaker_states": circuit_breaker.get_states,
+}
+
+class Worker:
+    """
+    JSON-RPC 工作进程
+
+    Args:
+        out: 响应输出流
+        threads: 并发执行请求的线程数
+    """
+
+    def __init__(self, out, threads=4):
+        self.out = out
+        self.executor = ThreadPoolExecutor(max_workers=threads)
+        self.write_lock = threading.Lock()
+        self.started_at = time.time()
+        self.stats_lock = threading.Lock()
+        self.stats = {"requests": 0, "errors": 0, "inFlight": 0}
+
+    def handle_line(self, line):
+        """解析一行请求并提交到线程池"""
+        line = line.strip()
+        if not line:
+            return
+
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            self.respond({"id": None, "error": {"message": f"请求解析失败: {e}"}})
+            return
+
+        self.executor.submit(self.dispatch, request)
+
+    def dispatch(self, request):
+        """执行单个请求并写回响应"""
+        req_id = request.get("id")
+        method = request.get("method")
+        params = request.get("params") or []
+        deadline_ms = request.get("deadlineMs")
+        collect = request.get("timings") or timings.MODE
+        collector = None
+
+        with self.stats_lock:
+            self.stats["requests"] += 1
+            self.stats["inFlight"] += 1
+
+        try:
+            if method == "ping":
+                result = "pong"
+            elif method == "stats":
+                result = self.get_stats()
+            elif method in METHODS:
+                func = METHODS[method]
+                with timings.collect() if collect else contextlib.nullcontext() as collector:
+                    with profiling.capture(method, params=params):
+                        with resilience.deadline(deadline_ms / 1000.0 if deadline_ms else None):
+                            if isinstance(params, dict):
+                                result = func(**params)
+                            else:
+                                result = func(*params)
+            else:
+                raise ValueError(f"未知方法: {method}")
+
+            response = {"id": req_id, "result": result}
+
+        except Exception as e:
+            with self.stats_lock:
+                self.stats["errors"] += 1
+            response = {"id": req_id, "error": {"message": str(e), "type": type(e).__name__}}
+
+        finally:
+            with self.stats_lock:
+                self.stats["inFlight"] -= 1
+
+        self.respond(response, collector)
+
+    def respond(self, response, collector=None):
+        """
+        写出一行响应（多线程安全）
+
+        Args:
+            response: 响应对象
+            collector: 该请求的 timings.Collector，有则记录序列化耗时并加上 timings 字段
+        """
+        try:
+            if collector is not None:
+                data = timings.dumps_with_report(response, "timings", collector, ensure_ascii=False)
+            else:
+                data = json.dumps(response, ensure_ascii=False)
+        except (TypeError, ValueError) as e:
+            data = json.dumps({"id": response.get("id"), "error": {"message": f"结果序列化失败: {e}"}})
+
+        with self.write_lock:
+            self.out.write(data + "\n")
+            self.out.flush()
+
+    def get_stats(self):
+        """工作进程运行统计"""
+        with self.stats_lock:
+            stats = dict(self.stats)
+        stats["pid"] = os.getpid()
+        stats["uptime"] = round(time.time() - self.started_at, 1)
+        stats["upstream"] = upstream.get_stats()
+        return stats
+
+    def serve(self, stream):
+        """循环读取请求，直到输入流关闭"""
+        for line in stream:
+            self.handle_line(line)
+        self.executor.shutdown(wait=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="AKShare 常驻工作进程")
+    parser.add_argument("--threads", type=int, default=int(os.environ.get("AKSHARE_WORKER_THREADS", "4")),
+                        help="并发执行请求的线程数")
+    parser.add_argument("--snapshot-ttl", type=float,
+                        default=float(os.environ.get("AKSHARE_BOARD_SNAPSHOT_TTL", "30")),
+                        help="板块行情快照有效期（秒），跨请求复用")
+    args = parser.parse_args()
+
+    get_sectors.SNAPSHOT_TTL = args.snapshot_ttl
+    if upstream.cache is not None:
+        # 常驻进程中过期的上游数据先返回旧值再后台刷新
+        upstream.cache.background = True
+    timings.mark_imported()
+
+    # 协议独占原始 stdout，脚本里零散的 print 重定向到 stderr，避免污染响应
+    out = sys.stdout
+    sys.stdout = sys.stderr
+
+    upstream.preload()
+
+    worker = Worker(out, threads=args.threads)
+    worker.respond({"id": None, "result": "ready"})
+    worker.serve(sys.stdin)
+
+if __name__ == "__main__":
+    main()
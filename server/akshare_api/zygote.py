@@ -0,0 +1,572 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+一次性脚本的 fork 服务（zygote）
+仍然每个请求一个进程，但不再每次启动解释器、导入 akshare/pandas/numpy：
+zygote 启动时导入一次并编译各脚本，之后每个请求 fork 一个子进程，以 __main__ 身份执行脚本
+（与 python3 get_indices.py ... 相同的参数解析、输出和退出码）。
+导入的模块通过写时复制与子进程共享，子进程之间、子进程与 zygote 之间互不影响。
+
+- 同时运行的子进程不超过 --children，其余请求排队（超过 --max-pending 时直接返回繁忙）
+- 子进程独占的内存（fork 后写过的页，共享的页不计）超过 --max-rss-mb、
+  或请求从收到起超过 --timeout 秒（含排队）时终止该子进程，请求返回错误
+- 子进程的 stdout/stderr 写入临时文件，退出后由 zygote 连同退出码一起返回；
+  脚本执行期间注册的 atexit 回调（如 SCRIPT_PROFILE_DIR）和 SCRIPT_TIMINGS 的输出在子进程退出时执行，
+  zygote 自己注册的 atexit 回调和解释器的模块清理则跳过（子进程退出即释放）
+
+协议（Unix socket，每个连接一个请求，各一行 JSON）:
+    请求: {"script": "get_indices.py", "args": ["000001.SH,399001.SZ", "2024-01-15"]}
+    响应: {"code": 0, "stdout": "...", "stderr": "...", "ms": 35.2, "pid": 1234, "rssKb": 20480}
+    失败: {"error": {"message": "..."}, "stderr": "..."}
+          zygote 繁忙或正在退出时带 "busy": true，子进程因内存或超时被终止时带 "killed": true，
+          这两种情况不是脚本本身的失败，调用方可以改为直接启动脚本
+    统计: {"stats": true}
+
+用法:
+    python3 zygote.py [--socket /tmp/akshare-zygote.sock] [--children 4] [--max-rss-mb 1024] [--timeout 300]
+    python3 zygote.py --call get_indices.py 000001.SH,399001.SZ 2024-01-15   # 经由已启动的 zygote 运行脚本
+"""
+
+import os
+import sys
+import json
+import time
+import atexit
+import signal
+import socket
+import argparse
+import builtins
+import selectors
+import tempfile
+import threading
+import traceback
+from collections import deque
+
+# 禁用进度条和警告，必须在导入 akshare 之前设置
+os.environ['TQDM_DISABLE'] = '1'
+os.environ['PYTHONWARNINGS'] = 'ignore'
+
+import warnings
+warnings.filterwarnings('ignore')
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(SCRIPT_DIR, '..'))
+from pycommon import profiling, timings
+
+# 可执行的脚本（一次性脚本中 dataService.js 调用的，以及其他版本的市场概况）
+SCRIPTS = [
+    "get_sectors.py",
+    "get_indices.py",
+    "get_equity_bond_spread.py",
+    "get_market_overview.py",
+    "get_market_overview_v2.py",
+    "get_market_overview_v3.py",
+    "trade_calendar.py",
+    "circuit_breaker.py",
+]
+
+DEFAULT_SOCKET = os.environ.get("AKSHARE_ZYGOTE_SOCKET") or os.path.join(tempfile.gettempdir(), "akshare-zygote.sock")
+
+# 检查子进程内存和运行时间的间隔（秒）
+WATCH_INTERVAL = 0.5
+
+# 请求行的最大长度
+MAX_REQUEST_BYTES = 1 << 20
+
+def private_rss_kb(pid):
+    """
+    子进程独占的内存（KB）: Private_Clean + Private_Dirty，仍与 zygote 共享的写时复制页不计入
+
+    Returns:
+        KB，取不到时返回 None（非 Linux 或进程已退出）
+    """
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            total = 0
+            for line in f:
+                if line.startswith(("Private_Clean:", "Private_Dirty:")):
+                    total += int(line.split()[1])
+            return total
+    except (OSError, ValueError):
+        return None
+
+class ScriptRun:
+    """
+    在 fork 出的子进程中以 __main__ 身份执行一个脚本
+
+    Args:
+        path: 脚本路径
+        code: 编译好的代码对象
+        args: 命令行参数
+        stdout/stderr: 接收输出的临时文件
+    """
+
+    def __init__(self, path, code, args, stdout, stderr):
+        self.path = path
+        self.code = code
+        self.args = args
+        self.stdout = stdout
+        self.stderr = stderr
+        self.exit_hooks = []
+
+    def _register(self, func, *args, **kwargs):
+        self.exit_hooks.append((func, args, kwargs))
+        return func
+
+    def _unregister(self, func):
+        self.exit_hooks = [hook for hook in self.exit_hooks if hook[0] != func]
+
+    def run(self):
+        """执行脚本，返回退出码；脚本执行期间注册的 atexit 回调记录在 exit_hooks 中，由 finish() 执行"""
+        # 文件描述符层面重定向，C 扩展直接写 fd 1/2 的输出也能收到
+        devnull = os.open(os.devnull, os.O_RDONLY)
+        os.dup2(devnull, 0)
+        os.close(devnull)
+        os.dup2(self.stdout.fileno(), 1)
+        os.dup2(self.stderr.fileno(), 2)
+
+        sys.argv = [self.path] + list(self.args)
+        namespace = {"__name__": "__main__", "__file__": self.path, "__builtins__": builtins}
+        register, unregister = atexit.register, atexit.unregister
+        atexit.register, atexit.unregister = self._register, self._unregister
+        try:
+            exec(self.code, namespace)
+            return 0
+        except SystemExit as e:
+            if e.code is None or isinstance(e.code, int):
+                return e.code or 0
+            print(e.code, file=sys.stderr)
+            return 1
+        except BaseException:
+            traceback.print_exc()
+            return 1
+        finally:
+            atexit.register, atexit.unregister = register, unregister
+
+    def finish(self):
+        """按注册的相反顺序执行脚本的 atexit 回调，再输出 SCRIPT_TIMINGS 的统计"""
+        while self.exit_hooks:
+            func, args, kwargs = self.exit_hooks.pop()
+            try:
+                func(*args, **kwargs)
+            except Exception:
+                traceback.print_exc()
+        timings.flush()
+
+class _Child:
+    """运行中的子进程"""
+
+    __slots__ = ("pid", "conn", "script", "stdout", "stderr", "received", "started", "killed")
+
+    def __init__(self, pid, conn, script, stdout, stderr, received):
+        self.pid = pid
+        self.conn = conn
+        self.script = script
+        self.stdout = stdout
+        self.stderr = stderr
+        self.received = received
+        self.started = time.perf_counter()
+        self.killed = None
+
+class Zygote:
+    """
+    fork 服务
+
+    Args:
+        socket_path: 监听的 Unix socket 路径
+        children: 同时运行的子进程数上限
+        max_rss_mb: 子进程独占内存上限（MB），0 表示不限
+        timeout: 请求从收到到完成的时间上限（秒，含排队），0 表示不限
+        max_pending: 排队请求数上限
+        watch_stdin: stdin 关闭时退出（由父进程管理生命周期时使用）
+    """
+
+    def __init__(self, socket_path, children=4, max_rss_mb=1024, timeout=300, max_pending=64, watch_stdin=False):
+        self.socket_path = socket_path
+        self.children = max(1, children)
+        self.max_rss_kb = int(max_rss_mb * 1024)
+        self.timeout = timeout
+        self.max_pending = max_pending
+        self.watch_stdin = watch_stdin
+        self.scripts = {}
+        self.running = {}
+        self.pending = deque()
+        self.reading = {}
+        self.stopping = False
+        self.started_at = time.time()
+        self.stats = {"requests": 0, "completed": 0, "failed": 0, "rejected": 0,
+                      "killedRss": 0, "killedTimeout": 0, "peakChildren": 0}
+
+    def preload(self):
+        """导入脚本依赖的模块并编译脚本，之后 fork 出的子进程直接共享"""
+        import gc
+        import importlib
+        import upstream
+
+        for name in SCRIPTS:
+            path = os.path.join(SCRIPT_DIR, name)
+            importlib.import_module(name[:-3])
+            with open(path, "rb") as f:
+                self.scripts[name] = (path, compile(f.read(), path, "exec"))
+        upstream.preload()
+
+        # 导入的对象移出 GC 跟踪，子进程的垃圾回收不再写这些对象所在的页，保持共享
+        gc.collect()
+        if hasattr(gc, "freeze"):
+            gc.freeze()
+        if threading.active_count() > 1:
+            print(f"Warning: zygote 有 {threading.active_count() - 1} 个后台线程，fork 出的子进程中不会运行",
+                  file=sys.stderr)
+
+    def listen(self):
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self.listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.listener.bind(self.socket_path)
+        self.listener.listen(128)
+        self.listener.setblocking(False)
+
+    def serve(self):
+        """
+        事件循环: 接收请求、fork 子进程、回收子进程并返回结果
+
+        Returns:
+            在父进程中停止后返回 None；在 fork 出的子进程中返回要执行的 ScriptRun
+        """
+        self.selector = selectors.DefaultSelector()
+        self.wake_r, self.wake_w = os.pipe()
+        os.set_blocking(self.wake_r, False)
+        os.set_blocking(self.wake_w, False)
+        signal.set_wakeup_fd(self.wake_w)
+        # 信号处理函数只需把主循环唤醒，实际处理在循环中
+        signal.signal(signal.SIGCHLD, lambda signum, frame: None)
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+
+        self.selector.register(self.listener, selectors.EVENT_READ, "accept")
+        self.selector.register(self.wake_r, selectors.EVENT_READ, "wake")
+        if self.watch_stdin:
+            self.selector.register(sys.stdin, selectors.EVENT_READ, "stdin")
+
+        last_watch = time.perf_counter()
+        while not (self.stopping and not self.running):
+            for key, _ in self.selector.select(WATCH_INTERVAL):
+                if key.data == "accept":
+                    self._accept()
+                elif key.data == "wake":
+                    self._drain_wake()
+                elif key.data == "stdin":
+                    if not sys.stdin.buffer.read1(4096):
+                        self._stop()
+                else:
+                    run = self._read(key.fileobj)
+                    if run is not None:
+                        return run
+
+            self._reap()
+            if time.perf_counter() - last_watch >= WATCH_INTERVAL:
+                last_watch = time.perf_counter()
+                self._watch()
+            run = self._start_pending()
+            if run is not None:
+                return run
+
+        self._close()
+        return None
+
+    def _stop(self, signum=None, frame=None):
+        if self.stopping:
+            return
+        self.stopping = True
+        # 不再接收新请求，排队的请求返回错误，运行中的子进程执行完再退出
+        self.selector.unregister(self.listener)
+        self.listener.close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        while self.pending:
+            conn, _ = self.pending.popleft()
+            self._reply(conn, {"error": {"message": "zygote 正在退出"}, "busy": True})
+        for conn in list(self.reading):
+            self._forget(conn)
+            conn.close()
+
+    def _close(self):
+        self.selector.close()
+        os.close(self.wake_r)
+        os.close(self.wake_w)
+        signal.set_wakeup_fd(-1)
+
+    def _drain_wake(self):
+        try:
+            while os.read(self.wake_r, 512):
+                pass
+        except BlockingIOError:
+            pass
+
+    def _accept(self):
+        while True:
+            try:
+                conn, _ = self.listener.accept()
+            except (BlockingIOError, InterruptedError):
+                return
+            conn.setblocking(False)
+            self.reading[conn] = bytearray()
+            self.selector.register(conn, selectors.EVENT_READ, "conn")
+
+    def _forget(self, conn):
+        self.reading.pop(conn, None)
+        try:
+            self.selector.unregister(conn)
+        except (KeyError, ValueError):
+            pass
+
+    def _read(self, conn):
+        """读取请求行，完整后排队；有空闲名额时直接 fork"""
+        try:
+            data = conn.recv(65536)
+        except (BlockingIOError, InterruptedError):
+            return None
+        except OSError:
+            data = b""
+        if not data:
+            self._forget(conn)
+            conn.close()
+            return None
+
+        buffer = self.reading[conn]
+        buffer.extend(data)
+        if b"\n" not in buffer:
+            if len(buffer) > MAX_REQUEST_BYTES:
+                self._forget(conn)
+                self._reply(conn, {"error": {"message": "请求过长"}})
+            return None
+
+        self._forget(conn)
+        try:
+            request = json.loads(bytes(buffer.split(b"\n", 1)[0]).decode("utf-8"))
+        except ValueError as e:
+            self._reply(conn, {"error": {"message": f"请求解析失败: {e}"}})
+            return None
+
+        if request.get("stats"):
+            self._reply(conn, self.get_stats())
+            return None
+        script = request.get("script")
+        args = request.get("args") or []
+        if script not in self.scripts or not isinstance(args, list):
+            self._reply(conn, {"error": {"message": f"未知脚本: {script}（可选: {', '.join(SCRIPTS)}）"}})
+            return None
+
+        self.stats["requests"] += 1
+        if len(self.pending) >= self.max_pending:
+            self.stats["rejected"] += 1
+            self._reply(conn, {"error": {"message": f"zygote 繁忙: {len(self.pending)} 个请求在排队"},
+                               "busy": True})
+            return None
+        self.pending.append((conn, (script, [str(arg) for arg in args], time.perf_counter())))
+        return self._start_pending()
+
+    def _start_pending(self):
+        while self.pending and len(self.running) < self.children and not self.stopping:
+            conn, (script, args, received) = self.pending.popleft()
+            path, code = self.scripts[script]
+            stdout = tempfile.TemporaryFile()
+            stderr = tempfile.TemporaryFile()
+            sys.stdout.flush()
+            sys.stderr.flush()
+
+            pid = os.fork()
+            if pid == 0:
+                self._enter_child(conn)
+                return ScriptRun(path, code, args, stdout, stderr)
+
+            self.running[pid] = _Child(pid, conn, script, stdout, stderr, received)
+            self.stats["peakChildren"] = max(self.stats["peakChildren"], len(self.running))
+        return None
+
+    def _enter_child(self, conn):
+        """子进程: 关闭 zygote 的监听 socket、所有连接（结果由 zygote 返回）和信号处理"""
+        signal.set_wakeup_fd(-1)
+        for signum in (signal.SIGCHLD, signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, signal.SIG_DFL)
+        self.selector.close()
+        os.close(self.wake_r)
+        os.close(self.wake_w)
+        self.listener.close()
+        conn.close()
+        for other in list(self.reading) + [other for other, _ in self.pending]:
+            other.close()
+        for child in self.running.values():
+            child.conn.close()
+            child.stdout.close()
+            child.stderr.close()
+        self.reading.clear()
+        self.pending.clear()
+        self.running.clear()
+
+    def _reap(self):
+        while self.running:
+            try:
+                pid, status, rusage = os.wait4(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            child = self.running.pop(pid, None)
+            if child is not None:
+                self._finish(child, status, rusage)
+
+    def _finish(self, child, status, rusage):
+        """子进程退出: 读取输出，返回结果"""
+        elapsed = round((time.perf_counter() - child.started) * 1000, 2)
+        outputs = []
+        for stream in (child.stdout, child.stderr):
+            stream.seek(0)
+            outputs.append(stream.read().decode("utf-8", "replace"))
+            stream.close()
+        stdout, stderr = outputs
+
+        if child.killed is not None:
+            self.stats["failed"] += 1
+            response = {"error": {"message": child.killed}, "killed": True, "stderr": stderr, "ms": elapsed,
+                        "pid": child.pid}
+        elif os.WIFSIGNALED(status):
+            self.stats["failed"] += 1
+            response = {"error": {"message": f"子进程被信号 {os.WTERMSIG(status)} 终止"},
+                        "stderr": stderr, "ms": elapsed, "pid": child.pid}
+        else:
+            self.stats["completed"] += 1
+            response = {"code": os.WEXITSTATUS(status), "stdout": stdout, "stderr": stderr,
+                        "ms": elapsed, "pid": child.pid, "rssKb": profiling.max_rss_kb(rusage)}
+        self._reply(child.conn, response)
+
+    def _watch(self):
+        """终止内存或运行时间超过上限的子进程，排队超过时间上限的请求返回繁忙"""
+        now = time.perf_counter()
+        if self.timeout and self.pending:
+            waiting = deque()
+            for conn, request in self.pending:
+                if now - request[2] > self.timeout:
+                    self.stats["rejected"] += 1
+                    self._reply(conn, {"error": {"message": f"zygote 繁忙: 排队超过 {self.timeout:g} 秒"},
+                                       "busy": True})
+                else:
+                    waiting.append((conn, request))
+            self.pending = waiting
+        for child in self.running.values():
+            if child.killed is not None:
+                continue
+            if self.timeout and now - child.received > self.timeout:
+                child.killed = f"{child.script} 超过 {self.timeout:g} 秒未完成，已终止"
+                self.stats["killedTimeout"] += 1
+            elif self.max_rss_kb:
+                rss = private_rss_kb(child.pid)
+                if rss is not None and rss > self.max_rss_kb:
+                    child.killed = (f"{child.script} 独占内存 {rss // 1024}MB 超过上限 "
+                                    f"{self.max_rss_kb // 1024}MB，已终止")
+                    self.stats["killedRss"] += 1
+            if child.killed is not None:
+                print(f"Warning: {child.killed} (pid {child.pid})", file=sys.stderr)
+                try:
+                    os.kill(child.pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+
+    def _reply(self, conn, response):
+        try:
+            conn.setblocking(True)
+            conn.settimeout(10)
+            conn.sendall(json.dumps(response, ensure_ascii=False).encode("utf-8") + b"\n")
+        except OSError:
+            pass
+        finally:
+            conn.close()
+
+    def get_stats(self):
+        """运行统计"""
+        stats = dict(self.stats)
+        stats["pid"] = os.getpid()
+        stats["uptime"] = round(time.time() - self.started_at, 1)
+        stats["running"] = len(self.running)
+        stats["pending"] = len(self.pending)
+        stats["children"] = {str(pid): {"script": child.script, "privateRssKb": private_rss_kb(pid),
+                                        "ms": round((time.perf_counter() - child.started) * 1000, 2)}
+                             for pid, child in self.running.items()}
+        return stats
+
+def call(script, args, socket_path=DEFAULT_SOCKET, timeout=None):
+    """
+    经由 zygote 运行脚本
+
+    Args:
+        script: 脚本名，如 "get_indices.py"
+        args: 命令行参数列表
+        socket_path: zygote 的 Unix socket
+        timeout: 等待结果的秒数，None 表示不限
+
+    Returns:
+        响应对象（见模块说明）
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+        conn.settimeout(timeout)
+        conn.connect(socket_path)
+        conn.sendall(json.dumps({"script": script, "args": list(args)}, ensure_ascii=False).encode("utf-8") + b"\n")
+        chunks = []
+        while True:
+            chunk = conn.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    data = b"".join(chunks)
+    if not data:
+        raise ConnectionError("zygote 未返回结果就关闭了连接")
+    return json.loads(data.decode("utf-8"))
+
+def main():
+    parser = argparse.ArgumentParser(description="一次性脚本的 fork 服务")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET, help="Unix socket 路径")
+    parser.add_argument("--children", type=int, default=int(os.environ.get("AKSHARE_ZYGOTE_CHILDREN", "4")),
+                        help="同时运行的子进程数上限")
+    parser.add_argument("--max-rss-mb", type=float,
+                        default=float(os.environ.get("AKSHARE_ZYGOTE_MAX_RSS_MB", "1024")),
+                        help="子进程独占内存上限（MB），0 表示不限")
+    parser.add_argument("--timeout", type=float, default=float(os.environ.get("AKSHARE_ZYGOTE_TIMEOUT", "300")),
+                        help="请求从收到到完成的时间上限（秒，含排队），0 表示不限")
+    parser.add_argument("--max-pending", type=int, default=64, help="排队请求数上限")
+    parser.add_argument("--watch-stdin", action="store_true", help="stdin 关闭时退出")
+    parser.add_argument("--call", nargs=argparse.REMAINDER, default=None,
+                        help="经由已启动的 zygote 运行脚本及其参数（放在最后）")
+    args = parser.parse_args()
+
+    if args.call is not None:
+        if not args.call:
+            parser.error("--call 需要脚本名，如 --call get_indices.py 000001.SH 2024-01-15")
+        response = call(args.call[0], args.call[1:], socket_path=args.socket)
+        if "error" in response:
+            sys.stderr.write(response.get("stderr", ""))
+            print(response["error"]["message"], file=sys.stderr)
+            sys.exit(1)
+        sys.stdout.write(response["stdout"])
+        sys.stderr.write(response["stderr"])
+        sys.exit(response["code"])
+
+    zygote = Zygote(args.socket, children=args.children, max_rss_mb=args.max_rss_mb, timeout=args.timeout,
+                    max_pending=args.max_pending, watch_stdin=args.watch_stdin)
+    zygote.preload()
+    zygote.listen()
+    timings.detach()
+    print(json.dumps({"ready": True, "pid": os.getpid(), "socket": args.socket}), flush=True)
+
+    run = zygote.serve()
+    if run is not None:
+        # fork 出的子进程: 执行脚本和脚本注册的 atexit 回调（耗时输出、性能采集）后直接退出。
+        # zygote 注册的回调属于 zygote（在子进程中执行会覆盖 zygote 的状态文件等），不执行；
+        # 跳过解释器的模块清理: 导入了完整的 akshare，清理要几十毫秒，还会写脏与 zygote 共享的页
+        code = run.run()
+        run.finish()
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(code)
+
+if __name__ == "__main__":
+    main()
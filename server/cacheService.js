@@ -1,5 +1,5 @@
 import NodeCache from 'node-cache';
-import { getMarketData } from './dataService.js';
+import { getMarketData, getPreviousTradingDay } from './dataService.js';
 
 // 创建缓存实例（5分钟过期）
 const cache = new NodeCache({ stdTTL: 300, checkperiod: 60 });
@@ -70,7 +70,7 @@ function preloadAdjacentDates(date) {
   // 在后台预加载前一天和当天数据
   setTimeout(async () => {
     try {
-      const yesterday = getPreviousWorkday(date);
+      const yesterday = await getPreviousTradingDayOrWorkday(date);
       const today = getToday();
       
       for (const d of [yesterday, today]) {
@@ -91,6 +91,21 @@ function preloadAdjacentDates(date) {
   }, 1000);
 }
 
+/**
+ * 获取前一个交易日，交易日历不可用时回退到只跳过周末
+ */
+async function getPreviousTradingDayOrWorkday(dateStr) {
+  try {
+    const day = await getPreviousTradingDay(dateStr);
+    if (typeof day === 'string') {
+      return day;
+    }
+  } catch (error) {
+    // 回退到工作日
+  }
+  return getPreviousWorkday(dateStr);
+}
+
 /**
  * 获取前一个工作日
  */
@@ -1,6 +1,9 @@
 import { spawn } from 'child_process';
 import path from 'path';
 import { fileURLToPath } from 'url';
+import { callWorker, isWorkerEnabled } from './pythonWorker.js';
+import { isZygoteEnabled, runInZygote } from './zygoteClient.js';
+import { splitTimings, takeTimings, logTimings } from './scriptTimings.js';
 
 const __filename = fileURLToPath(import.meta.url);
 const __dirname = path.dirname(__filename);
@@ -17,13 +20,71 @@ const __dirname = path.dirname(__filename);
 
 /**
  * 调用AKShare Python API获取数据
+ * 优先使用常驻工作进程，工作进程不可用时回退到一次性脚本
+ * （AKSHARE_ZYGOTE=true 时经由 zygote fork 执行，zygote 不可用时启动新的 Python 进程）
+ * @param {string} script - Python脚本路径
+ * @param {Array} args - 参数列表
+ * @param {string} method - 工作进程中对应的方法名
+ * @param {Array} params - 工作进程方法的参数，默认与命令行参数相同
+ * @returns {Promise<Object>} 返回JSON数据
+ */
+async function callAKShareAPI(script, args = [], method = null, params = args) {
+  if (method && isWorkerEnabled()) {
+    try {
+      return await callWorker(method, params);
+    } catch (error) {
+      if (error.remote) {
+        throw new Error(`AKShare API 调用失败: ${error.message}`);
+      }
+      console.warn('⚠️ 工作进程不可用，回退到一次性脚本:', error.message);
+    }
+  }
+
+  if (isZygoteEnabled()) {
+    try {
+      return await runZygoteScript(script, args);
+    } catch (error) {
+      if (error.remote) {
+        throw error;
+      }
+      console.warn('⚠️ zygote 不可用，回退到启动 Python 进程:', error.message);
+    }
+  }
+
+  return spawnAKShareScript(script, args);
+}
+
+/**
+ * 经由 zygote 执行一次性脚本（结果处理与直接启动脚本相同）
+ * @param {string} script - Python脚本路径
+ * @param {Array} args - 参数列表
+ * @returns {Promise<Object>} 返回JSON数据
+ */
+async function runZygoteScript(script, args = []) {
+  const response = await runInZygote(script, args);
+  if (response.error) {
+    // zygote 繁忙（busy）、正在退出（busy）或终止了子进程（killed）等，不是脚本本身的失败，由调用方回退
+    const reason = response.busy ? '繁忙' : response.killed ? '终止了子进程' : '未能执行脚本';
+    throw new Error(`zygote ${reason}: ${response.error.message}`);
+  }
+  try {
+    return handleScriptExit(script, response.code, response.stdout, response.stderr);
+  } catch (error) {
+    // 脚本本身失败（退出码非 0 或输出无法解析），不再回退
+    error.remote = true;
+    throw error;
+  }
+}
+
+/**
+ * 启动一次性Python脚本获取数据
  * @param {string} script - Python脚本路径
  * @param {Array} args - 参数列表
  * @returns {Promise<Object>} 返回JSON数据
  */
 let akshareWarningShown = false;
 
-async function callAKShareAPI(script, args = []) {
+async function spawnAKShareScript(script, args = []) {
   return new Promise((resolve, reject) => {
     const pythonCmd = process.platform === 'win32' ? 'python' : 'python3';
     const pythonProcess = spawn(pythonCmd, [script, ...args]);
@@ -48,42 +109,62 @@ async function callAKShareAPI(script, args = []) {
     pythonProcess.on('close', (code) => {
       clearTimeout(timeout); // 清除超时定时器
       
-      if (code !== 0) {
-        // 检查是否是 AKShare 模块缺失错误
-        if (errorString.includes('No module named \'akshare\'')) {
-          if (!akshareWarningShown) {
-            console.error('\n❌ AKShare 配置错误');
-            console.error('━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━');
-            console.error('原因: AKShare 模块未安装');
-            console.error('');
-            console.error('请安装 AKShare:');
-            console.error('  pip install akshare');
-            console.error('  pip install pandas');
-            console.error('');
-            console.error('AKShare 是免费开源的金融数据接口库');
-            console.error('文档: https://akshare.akfamily.xyz/');
-            console.error('━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n');
-            akshareWarningShown = true;
-          }
-          reject(new Error('AKShare 模块未安装。请运行: pip install akshare pandas'));
-        } else {
-          console.error('AKShare API 执行错误:', errorString);
-          reject(new Error(`AKShare API 调用失败: ${errorString}`));
-        }
-        return;
-      }
-      
       try {
-        const result = JSON.parse(dataString);
-        resolve(result);
+        resolve(handleScriptExit(script, code, dataString, errorString));
       } catch (error) {
-        console.error('解析 AKShare 数据失败:', error);
-        reject(new Error(`数据解析失败: ${error.message}`));
+        reject(error);
       }
     });
   });
 }
 
+/**
+ * 处理一次性脚本的输出
+ * @param {string} script - Python脚本路径
+ * @param {number} code - 退出码
+ * @param {string} dataString - stdout
+ * @param {string} errorString - stderr
+ * @returns {Object} 解析后的JSON数据，失败时抛出异常
+ */
+function handleScriptExit(script, code, dataString, errorString) {
+  // SCRIPT_TIMINGS=stderr 时脚本在 stderr 输出各阶段耗时
+  const split = splitTimings(errorString);
+  errorString = split.rest;
+  logTimings(path.basename(script), split.timings);
+  
+  if (code !== 0) {
+    // 检查是否是 AKShare 模块缺失错误
+    if (errorString.includes('No module named \'akshare\'')) {
+      if (!akshareWarningShown) {
+        console.error('\n❌ AKShare 配置错误');
+        console.error('━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━');
+        console.error('原因: AKShare 模块未安装');
+        console.error('');
+        console.error('请安装 AKShare:');
+        console.error('  pip install akshare');
+        console.error('  pip install pandas');
+        console.error('');
+        console.error('AKShare 是免费开源的金融数据接口库');
+        console.error('文档: https://akshare.akfamily.xyz/');
+        console.error('━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n');
+        akshareWarningShown = true;
+      }
+      throw new Error('AKShare 模块未安装。请运行: pip install akshare pandas');
+    }
+    console.error('AKShare API 执行错误:', errorString);
+    throw new Error(`AKShare API 调用失败: ${errorString}`);
+  }
+  
+  try {
+    const result = JSON.parse(dataString);
+    logTimings(path.basename(script), takeTimings(result));
+    return result;
+  } catch (error) {
+    console.error('解析 AKShare 数据失败:', error);
+    throw new Error(`数据解析失败: ${error.message}`);
+  }
+}
+
 // 获取主要指数数据（使用AKShare API）
 async function getIndicesData(date) {
   const indices = [
@@ -98,7 +179,7 @@ async function getIndicesData(date) {
   // 调用AKShare API获取指数数据 - 失败直接抛出异常
   const scriptPath = path.join(__dirname, 'akshare_api', 'get_indices.py');
   const codes = indices.map(i => i.code).join(',');
-  const result = await callAKShareAPI(scriptPath, [codes, date]);
+  const result = await callAKShareAPI(scriptPath, [codes, date], 'get_indices_data');
   
   // 格式化返回数据
   return result.map((item, index) => ({
@@ -112,7 +193,7 @@ async function getIndicesData(date) {
 async function getSectorsData(date) {
   // 调用AKShare API获取板块数据 - 失败直接抛出异常
   const scriptPath = path.join(__dirname, 'akshare_api', 'get_sectors.py');
-  const result = await callAKShareAPI(scriptPath, [date]);
+  const result = await callAKShareAPI(scriptPath, [date], 'get_sectors_data');
   
   return result;
 }
@@ -121,7 +202,7 @@ async function getSectorsData(date) {
 async function getMarketOverview(date) {
   // 调用AKShare API获取市场概况 - 使用V3超快版本
   const scriptPath = path.join(__dirname, 'akshare_api', 'get_market_overview_v3.py');
-  const result = await callAKShareAPI(scriptPath, [date]);
+  const result = await callAKShareAPI(scriptPath, [date], 'get_market_overview_fast');
   
   return {
     ...result,
@@ -130,14 +211,27 @@ async function getMarketOverview(date) {
 }
 
 // 获取股债利差数据（使用AKShare API）
-async function getEquityBondSpreadData(date) {
+// freq: chartData 频率 daily / weekly / monthly，三种频率在 Python 端一起缓存
+async function getEquityBondSpreadData(date, freq = 'monthly') {
   // 调用AKShare API获取股债利差历史数据 - 失败直接抛出异常
   const scriptPath = path.join(__dirname, 'akshare_api', 'get_equity_bond_spread.py');
-  const result = await callAKShareAPI(scriptPath, [date]);
+  const result = await callAKShareAPI(scriptPath, [date, '--freq', freq], 'get_equity_bond_spread', [date, freq]);
   
   return result;
 }
 
+// 获取前一个交易日（使用AKShare交易日历）
+export async function getPreviousTradingDay(date) {
+  const scriptPath = path.join(__dirname, 'akshare_api', 'trade_calendar.py');
+  return callAKShareAPI(scriptPath, ['previous', date], 'previous_trading_day', [date]);
+}
+
+// 获取上游熔断器状态（工作进程不可用时读取最近记录的状态）
+export async function getUpstreamBreakers() {
+  const scriptPath = path.join(__dirname, 'akshare_api', 'circuit_breaker.py');
+  return callAKShareAPI(scriptPath, [], 'get_breaker_states');
+}
+
 // 主函数：获取完整市场数据
 export async function getMarketData(date) {
   // 并行获取所有数据 - 任何一个失败都会导致整体失败
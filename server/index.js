@@ -4,6 +4,7 @@ import NodeCache from 'node-cache';
 import dotenv from 'dotenv';
 import { getWindAData } from './windDataService.js';
 import { getRealWindAData } from './realDataService.js';
+import { getUpstreamBreakers } from './dataService.js';
 
 // 加载环境变量
 dotenv.config();
@@ -112,6 +113,20 @@ app.get('/api/cache/stats', (req, res) => {
   });
 });
 
+// 查看上游熔断器状态API
+app.get('/api/upstream/breakers', async (req, res) => {
+  try {
+    const breakers = await getUpstreamBreakers();
+    res.json({ success: true, breakers });
+  } catch (error) {
+    res.status(500).json({
+      success: false,
+      message: '获取熔断器状态失败',
+      error: error.message
+    });
+  }
+});
+
 // 健康检查
 app.get('/api/health', (req, res) => {
   res.json({ 
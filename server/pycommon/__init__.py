@@ -0,0 +1,4 @@
+# -*- coding: utf-8 -*-
+"""
+akshare_api 与 wind_api 共用的 Python 工具模块
+"""
@@ -0,0 +1,187 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+历史分位数计算
+基于排序后的 NumPy 数组和 searchsorted，单次查询 O(log n)
+
+分位数定义:
+    分位数 = 历史值中 <= 当前值的个数 / 历史值个数 × 100
+
+支持三种口径，均可一次返回整条分位数序列:
+- 全历史: 每个点相对全部历史
+- 扩展窗口: 每个点只相对它之前（含）的历史，没有未来数据
+- 滚动窗口: 每个点相对最近 N 个点或最近 N 年
+
+另有 PercentileIndex 相对一段固定历史做单点查询，
+prefix_percentiles 对任意一组时点做批量的扩展窗口查询。
+"""
+
+import numpy as np
+
+# 一年按 365.25 天计算滚动窗口
+DAYS_PER_YEAR = 365.25
+
+class PercentileIndex:
+    """
+    单个指标的分位数索引，构建时排序一次，之后每次查询 O(log n)
+
+    Args:
+        values: 历史值序列，NaN 计入总数但不计入任何排名
+    """
+
+    def __init__(self, values):
+        values = np.asarray(values, dtype='float64')
+        self.count = len(values)
+        # NaN 排在末尾，searchsorted 查询有限值时不会计入
+        self.sorted = np.sort(values)
+
+    def ranks(self, values):
+        """批量查询：每个值在历史中 <= 它的个数"""
+        values = np.asarray(values, dtype='float64')
+        ranks = np.searchsorted(self.sorted, values, side='right')
+        return np.where(np.isnan(values), 0, ranks)
+
+    def percentiles(self, values):
+        """批量查询分位数（未取整），返回 float64 数组"""
+        if not self.count:
+            return np.zeros(np.shape(values))
+        return self.ranks(values) / self.count * 100
+
+    def percentile(self, value):
+        """查询单个值的分位数，保留两位小数"""
+        if not self.count:
+            return 0
+        return round(float(self.percentiles([value])[0]), 2)
+
+def full_history_percentiles(values):
+    """每个点相对全部历史的分位数"""
+    return PercentileIndex(values).percentiles(values)
+
+class _Fenwick:
+    """树状数组，按离散化后的排名计数"""
+
+    def __init__(self, size):
+        self.tree = [0] * (size + 1)
+
+    def add(self, rank, delta):
+        tree = self.tree
+        i = rank + 1
+        while i < len(tree):
+            tree[i] += delta
+            i += i & -i
+
+    def prefix(self, rank):
+        """排名 <= rank 的元素个数"""
+        tree = self.tree
+        i = rank + 1
+        total = 0
+        while i > 0:
+            total += tree[i]
+            i -= i & -i
+        return total
+
+def _window_percentiles(values, starts):
+    """
+    每个点 i 相对区间 values[starts[i]:i+1] 的分位数
+
+    starts 必须单调不减。离散化后用树状数组维护窗口内的计数，
+    每个点的加入、移出、查询都是 O(log n)。
+    """
+    values = np.asarray(values, dtype='float64')
+    n = len(values)
+    result = np.zeros(n)
+    if not n:
+        return result
+
+    valid = ~np.isnan(values)
+    uniques, ranks = np.unique(np.where(valid, values, 0.0), return_inverse=True)
+    tree = _Fenwick(len(uniques))
+    ranks = ranks.tolist()
+    valid = valid.tolist()
+    starts = np.asarray(starts).tolist()
+
+    left = 0
+    for i in range(n):
+        if valid[i]:
+            tree.add(ranks[i], 1)
+        while left < starts[i]:
+            if valid[left]:
+                tree.add(ranks[left], -1)
+            left += 1
+        if valid[i]:
+            result[i] = tree.prefix(ranks[i]) / (i + 1 - left) * 100
+    return result
+
+def expanding_percentiles(values):
+    """每个点相对它之前（含）全部历史的分位数，没有未来数据"""
+    return _window_percentiles(values, np.zeros(len(values), dtype=int))
+
+def trailing_percentiles(values, periods=None, dates=None, years=None):
+    """
+    每个点相对滚动窗口的分位数
+
+    Args:
+        values: 指标序列（按日期升序）
+        periods: 按点数的窗口长度（含当前点）
+        dates: 与 values 对应的日期，按年数取窗口时必填
+        years: 按年数的窗口长度，如 5、10；窗口为 (日期 - years 年, 日期]
+
+    Returns:
+        分位数数组（未取整）
+    """
+    n = len(values)
+    if periods is not None:
+        starts = np.maximum(np.arange(n) - int(periods) + 1, 0)
+    elif years is not None and dates is not None:
+        dates = np.asarray(dates, dtype='datetime64[D]')
+        span = np.timedelta64(int(round(years * DAYS_PER_YEAR)), 'D')
+        starts = np.searchsorted(dates, dates - span, side='right')
+    else:
+        raise ValueError("需要 periods，或同时提供 dates 和 years")
+    return _window_percentiles(values, starts)
+
+def prefix_percentiles(history, lengths, values, queries=None):
+    """
+    批量的扩展窗口分位数查询
+
+    第 j 个查询: queries[j] 在 history[:lengths[j]] 加上 values[j] 本身中的分位数，
+    即 values[j] 作为第 lengths[j] 个点追加到历史末尾时的分位数，没有未来数据。
+    查询按 lengths 排序后一次遍历 history，每个点和每个查询都是 O(log n)。
+
+    Args:
+        history: 历史序列（按日期升序）
+        lengths: 每个查询可见的历史长度
+        values: 每个查询时点的当前值（计入历史）
+        queries: 参与排名的值，默认等于 values
+
+    Returns:
+        分位数数组（未取整）
+    """
+    history = np.asarray(history, dtype='float64')
+    values = np.asarray(values, dtype='float64')
+    queries = values if queries is None else np.asarray(queries, dtype='float64')
+    lengths = np.asarray(lengths, dtype=int)
+    result = np.zeros(len(values))
+    if not len(values):
+        return result
+
+    history_valid = ~np.isnan(history)
+    query_valid = ~np.isnan(queries)
+    coords = np.unique(np.concatenate([history[history_valid], queries[query_valid]]))
+    history_ranks = np.searchsorted(coords, history).tolist()
+    query_ranks = np.searchsorted(coords, queries).tolist()
+    history_valid = history_valid.tolist()
+    # 当前值本身是否 <= 查询值（NaN 比较为 False）
+    self_counts = (values <= queries).astype(int).tolist()
+
+    tree = _Fenwick(len(coords))
+    added = 0
+    for j in np.argsort(lengths, kind='stable').tolist():
+        length = int(lengths[j])
+        while added < length:
+            if history_valid[added]:
+                tree.add(history_ranks[added], 1)
+            added += 1
+        if query_valid[j]:
+            result[j] = (tree.prefix(query_ranks[j]) + self_counts[j]) / (length + 1) * 100
+    return result
@@ -0,0 +1,376 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+按次采集 cProfile 和 tracemalloc
+
+设置 SCRIPT_PROFILE_DIR 后，akshare_api、wind_api 的脚本每次运行、常驻工作进程每个请求
+都在该目录写出:
+
+- <标签>-<时间>-<pid>-<序号>.prof: cProfile 结果，可用 pstats / snakeviz 查看
+- <同名>.mem.json: tracemalloc 结果
+  - peakBytes: 整个调用期间的内存峰值（相对开始时）
+  - top: 结束时仍占用内存最多的分配位置，带 "ours"（调用栈中最近的一个本项目代码位置）
+  - spans: 各阶段（pycommon.timings 的 transform.*、upstream.* 等）期间的内存峰值，
+    用来定位临时分配了大量内存的数据处理步骤
+
+其他环境变量:
+- SCRIPT_PROFILE_MEMORY=false: 只采集 cProfile（tracemalloc 会让程序明显变慢）
+- SCRIPT_PROFILE_FRAMES: tracemalloc 保存的调用栈深度，默认 8
+- SCRIPT_PROFILE_TOP: mem.json 中保存的分配位置数，默认 30
+
+cProfile 只记录发起调用的线程（run_fetches 线程中的上游调用表现为等待）；
+各阶段的内存峰值在有并发阶段时会包含其他线程的分配。
+工作进程中需要采集的请求逐个执行，避免互相干扰。
+
+用法（汇总多次运行）:
+    python3 profiling.py <目录> [--label get_equity_bond_spread] [--sort cumulative] [--top 30] [--json]
+"""
+
+import os
+import sys
+import json
+import time
+import threading
+from contextlib import contextmanager, nullcontext
+
+# cProfile、tracemalloc、pstats 只在开启采集或汇总时导入，未开启时导入本模块几乎没有开销
+
+PROFILE_DIR = os.environ.get("SCRIPT_PROFILE_DIR") or None
+MEMORY = os.environ.get("SCRIPT_PROFILE_MEMORY", "true") != "false"
+FRAMES = int(os.environ.get("SCRIPT_PROFILE_FRAMES", "8"))
+TOP = int(os.environ.get("SCRIPT_PROFILE_TOP", "30"))
+
+# 本项目代码所在目录，用来在调用栈中找到最近的一层本项目代码
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from pycommon import timings
+
+_counter_lock = threading.Lock()
+_counter = 0
+
+def enabled():
+    return PROFILE_DIR is not None
+
+def max_rss_kb(rusage):
+    """resource.getrusage / os.wait4 结果中的峰值 RSS（KB）"""
+    # Linux 为 KB，macOS 为字节
+    return rusage.ru_maxrss // 1024 if sys.platform == "darwin" else rusage.ru_maxrss
+
+def _output_base(directory, label):
+    global _counter
+    with _counter_lock:
+        _counter += 1
+        seq = _counter
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    return os.path.join(directory, f"{label}-{stamp}-{os.getpid()}-{seq}")
+
+def _frame(frame):
+    return {"file": os.path.relpath(frame.filename, SERVER_DIR) if frame.filename.startswith(SERVER_DIR)
+            else frame.filename, "line": frame.lineno}
+
+def top_allocations(snapshot, limit):
+    """
+    结束时占用内存最多的分配位置
+
+    Returns:
+        [{"sizeBytes", "count", "site", "ours", "traceback"}]，site 为最内层位置，
+        ours 为调用栈中最近的本项目代码位置（没有时为 None）
+    """
+    import tracemalloc
+    snapshot = snapshot.filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    ])
+    result = []
+    for stat in snapshot.statistics("traceback")[:limit]:
+        # 调用栈从最外层到最内层
+        frames = list(stat.traceback)
+        ours = next((frame for frame in reversed(frames)
+                     if frame.filename.startswith(SERVER_DIR) and not frame.filename.startswith(__file__)), None)
+        result.append({
+            "sizeBytes": stat.size,
+            "count": stat.count,
+            "site": _frame(frames[-1]),
+            "ours": _frame(ours) if ours is not None else None,
+            "traceback": [_frame(frame) for frame in reversed(frames)],
+        })
+    return result
+
+class _SpanMemory:
+    """
+    timings 阶段的内存峰值
+
+    tracemalloc 只有一个全局峰值，阶段开始时把当前峰值计入所有未结束的阶段后清零，
+    阶段结束时取各自见到的最大峰值。
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.open = []
+
+    def _observe(self):
+        import tracemalloc
+        _, peak = tracemalloc.get_traced_memory()
+        for span in self.open:
+            span.state["peak"] = max(span.state["peak"], peak)
+
+    def enter(self, span):
+        import tracemalloc
+        if not tracemalloc.is_tracing():
+            return
+        with self.lock:
+            self._observe()
+            tracemalloc.reset_peak()
+            current, _ = tracemalloc.get_traced_memory()
+            span.state = {"base": current, "peak": current}
+            self.open.append(span)
+
+    def exit(self, span):
+        if span.state is None:
+            return
+        with self.lock:
+            self._observe()
+            if span in self.open:
+                self.open.remove(span)
+        span.attrs["peakBytes"] = max(0, span.state["peak"] - span.state["base"])
+
+class Capture:
+    """
+    一次调用的 cProfile + tracemalloc 采集
+
+    Args:
+        label: 文件名前缀，如脚本名或工作进程方法名
+        directory: 输出目录
+        memory: 是否采集 tracemalloc
+    """
+
+    def __init__(self, label, directory=None, memory=MEMORY):
+        self.label = label
+        self.directory = directory or PROFILE_DIR
+        self.memory = memory
+        self.profiler = None
+        self.span_memory = None
+        self.owns_tracing = False
+        self.started_at = None
+        self.base_bytes = 0
+        self.meta = {}
+
+    def start(self):
+        import cProfile
+        import tracemalloc
+        self.started_at = time.time()
+        if self.memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(FRAMES)
+                self.owns_tracing = True
+            if hasattr(tracemalloc, "reset_peak"):
+                tracemalloc.reset_peak()
+                self.span_memory = _SpanMemory()
+                timings.add_hook(self.span_memory.enter, self.span_memory.exit)
+            self.base_bytes = tracemalloc.get_traced_memory()[0]
+        self.profiler = cProfile.Profile()
+        self.profiler.enable()
+        return self
+
+    def stop(self):
+        """停止采集并写出文件，返回文件名前缀"""
+        import tracemalloc
+        self.profiler.disable()
+        elapsed_ms = round((time.time() - self.started_at) * 1000, 2)
+
+        memory = None
+        if self.memory and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            snapshot = tracemalloc.take_snapshot()
+            if self.span_memory is not None:
+                timings.remove_hook(self.span_memory.enter, self.span_memory.exit)
+            if self.owns_tracing:
+                tracemalloc.stop()
+            memory = {
+                "peakBytes": max(0, peak - self.base_bytes),
+                "currentBytes": max(0, current - self.base_bytes),
+                "top": top_allocations(snapshot, TOP),
+            }
+
+        os.makedirs(self.directory, exist_ok=True)
+        base = _output_base(self.directory, self.label)
+        self.profiler.dump_stats(base + ".prof")
+
+        collector = timings.current()
+        report = {
+            "label": self.label,
+            "argv": sys.argv,
+            "pid": os.getpid(),
+            "startedAt": self.started_at,
+            "elapsedMs": elapsed_ms,
+            **self.meta,
+        }
+        if memory is not None:
+            report.update(memory)
+        if collector is not None:
+            report["spans"] = [item for item in collector.spans if "peakBytes" in item or memory is None]
+        with open(base + ".mem.json", "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=1)
+        return base
+
+_request_lock = threading.Lock()
+
+@contextmanager
+def capture(label, **meta):
+    """
+    采集 with 块内的一次调用（常驻工作进程的请求），未设置 SCRIPT_PROFILE_DIR 时什么也不做；
+    采集的调用逐个执行
+    """
+    if not enabled():
+        yield None
+        return
+    with _request_lock:
+        with timings.collect() if not timings.enabled() else nullcontext():
+            item = Capture(label)
+            item.meta = meta
+            item.start()
+            try:
+                yield item
+            finally:
+                try:
+                    item.stop()
+                except Exception as e:
+                    print(f"Warning: 写出性能采集结果失败: {e}", file=sys.stderr)
+
+def install(label=None):
+    """
+    设置了 SCRIPT_PROFILE_DIR 时，从现在起采集本进程，退出时写出结果（脚本在 __main__ 开头调用）
+
+    Args:
+        label: 文件名前缀，默认脚本文件名
+    """
+    if not enabled():
+        return None
+    import atexit
+    timings.ensure_collector()
+    item = Capture(label or os.path.splitext(os.path.basename(sys.argv[0]))[0] or "python")
+    item.start()
+
+    def finish():
+        try:
+            item.stop()
+        except Exception as e:
+            print(f"Warning: 写出性能采集结果失败: {e}", file=sys.stderr)
+
+    atexit.register(finish)
+    return item
+
+def _load_runs(directory, label=None):
+    """目录中的 (prof 文件, mem.json 内容)"""
+    runs = []
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(".prof") or (label and not name.startswith(label + "-")):
+            continue
+        prof = os.path.join(directory, name)
+        mem_path = prof[:-len(".prof")] + ".mem.json"
+        mem = None
+        if os.path.exists(mem_path):
+            with open(mem_path, encoding="utf-8") as f:
+                mem = json.load(f)
+        runs.append((prof, mem))
+    return runs
+
+def aggregate(directory, label=None, sort="cumulative", top=30):
+    """
+    汇总多次运行
+
+    Returns:
+        {"runs", "functions": [...], "allocations": [...], "spans": [...], "peaks": {...}}
+    """
+    import pstats
+    runs = _load_runs(directory, label)
+    if not runs:
+        return {"runs": 0, "functions": [], "allocations": [], "spans": [], "peaks": {}}
+
+    stats = pstats.Stats(*[prof for prof, _ in runs])
+    field = {"cumulative": "cumtime", "tottime": "tottime", "calls": "calls"}[sort]
+    functions = []
+    for (filename, line, func), (cc, nc, tt, ct, _) in stats.stats.items():
+        functions.append({
+            "function": f"{os.path.relpath(filename, SERVER_DIR) if filename.startswith(SERVER_DIR) else filename}"
+                        f":{line}({func})",
+            "calls": nc,
+            "tottime": round(tt, 4),
+            "cumtime": round(ct, 4),
+        })
+    functions.sort(key=lambda item: item[field], reverse=True)
+
+    # 分配位置按本项目代码位置（没有时按最内层位置）合并，取各次运行中的最大值
+    allocations = {}
+    span_peaks = {}
+    peaks = {}
+    for _, mem in runs:
+        if not mem:
+            continue
+        peaks.setdefault(mem.get("label"), []).append(mem.get("peakBytes", 0))
+        for alloc in mem.get("top", []):
+            where = alloc.get("ours") or alloc.get("site")
+            name = f"{where['file']}:{where['line']}"
+            entry = allocations.setdefault(name, {"location": name, "maxBytes": 0, "runs": 0})
+            entry["maxBytes"] = max(entry["maxBytes"], alloc["sizeBytes"])
+            entry["runs"] += 1
+        for item in mem.get("spans", []):
+            if "peakBytes" not in item:
+                continue
+            entry = span_peaks.setdefault(item["span"], {"span": item["span"], "maxPeakBytes": 0,
+                                                        "maxMs": 0, "runs": 0})
+            entry["maxPeakBytes"] = max(entry["maxPeakBytes"], item["peakBytes"])
+            entry["maxMs"] = max(entry["maxMs"], item["ms"])
+            entry["runs"] += 1
+
+    return {
+        "runs": len(runs),
+        "functions": functions[:top],
+        "allocations": sorted(allocations.values(), key=lambda item: item["maxBytes"], reverse=True)[:top],
+        "spans": sorted(span_peaks.values(), key=lambda item: item["maxPeakBytes"], reverse=True)[:top],
+        "peaks": {name: {"max": max(values), "median": sorted(values)[len(values) // 2], "runs": len(values)}
+                  for name, values in peaks.items()},
+    }
+
+def _mb(size):
+    return f"{size / 1024 / 1024:9.1f} MB"
+
+def print_report(report, sort):
+    print(f"{report['runs']} 次运行")
+    print(f"\n热点函数（按 {sort} 排序，各次运行合计）:")
+    print(f"{'calls':>10s} {'tottime':>10s} {'cumtime':>10s}  函数")
+    for item in report["functions"]:
+        print(f"{item['calls']:10d} {item['tottime']:10.3f} {item['cumtime']:10.3f}  {item['function']}")
+
+    if report["peaks"]:
+        print("\n内存峰值:")
+        for name, peak in sorted(report["peaks"].items(), key=lambda kv: kv[1]["max"], reverse=True):
+            print(f"  {name:40s} 最大 {_mb(peak['max'])}  中位数 {_mb(peak['median'])}  ({peak['runs']} 次)")
+    if report["spans"]:
+        print("\n各阶段内存峰值（最大）:")
+        for item in report["spans"]:
+            print(f"  {item['span']:40s} {_mb(item['maxPeakBytes'])}  {item['maxMs']:10.1f} ms  ({item['runs']} 次)")
+    if report["allocations"]:
+        print("\n结束时占用最多的分配位置（最大）:")
+        for item in report["allocations"]:
+            print(f"  {_mb(item['maxBytes'])}  {item['location']}  ({item['runs']} 次)")
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="汇总 SCRIPT_PROFILE_DIR 中的多次采集结果")
+    parser.add_argument("directory", nargs="?", default=PROFILE_DIR, help="采集结果目录")
+    parser.add_argument("--label", default=None, help="只汇总该标签（脚本名或工作进程方法名）")
+    parser.add_argument("--sort", choices=["cumulative", "tottime", "calls"], default="cumulative")
+    parser.add_argument("--top", type=int, default=30)
+    parser.add_argument("--json", action="store_true", help="输出 JSON")
+    args = parser.parse_args()
+    if not args.directory:
+        parser.error("需要采集结果目录")
+
+    report = aggregate(args.directory, args.label, args.sort, args.top)
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print_report(report, args.sort)
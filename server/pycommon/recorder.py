@@ -0,0 +1,219 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+上游调用录制与回放
+
+离线时无法运行任何脚本（所有数据都来自 akshare 或 WindPy）。通过环境变量切换:
+
+- UPSTREAM_MODE=record: 照常调用上游，同时把返回值（DataFrame、WindData 等）保存到本地
+- UPSTREAM_MODE=replay: 不访问上游（不导入 akshare/WindPy），从录制文件返回结果
+- 其他值或未设置: 直接调用上游
+
+每次调用保存为一个 gzip 压缩的 pickle 文件: <目录>/<来源>/<函数名>/<参数摘要>.pkl.gz，
+目录由 UPSTREAM_RECORD_DIR 指定，默认 server/.cache/recordings。
+WindData 保存为不依赖 WindPy 的 RecordedWindData（ErrorCode、ErrorMsg、Codes、Fields、Times、Data）。
+
+回放时可以注入延迟和故障，用于离线的性能测试和回归测试:
+- UPSTREAM_REPLAY_LATENCY: 每次调用的延迟（毫秒），如 "50" 或 "20-80"（均匀分布）
+- UPSTREAM_REPLAY_FAILURE_RATE: 注入 ConnectionError 的概率（0-1）
+- UPSTREAM_REPLAY_SEED: 随机数种子，相同种子的回放结果相同
+- UPSTREAM_REPLAY_MATCH=name: 参数不同（如日期变了）时按函数名取最近一次录制
+
+用法:
+    python3 recorder.py [目录]      # 列出录制的调用
+"""
+
+import os
+import sys
+import glob
+import gzip
+import time
+import pickle
+import random
+import hashlib
+import threading
+
+LIVE = "live"
+RECORD = "record"
+REPLAY = "replay"
+
+MODE = os.environ.get("UPSTREAM_MODE", LIVE)
+
+RECORD_DIR = os.environ.get("UPSTREAM_RECORD_DIR") or os.path.join(
+    os.environ.get("AKSHARE_CACHE_DIR") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".cache"),
+    "recordings",
+)
+
+class ReplayMissError(LookupError):
+    """回放模式下没有对应的录制"""
+
+class RecordedWindData:
+    """不依赖 WindPy 的 WindData 副本"""
+
+    FIELDS = ("ErrorCode", "ErrorMsg", "Codes", "Fields", "Times", "Data")
+
+    def __init__(self, **values):
+        for field in self.FIELDS:
+            setattr(self, field, values.get(field))
+        if self.ErrorCode is None:
+            self.ErrorCode = 0
+
+    @classmethod
+    def from_wind(cls, data):
+        return cls(**{field: getattr(data, field, None) for field in cls.FIELDS})
+
+    def __repr__(self):
+        return f"RecordedWindData(ErrorCode={self.ErrorCode}, Codes={self.Codes}, Fields={self.Fields})"
+
+def _parse_latency(spec):
+    """"50" -> (50, 50)，"20-80" -> (20, 80)，单位毫秒"""
+    if not spec:
+        return (0.0, 0.0)
+    low, _, high = spec.partition("-")
+    low = float(low)
+    return (low, float(high) if high else low)
+
+def call_key(name, args, kwargs):
+    """调用的标识: 函数名 + 参数"""
+    return repr((name, args, sorted(kwargs.items())))
+
+class Recorder:
+    """
+    单个来源（akshare / wind）的录制与回放
+
+    Args:
+        source: 来源名，作为录制目录的子目录
+        mode: live / record / replay
+        root: 录制目录
+        latency: 回放延迟（毫秒），(最小, 最大)
+        failure_rate: 回放时注入故障的概率
+        seed: 随机数种子
+        match: exact（按函数名和参数）或 name（只按函数名）
+        convert: 保存前转换返回值的函数，如 WindData -> RecordedWindData
+    """
+
+    def __init__(self, source, mode=None, root=None, latency=None, failure_rate=None, seed=None,
+                 match=None, convert=None):
+        self.source = source
+        self.mode = mode or MODE
+        self.root = os.path.join(root or RECORD_DIR, source)
+        self.latency = latency if latency is not None else _parse_latency(os.environ.get("UPSTREAM_REPLAY_LATENCY"))
+        self.failure_rate = failure_rate if failure_rate is not None else float(
+            os.environ.get("UPSTREAM_REPLAY_FAILURE_RATE", "0"))
+        seed = seed if seed is not None else os.environ.get("UPSTREAM_REPLAY_SEED")
+        self.random = random.Random(seed)
+        self.match = match or os.environ.get("UPSTREAM_REPLAY_MATCH", "exact")
+        self.convert = convert
+        self.lock = threading.Lock()
+        self.stats = {"recorded": 0, "replayed": 0, "misses": 0, "injectedFailures": 0}
+
+    @property
+    def recording(self):
+        return self.mode == RECORD
+
+    @property
+    def replaying(self):
+        return self.mode == REPLAY
+
+    def _path(self, name, key):
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.root, name, f"{digest}.pkl.gz")
+
+    def _count(self, field):
+        with self.lock:
+            self.stats[field] += 1
+
+    def save(self, name, args, kwargs, value):
+        """保存一次调用的返回值"""
+        key = call_key(name, args, kwargs)
+        path = self._path(name, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if self.convert is not None:
+            value = self.convert(value)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with gzip.open(tmp_path, "wb", compresslevel=6) as f:
+                pickle.dump({"key": key, "recordedAt": time.time(), "value": value}, f,
+                            protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+            self._count("recorded")
+        except (OSError, pickle.PicklingError, TypeError, AttributeError) as e:
+            print(f"Warning: 录制 {self.source}.{name} 失败: {e}", file=sys.stderr)
+
+    def load(self, name, args, kwargs):
+        """
+        读取录制的返回值
+
+        Raises:
+            ReplayMissError: 没有对应的录制
+        """
+        key = call_key(name, args, kwargs)
+        path = self._path(name, key)
+        if not os.path.exists(path) and self.match == "name":
+            candidates = glob.glob(os.path.join(self.root, name, "*.pkl.gz"))
+            path = max(candidates, key=os.path.getmtime) if candidates else path
+        try:
+            with gzip.open(path, "rb") as f:
+                record = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError) as e:
+            self._count("misses")
+            raise ReplayMissError(f"没有 {self.source}.{name} 的录制: {key}") from e
+        self._count("replayed")
+        return record["value"]
+
+    def _inject(self, name):
+        """按配置注入延迟和故障"""
+        with self.lock:
+            low, high = self.latency
+            delay = self.random.uniform(low, high) / 1000.0 if high > 0 else 0.0
+            fail = self.failure_rate > 0 and self.random.random() < self.failure_rate
+        if delay > 0:
+            time.sleep(delay)
+        if fail:
+            self._count("injectedFailures")
+            raise ConnectionError(f"回放注入的故障: {self.source}.{name}")
+
+    def wrap(self, name, target):
+        """
+        按模式包装上游函数
+
+        Args:
+            name: 函数名
+            target: 上游函数，回放模式下可以为 None
+        """
+        if self.replaying:
+            def replay(*args, **kwargs):
+                self._inject(name)
+                return self.load(name, args, kwargs)
+            replay.__name__ = name
+            return replay
+
+        if self.recording:
+            def record(*args, **kwargs):
+                value = target(*args, **kwargs)
+                self.save(name, args, kwargs, value)
+                return value
+            record.__name__ = name
+            return record
+
+        return target
+
+    def get_stats(self):
+        with self.lock:
+            stats = dict(self.stats)
+        stats["mode"] = self.mode
+        return stats
+
+def list_recordings(root=RECORD_DIR):
+    """列出录制的调用: [(来源/函数名, 文件数, 字节数)]"""
+    summary = {}
+    for path in glob.glob(os.path.join(root, "*", "*", "*.pkl.gz")):
+        source, name = path.split(os.sep)[-3:-1]
+        count, size = summary.get((source, name), (0, 0))
+        summary[(source, name)] = (count + 1, size + os.path.getsize(path))
+    return [(f"{source}.{name}", count, size) for (source, name), (count, size) in sorted(summary.items())]
+
+if __name__ == "__main__":
+    root = sys.argv[1] if len(sys.argv) > 1 else RECORD_DIR
+    for name, count, size in list_recordings(root):
+        print(f"{name:50s} {count:5d} 个  {size / 1024:10.1f} KB")
@@ -0,0 +1,147 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+上游调用的重试、退避与期限
+
+- call(): 按 RetryPolicy 重试可重试的错误，退避时间指数增长并加随机抖动（full jitter）
+- deadline(): 为当前上下文设置期限，嵌套时取更早的一个；重试前如果退避后已超过期限，
+  直接抛出原错误，不会在期限将尽时再睡眠
+- remaining(): 当前期限剩余的秒数，供 HTTP 超时、等待等使用
+
+期限保存在 contextvars 中，随调用链向下传递；在新线程中执行时用 run_in_context()
+包装，把调用方的期限带进线程。
+"""
+
+import sys
+import json
+import time
+import random
+import contextvars
+from contextlib import contextmanager
+
+# 当前上下文的期限（time.monotonic() 时刻），None 表示不限
+_deadline = contextvars.ContextVar("upstream_deadline", default=None)
+
+class DeadlineExceeded(TimeoutError):
+    """调用方的期限已到"""
+
+class RetryableError(Exception):
+    """明确可以重试的错误（例如上游返回了表示临时故障的错误码）"""
+
+class RetryPolicy:
+    """
+    重试策略
+
+    Args:
+        attempts: 最多尝试次数（含第一次）
+        base: 第一次重试前的退避上限（秒）
+        cap: 单次退避的最大值（秒）
+    """
+
+    __slots__ = ("attempts", "base", "cap")
+
+    def __init__(self, attempts=3, base=0.2, cap=2.0):
+        self.attempts = attempts
+        self.base = base
+        self.cap = cap
+
+    def backoff(self, attempt):
+        """第 attempt 次失败后的退避时间: [0, min(cap, base * 2^(attempt-1))) 内随机"""
+        return random.uniform(0, min(self.cap, self.base * (2 ** (attempt - 1))))
+
+DEFAULT_POLICY = RetryPolicy()
+
+# HTTP 状态码中表示临时故障的
+RETRYABLE_STATUSES = frozenset([429, 500, 502, 503, 504])
+
+def is_retryable(error):
+    """
+    判断错误是否值得重试: 连接失败、超时、限流/5xx、响应体不完整（被限流时常返回空或 HTML）
+
+    参数错误、数据缺失等 ValueError/KeyError 不重试
+    """
+    if isinstance(error, DeadlineExceeded):
+        return False
+    if isinstance(error, (RetryableError, ConnectionError, TimeoutError, json.JSONDecodeError)):
+        return True
+    # requests 的异常只会来自已经导入的 requests，这里不为判断而导入它
+    requests = sys.modules.get("requests")
+    if requests is not None:
+        if isinstance(error, requests.exceptions.HTTPError):
+            response = getattr(error, "response", None)
+            return response is not None and response.status_code in RETRYABLE_STATUSES
+        if isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                              requests.exceptions.ChunkedEncodingError)):
+            return True
+    return False
+
+def remaining():
+    """当前期限剩余的秒数（可能为负），没有期限时为 None"""
+    deadline_at = _deadline.get()
+    if deadline_at is None:
+        return None
+    return deadline_at - time.monotonic()
+
+def check_deadline(what="调用"):
+    """期限已到时抛出 DeadlineExceeded"""
+    left = remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceeded(f"{what}前期限已到")
+
+@contextmanager
+def deadline(seconds):
+    """
+    在 with 块内设置期限；外层已有更早的期限时保留外层的
+
+    Args:
+        seconds: 期限（秒），None 表示不增加限制
+    """
+    if seconds is None:
+        yield
+        return
+    deadline_at = time.monotonic() + seconds
+    current = _deadline.get()
+    if current is not None:
+        deadline_at = min(deadline_at, current)
+    token = _deadline.set(deadline_at)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+def run_in_context(func):
+    """包装 func，使它在新线程中运行时仍使用当前上下文（包括期限）"""
+    context = contextvars.copy_context()
+    return lambda: context.run(func)
+
+def call(func, *args, policy=None, retryable=is_retryable, name=None, **kwargs):
+    """
+    调用 func(*args, **kwargs)，可重试的错误按策略退避后重试
+
+    Args:
+        func: 上游调用
+        policy: RetryPolicy，默认 DEFAULT_POLICY
+        retryable: 判断错误是否可重试的函数
+        name: 错误信息中使用的名称
+
+    Raises:
+        DeadlineExceeded: 开始调用前期限已到
+        最后一次尝试的错误，或退避会超过期限时当次的错误
+    """
+    policy = policy or DEFAULT_POLICY
+    name = name or getattr(func, "__name__", "调用")
+    attempt = 0
+    while True:
+        check_deadline(name)
+        attempt += 1
+        try:
+            return func(*args, **kwargs)
+        except Exception as e:
+            if attempt >= policy.attempts or not retryable(e):
+                raise
+            delay = policy.backoff(attempt)
+            left = remaining()
+            if left is not None and delay >= left:
+                # 退避后已没有时间再试一次
+                raise
+            time.sleep(delay)
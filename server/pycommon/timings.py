@@ -0,0 +1,292 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+分阶段耗时统计
+
+一次请求慢的时候，用来区分时间花在导入、上游调用、数据处理还是序列化上。
+通过环境变量 SCRIPT_TIMINGS 开启:
+
+- stderr: 脚本退出时在 stderr 输出 NDJSON，每个阶段一行 {"span": ..., "start": ..., "ms": ...}，
+  最后一行 {"span": "total", "ms": ..., "summary": {...}}
+- json: 结果为 JSON 对象时加一个 _timings 字段；结果不是对象（如列表）时仍输出到 stderr
+- 未设置: 不统计，span() 返回同一个空的上下文管理器，开销只有一次 ContextVar 读取
+
+阶段名约定: import、upstream.<函数名>（akshare）/ wind.<函数名>（WindPy）、transform[.<说明>]、serialize。
+start 为相对于起点（进程启动或请求开始）的毫秒数。并发的上游调用各自计时，summary 中按类别累加，
+因此可能大于总耗时。
+
+常驻工作进程按请求统计（collect()），结果随响应返回。fork 出的子进程（akshare_api/zygote.py）
+从 fork 时刻重新开始统计，import 阶段只包含子进程自己的导入。
+
+用法:
+    from pycommon import timings
+
+    with timings.span("transform"):
+        ...
+    print(timings.dumps(result, ensure_ascii=False))
+"""
+
+import os
+import sys
+import json
+import time
+import atexit
+import threading
+import contextvars
+from contextlib import contextmanager
+
+STDERR = "stderr"
+JSON = "json"
+
+MODE = os.environ.get("SCRIPT_TIMINGS", "").lower()
+if MODE in ("1", "true"):
+    MODE = STDERR
+if MODE not in (STDERR, JSON):
+    MODE = ""
+
+def _process_start():
+    """进程启动时刻（perf_counter 时间轴），取不到时使用本模块导入的时刻"""
+    now = time.perf_counter()
+    try:
+        with open("/proc/self/stat") as f:
+            # 进程名可能包含空格，从最后一个 ")" 之后按空格分割，starttime 为第 22 个字段
+            fields = f.read().rsplit(")", 1)[1].split()
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        started = float(fields[19]) / os.sysconf("SC_CLK_TCK")
+        return now - max(0.0, uptime - started)
+    except (OSError, ValueError, IndexError, AttributeError):
+        return now
+
+class Collector:
+    """一次脚本运行或一个请求的阶段记录"""
+
+    def __init__(self, origin=None):
+        self.origin = time.perf_counter() if origin is None else origin
+        self.spans = []
+        self.attached = False
+
+    def add(self, name, start, end, **attrs):
+        item = {"span": name, "start": round((start - self.origin) * 1000, 2), "ms": round((end - start) * 1000, 2)}
+        if attrs:
+            item.update(attrs)
+        # list.append 是原子的，run_fetches 的线程可以直接写入
+        self.spans.append(item)
+
+    def summary(self):
+        """按类别（阶段名第一个 "." 之前的部分）累加的耗时"""
+        totals = {}
+        for item in self.spans:
+            category = item["span"].split(".", 1)[0]
+            totals[category] = round(totals.get(category, 0) + item["ms"], 2)
+        return totals
+
+    def report(self):
+        return {
+            "totalMs": round((time.perf_counter() - self.origin) * 1000, 2),
+            "summary": self.summary(),
+            "spans": list(self.spans),
+        }
+
+# 阶段开始/结束时的回调 (enter(span), exit(span))，pycommon.profiling 用来记录每个阶段的内存峰值；
+# 修改时整体替换，进行中的阶段遍历的是替换前的元组
+_hooks = ()
+_hooks_lock = threading.Lock()
+
+def add_hook(enter, exit_):
+    """
+    注册阶段回调，之后每个阶段开始时调用 enter(span)，结束时调用 exit_(span)
+
+    Args:
+        enter / exit_: 接收 span 的可调用对象，span.name、span.attrs 为阶段名和字段
+    """
+    global _hooks
+    with _hooks_lock:
+        _hooks = _hooks + ((enter, exit_),)
+
+def remove_hook(enter, exit_):
+    """注销 add_hook 注册的回调，没有注册过时什么也不做"""
+    global _hooks
+    with _hooks_lock:
+        _hooks = tuple(hook for hook in _hooks if hook != (enter, exit_))
+
+class _Span:
+    __slots__ = ("collector", "name", "attrs", "start", "state")
+
+    def __init__(self, collector, name, attrs):
+        self.collector = collector
+        self.name = name
+        self.attrs = attrs
+        self.state = None
+
+    def __enter__(self):
+        for enter, _ in _hooks:
+            enter(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter()
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        for _, exit_ in _hooks:
+            exit_(self)
+        self.collector.add(self.name, self.start, end, **self.attrs)
+        return False
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+_NULL_SPAN = _NullSpan()
+
+_current = contextvars.ContextVar("timings_collector", default=None)
+
+def span(name, **attrs):
+    """
+    记录一个阶段的耗时，未开启时什么也不做
+
+    Args:
+        name: 阶段名，如 "transform"、"upstream.stock_zh_a_spot_em"
+        **attrs: 附加到这一行记录的字段
+    """
+    collector = _current.get()
+    if collector is None:
+        return _NULL_SPAN
+    return _Span(collector, name, attrs)
+
+def enabled():
+    return _current.get() is not None
+
+def current():
+    """当前上下文的 Collector，没有时为 None"""
+    return _current.get()
+
+def ensure_collector():
+    """
+    当前上下文没有 Collector 时创建一个（不输出），用于需要阶段记录但没有设置 SCRIPT_TIMINGS 的场合
+
+    Returns:
+        当前上下文的 Collector
+    """
+    collector = _current.get()
+    if collector is None:
+        collector = Collector(_process_start())
+        _current.set(collector)
+    return collector
+
+@contextmanager
+def collect():
+    """
+    在 with 块内单独统计（常驻工作进程的每个请求），不论 SCRIPT_TIMINGS 是否设置
+
+    Yields:
+        Collector，用 report() 取结果
+    """
+    collector = Collector()
+    token = _current.set(collector)
+    try:
+        yield collector
+    finally:
+        _current.reset(token)
+
+def mark_imported():
+    """记录从进程启动到现在的 import 阶段（脚本在 __main__ 开头调用）"""
+    collector = _current.get()
+    if collector is not None and collector is _process:
+        collector.add("import", collector.origin, time.perf_counter())
+
+class _PendingReport:
+    """序列化到这个占位值时，前面的字段已经序列化完，由 default 回调结束 serialize 阶段并换成报告"""
+    __slots__ = ()
+
+def dumps_with_report(payload, key, collector, **kwargs):
+    """
+    序列化 payload 的副本，末尾加上 key 字段为 collector 的报告，只序列化一次
+
+    serialize 阶段为从开始序列化到序列化至 key 字段（即 payload 原有的全部字段），包含在报告中。
+
+    Args:
+        payload: 结果对象（dict）
+        key: 报告字段名，如 "_timings"、"timings"
+        collector: Collector
+        **kwargs: 传给 json.dumps 的参数（可以有 default）
+    """
+    fallback = kwargs.pop("default", None)
+    started = time.perf_counter()
+
+    def default(value):
+        if isinstance(value, _PendingReport):
+            collector.add("serialize", started, time.perf_counter())
+            return collector.report()
+        if fallback is not None:
+            return fallback(value)
+        raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+    payload = dict(payload)
+    payload.pop(key, None)
+    payload[key] = _PendingReport()
+    return json.dumps(payload, default=default, **kwargs)
+
+def dumps(result, **kwargs):
+    """
+    json.dumps，同时记录 serialize 阶段；SCRIPT_TIMINGS=json 且结果为对象时在副本上加 _timings 字段
+    """
+    collector = _current.get()
+    if collector is None:
+        return json.dumps(result, **kwargs)
+
+    if MODE == JSON and collector is _process and isinstance(result, dict):
+        collector.attached = True
+        return dumps_with_report(result, "_timings", collector, **kwargs)
+
+    with span("serialize"):
+        return json.dumps(result, **kwargs)
+
+def write_ndjson(collector, stream=None):
+    """以 NDJSON 输出各阶段和总计"""
+    stream = stream or sys.stderr
+    report = collector.report()
+    lines = [json.dumps(item, ensure_ascii=False) for item in report["spans"]]
+    lines.append(json.dumps({"span": "total", "ms": report["totalMs"], "summary": report["summary"]},
+                            ensure_ascii=False))
+    try:
+        stream.write("\n".join(lines) + "\n")
+        stream.flush()
+    except (OSError, ValueError):
+        pass
+
+def detach():
+    """
+    退出时不输出整个进程的统计（自身不处理请求的常驻进程，如 zygote；fork 出的子进程仍各自输出）
+    """
+    if _process is not None:
+        _process.attached = True
+
+def flush():
+    """
+    输出整个进程的统计（SCRIPT_TIMINGS 开启且尚未输出时），一次性脚本退出时自动调用；
+    不经过解释器正常退出的进程（zygote fork 出的子进程）显式调用
+    """
+    if _process is not None and not _process.attached:
+        _process.attached = True
+        write_ndjson(_process)
+
+def _restart_after_fork():
+    global _process
+    _process = Collector()
+    _current.set(_process)
+
+# 一次性脚本：整个进程一个 Collector
+_process = None
+if MODE:
+    _process = Collector(_process_start())
+    _current.set(_process)
+    atexit.register(flush)
+    if hasattr(os, "register_at_fork"):
+        os.register_at_fork(after_in_child=_restart_after_fork)
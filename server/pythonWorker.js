@@ -0,0 +1,168 @@
+import { spawn } from 'child_process';
+import path from 'path';
+import readline from 'readline';
+import { fileURLToPath } from 'url';
+import { isTimingsEnabled, logTimings } from './scriptTimings.js';
+
+const __filename = fileURLToPath(import.meta.url);
+const __dirname = path.dirname(__filename);
+
+/**
+ * AKShare 常驻工作进程客户端
+ *
+ * 与 akshare_api/worker.py 通过 stdin/stdout 上的 JSON-RPC 通信，
+ * akshare/pandas 只在工作进程启动时导入一次。
+ * 设置环境变量 AKSHARE_WORKER=false 可关闭，回退到每次请求启动 Python 脚本。
+ */
+
+const WORKER_SCRIPT = path.join(__dirname, 'akshare_api', 'worker.py');
+const READY_TIMEOUT = 60000; // 等待工作进程就绪（导入 akshare）
+const CALL_TIMEOUT = 300000; // 单次调用超时（与一次性脚本保持一致，5分钟）
+
+let worker = null;
+let readyPromise = null;
+let nextId = 1;
+const pending = new Map();
+
+/**
+ * 是否启用常驻工作进程
+ */
+export function isWorkerEnabled() {
+  return process.env.AKSHARE_WORKER !== 'false';
+}
+
+/**
+ * 启动工作进程（已启动则复用）
+ * @returns {Promise<void>} 工作进程就绪
+ */
+function startWorker() {
+  if (readyPromise) {
+    return readyPromise;
+  }
+
+  readyPromise = new Promise((resolve, reject) => {
+    const pythonCmd = process.platform === 'win32' ? 'python' : 'python3';
+    const proc = spawn(pythonCmd, [WORKER_SCRIPT], { cwd: path.dirname(WORKER_SCRIPT) });
+    worker = proc;
+
+    const readyTimer = setTimeout(() => {
+      reject(new Error('AKShare 工作进程启动超时'));
+      proc.kill();
+    }, READY_TIMEOUT);
+
+    const lines = readline.createInterface({ input: proc.stdout });
+    lines.on('line', (line) => {
+      let message;
+      try {
+        message = JSON.parse(line);
+      } catch (error) {
+        console.warn('⚠️ 工作进程输出无法解析:', line);
+        return;
+      }
+
+      // 启动完成通知
+      if (message.id === null && message.result === 'ready') {
+        clearTimeout(readyTimer);
+        console.log('🐍 AKShare 工作进程已就绪, pid:', proc.pid);
+        resolve();
+        return;
+      }
+
+      const call = pending.get(message.id);
+      if (!call) {
+        return;
+      }
+      pending.delete(message.id);
+      clearTimeout(call.timer);
+      logTimings(`worker:${call.method}`, message.timings);
+
+      if (message.error) {
+        // 标记为 Python 端方法执行失败（区别于工作进程本身不可用）
+        const error = new Error(message.error.message);
+        error.remote = true;
+        call.reject(error);
+      } else {
+        call.resolve(message.result);
+      }
+    });
+
+    proc.stderr.on('data', (data) => {
+      console.warn('Python worker stderr:', data.toString());
+    });
+
+    proc.on('error', (error) => {
+      clearTimeout(readyTimer);
+      reject(new Error(`Failed to start Python worker: ${error.message}`));
+
+      // 启动失败（如 ENOENT）时不一定会触发 'exit'，这里同样清空，下次调用时重新启动
+      for (const call of pending.values()) {
+        clearTimeout(call.timer);
+        call.reject(new Error(`Python worker error: ${error.message}`));
+      }
+      pending.clear();
+      if (worker === proc) {
+        worker = null;
+        readyPromise = null;
+      }
+    });
+
+    proc.on('exit', (code) => {
+      clearTimeout(readyTimer);
+      console.warn(`⚠️ AKShare 工作进程退出, code: ${code}`);
+      reject(new Error(`Python worker exited with code ${code}`));
+
+      // 所有未完成请求失败，下次调用时重新启动
+      for (const call of pending.values()) {
+        clearTimeout(call.timer);
+        call.reject(new Error(`Python worker exited with code ${code}`));
+      }
+      pending.clear();
+      if (worker === proc) {
+        worker = null;
+        readyPromise = null;
+      }
+    });
+  });
+
+  return readyPromise;
+}
+
+/**
+ * 调用工作进程中的方法
+ * @param {string} method - 方法名，如 get_sectors_data
+ * @param {Array|Object} params - 参数
+ * @returns {Promise<any>} 方法返回值
+ */
+export async function callWorker(method, params = []) {
+  await startWorker();
+  if (!worker) {
+    throw new Error('AKShare 工作进程不可用');
+  }
+
+  return new Promise((resolve, reject) => {
+    const id = nextId++;
+    const timer = setTimeout(() => {
+      pending.delete(id);
+      reject(new Error(`工作进程调用超时: ${method}`));
+    }, CALL_TIMEOUT);
+
+    pending.set(id, { resolve, reject, timer, method });
+    // 工作进程内的上游重试不超过调用超时；SCRIPT_TIMINGS 开启时请求分阶段耗时
+    const request = { id, method, params, deadlineMs: CALL_TIMEOUT };
+    if (isTimingsEnabled()) {
+      request.timings = true;
+    }
+    worker.stdin.write(JSON.stringify(request) + '\n');
+  });
+}
+
+/**
+ * 停止工作进程
+ */
+export function stopWorker() {
+  if (worker) {
+    worker.stdin.end();
+    worker = null;
+    readyPromise = null;
+  }
+}
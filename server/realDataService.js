@@ -6,6 +6,7 @@
 import { spawn } from 'child_process';
 import { fileURLToPath } from 'url';
 import { dirname, join } from 'path';
+import { splitTimings, takeTimings, logTimings } from './scriptTimings.js';
 
 const __filename = fileURLToPath(import.meta.url);
 const __dirname = dirname(__filename);
@@ -33,6 +34,10 @@ export async function fetchRealData(date) {
     });
     
     python.on('close', (code) => {
+      const split = splitTimings(stderr);
+      stderr = split.rest;
+      logTimings('akshare-fetch.py', split.timings);
+      
       if (code !== 0) {
         reject(new Error(`Python script exited with code ${code}\n${stderr}`));
         return;
@@ -40,6 +45,7 @@ export async function fetchRealData(date) {
       
       try {
         const result = JSON.parse(stdout);
+        logTimings('akshare-fetch.py', takeTimings(result));
         
         if (result.error) {
           reject(new Error(result.message || result.error));
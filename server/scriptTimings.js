@@ -0,0 +1,89 @@
+/**
+ * Python 脚本分阶段耗时
+ *
+ * 设置环境变量 SCRIPT_TIMINGS=stderr（或 json）后，Python 脚本输出各阶段耗时
+ * （import、upstream.*、transform、serialize，见 pycommon/timings.py）：
+ * - stderr: 脚本在 stderr 输出 NDJSON，每行 {"span": ..., "start": ..., "ms": ...}，最后一行 span 为 "total"
+ * - json: 结果对象带 _timings 字段
+ * - 常驻工作进程：请求带 timings: true，响应带 timings 字段
+ * 这里把三种形式统一为 { totalMs, summary, spans } 并按请求输出一行日志。
+ */
+
+/**
+ * 是否开启耗时统计
+ */
+export function isTimingsEnabled() {
+  const mode = process.env.SCRIPT_TIMINGS;
+  return Boolean(mode) && mode !== 'false';
+}
+
+/**
+ * 从 stderr 文本中分离耗时记录
+ * @param {string} text - 脚本的 stderr
+ * @returns {{timings: Object|null, rest: string}} 耗时报告，以及去掉耗时行后的 stderr
+ */
+export function splitTimings(text) {
+  const spans = [];
+  let total = null;
+  const rest = [];
+
+  for (const line of text.split('\n')) {
+    if (line.startsWith('{"span"')) {
+      try {
+        const item = JSON.parse(line);
+        if (item.span === 'total') {
+          total = item;
+        } else {
+          spans.push(item);
+        }
+        continue;
+      } catch (error) {
+        // 不是完整的耗时记录，按普通输出处理
+      }
+    }
+    rest.push(line);
+  }
+
+  const timings = total || spans.length
+    ? { totalMs: total ? total.ms : null, summary: total ? total.summary : {}, spans }
+    : null;
+  return { timings, rest: rest.join('\n') };
+}
+
+/**
+ * 取出并删除结果中的 _timings 字段
+ * @param {any} result - 脚本返回的 JSON
+ * @returns {Object|null} 耗时报告
+ */
+export function takeTimings(result) {
+  if (!result || typeof result !== 'object' || Array.isArray(result) || !result._timings) {
+    return null;
+  }
+  const timings = result._timings;
+  delete result._timings;
+  return timings;
+}
+
+/**
+ * 输出一行耗时日志，如：⏱️ get_sectors.py 5230ms import=812 upstream=4102 transform=35 serialize=2
+ * @param {string} label - 脚本名或工作进程方法名
+ * @param {Object|null} timings - 耗时报告
+ */
+export function logTimings(label, timings) {
+  if (!timings) {
+    return;
+  }
+  const parts = Object.entries(timings.summary || {})
+    .map(([name, ms]) => `${name}=${Math.round(ms)}`);
+  const total = timings.totalMs != null ? `${Math.round(timings.totalMs)}ms` : '';
+  console.log(`⏱️ ${label} ${total} ${parts.join(' ')}`.trim());
+
+  // 最慢的几个阶段，便于定位具体的上游调用
+  const slowest = [...(timings.spans || [])]
+    .sort((a, b) => b.ms - a.ms)
+    .slice(0, 3)
+    .map((item) => `${item.span}=${Math.round(item.ms)}`);
+  if (slowest.length) {
+    console.log(`   slowest: ${slowest.join(' ')}`);
+  }
+}
@@ -19,29 +19,17 @@
 """
 
 import sys
+import os
 import json
 from datetime import datetime, timedelta
-from WindPy import w
+from wind_upstream import w
 
-def calculate_percentile(value, values_list):
-    """
-    计算分位数
-    
-    Args:
-        value: 当前值
-        values_list: 历史值列表
-    
-    Returns:
-        分位数百分比
-    """
-    if not values_list:
-        return 0
-    
-    sorted_values = sorted(values_list)
-    rank = sum(1 for v in sorted_values if v <= value)
-    percentile = (rank / len(sorted_values)) * 100
-    
-    return round(percentile, 2)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from pycommon.percentile import PercentileIndex, expanding_percentiles, trailing_percentiles
+from pycommon import profiling, timings
+
+# chartData 中滚动分位数的窗口年数
+TRAILING_YEARS = (5, 10)
 
 def get_equity_bond_spread(target_date):
     """
@@ -83,115 +71,125 @@ def get_equity_bond_spread(target_date):
         if bond_data.ErrorCode != 0:
             raise Exception(f"获取国债收益率数据失败: {bond_data.ErrorMsg}")
         
-        # 提取数据
-        dates = wind_a_data.Times
-        wind_a_closes = wind_a_data.Data[0]
-        pe_values = wind_a_data.Data[1]
-        pb_values = wind_a_data.Data[2]
-        bond_yields = bond_data.Data[0]
-        
-        # 计算股债利差 (盈利收益率法)
-        # 股债利差 = 盈利收益率 - 国债收益率
-        # 盈利收益率 (Earnings Yield) = 1/PE × 100 = E/P × 100
-        # 股息率 = 1 / PE * 100
-        chart_data = []
-        spreads = []
-        pbs = []
-        pes = []
-        
-        for i, date in enumerate(dates):
-            if i < len(pe_values) and i < len(pb_values) and i < len(bond_yields):
-                pe = pe_values[i] if pe_values[i] else 15  # 默认PE
-                pb = pb_values[i] if pb_values[i] else 1.5  # 默认PB
-                bond_yield = bond_yields[i] if bond_yields[i] else 3.0  # 默认债券收益率
-                wind_a = wind_a_closes[i] if wind_a_closes[i] else 3000  # 默认指数
-                
-                # 计算盈利收益率 (Earnings Yield = E/P = 1/PE × 100)
-                earnings_yield = (1 / pe * 100) if pe > 0 else 0
-                
-                # 股债利差 = 盈利收益率 - 国债收益率
-                spread = earnings_yield - bond_yield
-                
-                year = date.year
-                month = date.month
-                date_str = f"{year}-{str(month).padStart(2, '0')}-01"
+        with timings.span("transform"):
+            # 提取数据
+            dates = wind_a_data.Times
+            wind_a_closes = wind_a_data.Data[0]
+            pe_values = wind_a_data.Data[1]
+            pb_values = wind_a_data.Data[2]
+            bond_yields = bond_data.Data[0]
+            
+            # 计算股债利差 (盈利收益率法)
+            # 股债利差 = 盈利收益率 - 国债收益率
+            # 盈利收益率 (Earnings Yield) = 1/PE × 100 = E/P × 100
+            # 股息率 = 1 / PE * 100
+            chart_data = []
+            spreads = []
+            pbs = []
+            pes = []
+            
+            for i, date in enumerate(dates):
+                if i < len(pe_values) and i < len(pb_values) and i < len(bond_yields):
+                    pe = pe_values[i] if pe_values[i] else 15  # 默认PE
+                    pb = pb_values[i] if pb_values[i] else 1.5  # 默认PB
+                    bond_yield = bond_yields[i] if bond_yields[i] else 3.0  # 默认债券收益率
+                    wind_a = wind_a_closes[i] if wind_a_closes[i] else 3000  # 默认指数
+                    
+                    # 计算盈利收益率 (Earnings Yield = E/P = 1/PE × 100)
+                    earnings_yield = (1 / pe * 100) if pe > 0 else 0
+                    
+                    # 股债利差 = 盈利收益率 - 国债收益率
+                    spread = earnings_yield - bond_yield
+                    
+                    year = date.year
+                    month = date.month
+                    date_str = f"{year}-{month:02d}-01"
+                    
+                    chart_data.append({
+                        "date": date_str,
+                        "year": year,
+                        "displayYear": year if month == 1 else "",
+                        "spread": round(spread, 2),
+                        "windA": round(wind_a, 0)
+                    })
+                    
+                    spreads.append(spread)
+                    # 只有非None的PB和PE才加入统计
+                    if pb is not None:
+                        pbs.append(pb)
+                    if pe is not None:
+                        pes.append(pe)
+            
+            # 每个点的股债利差历史分位数，只用该点之前（含）的数据，一次计算整条序列
+            chart_dates = [item["date"] for item in chart_data]
+            percentiles = {"percentile": expanding_percentiles(spreads)}
+            for years in TRAILING_YEARS:
+                percentiles[f"percentile{years}y"] = trailing_percentiles(spreads, dates=chart_dates, years=years)
+            for name, values in percentiles.items():
+                for item, value in zip(chart_data, values.tolist()):
+                    item[name] = round(value, 2)
+            
+            # 查找目标日期的数据
+            target_dt = datetime.strptime(target_date, "%Y-%m-%d")
+            target_year = target_dt.year
+            target_month = target_dt.month
+            target_date_str = f"{target_year}-{target_month:02d}-01"
+            
+            # 找到对应的数据点
+            target_data = None
+            target_idx = -1
+            
+            for i, item in enumerate(chart_data):
+                if item["date"] == target_date_str:
+                    target_data = item
+                    target_idx = i
+                    break
+            
+            # 如果找不到精确日期，使用最新数据
+            if not target_data and chart_data:
+                target_data = chart_data[-1]
+                target_idx = len(chart_data) - 1
+            
+            # 计算指标
+            if target_data and target_idx >= 0:
+                spread = target_data["spread"]
+                pb = pbs[target_idx]
+                pe = pes[target_idx]
                 
-                chart_data.append({
-                    "date": date_str,
-                    "year": year,
-                    "displayYear": year if month == 1 else "",
-                    "spread": round(spread, 2),
-                    "windA": round(wind_a, 0)
-                })
+                # 计算分位数
+                spread_percentile = PercentileIndex(spreads).percentile(spread)
+                pb_percentile = PercentileIndex(pbs).percentile(pb)
+                pe_percentile = PercentileIndex(pes).percentile(pe)
                 
-                spreads.append(spread)
-                # 只有非None的PB和PE才加入统计
-                if pb is not None:
-                    pbs.append(pb)
-                if pe is not None:
-                    pes.append(pe)
-        
-        # 查找目标日期的数据
-        target_dt = datetime.strptime(target_date, "%Y-%m-%d")
-        target_year = target_dt.year
-        target_month = target_dt.month
-        target_date_str = f"{target_year}-{str(target_month).padStart(2, '0')}-01"
-        
-        # 找到对应的数据点
-        target_data = None
-        target_idx = -1
-        
-        for i, item in enumerate(chart_data):
-            if item["date"] == target_date_str:
-                target_data = item
-                target_idx = i
-                break
-        
-        # 如果找不到精确日期，使用最新数据
-        if not target_data and chart_data:
-            target_data = chart_data[-1]
-            target_idx = len(chart_data) - 1
-        
-        # 计算指标
-        if target_data and target_idx >= 0:
-            spread = target_data["spread"]
-            pb = pbs[target_idx]
-            pe = pes[target_idx]
+                metrics = {
+                    "spreadPercentile": spread_percentile,
+                    "spread": str(round(spread, 2)),
+                    "pb": round(pb, 2),
+                    "pbPercentile": pb_percentile,
+                    "pe": round(pe, 2),
+                    "pePercentile": pe_percentile
+                }
+            else:
+                # 默认值
+                metrics = {
+                    "spreadPercentile": 50,
+                    "spread": "2.0",
+                    "pb": 1.5,
+                    "pbPercentile": 50,
+                    "pe": 15,
+                    "pePercentile": 50
+                }
             
-            # 计算分位数
-            spread_percentile = calculate_percentile(spread, spreads)
-            pb_percentile = calculate_percentile(pb, pbs)
-            pe_percentile = calculate_percentile(pe, pes)
-            
-            metrics = {
-                "spreadPercentile": spread_percentile,
-                "spread": str(round(spread, 2)),
-                "pb": round(pb, 2),
-                "pbPercentile": pb_percentile,
-                "pe": round(pe, 2),
-                "pePercentile": pe_percentile
-            }
-        else:
-            # 默认值
-            metrics = {
-                "spreadPercentile": 50,
-                "spread": "2.0",
-                "pb": 1.5,
-                "pbPercentile": 50,
-                "pe": 15,
-                "pePercentile": 50
+            result = {
+                "metrics": metrics,
+                "chartData": chart_data
             }
         
-        result = {
-            "metrics": metrics,
-            "chartData": chart_data
-        }
-        
         # 关闭Wind API
         w.stop()
         
         # 输出JSON数据
-        print(json.dumps(result, ensure_ascii=False))
+        print(timings.dumps(result, ensure_ascii=False))
         
     except Exception as e:
         w.stop()
@@ -203,5 +201,7 @@ if __name__ == "__main__":
         print(json.dumps({"error": "参数不足，需要: date"}))
         sys.exit(1)
     
+    timings.mark_imported()
+    profiling.install()
     date = sys.argv[1]
     get_equity_bond_spread(date)
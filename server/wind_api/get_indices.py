@@ -6,8 +6,11 @@
 """
 
 import sys
+import os
 import json
-from WindPy import w
+from wind_upstream import w
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from pycommon import profiling, timings
 
 def get_indices_data(codes, date):
     """
@@ -67,7 +70,7 @@ def get_indices_data(codes, date):
     w.stop()
     
     # 输出JSON数据
-    print(json.dumps(result, ensure_ascii=False))
+    print(timings.dumps(result, ensure_ascii=False))
 
 if __name__ == "__main__":
     if len(sys.argv) < 3:
@@ -77,4 +80,6 @@ if __name__ == "__main__":
     codes = sys.argv[1]
     date = sys.argv[2]
     
+    timings.mark_imported()
+    profiling.install()
     get_indices_data(codes, date)
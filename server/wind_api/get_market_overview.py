@@ -6,8 +6,11 @@
 """
 
 import sys
+import os
 import json
-from WindPy import w
+from wind_upstream import w
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from pycommon import profiling, timings
 
 def get_market_overview(date):
     """
@@ -73,18 +76,19 @@ def get_market_overview(date):
                         "changePercent": 0
                     }
                 else:
-                    # 统计涨跌家数
-                    changes = stocks_data.Data[0] if stocks_data.Data and len(stocks_data.Data) > 0 else []
-                    
-                    up_limit = sum(1 for c in changes if c and c >= 9.9)  # 涨停
-                    up = sum(1 for c in changes if c and 0 < c < 9.9)     # 上涨
-                    flat = sum(1 for c in changes if c and c == 0)        # 平盘
-                    down = sum(1 for c in changes if c and -9.9 < c < 0)  # 下跌
-                    down_limit = sum(1 for c in changes if c and c <= -9.9)  # 跌停
-                    
-                    # 计算整体涨跌幅（上涨家数占比）
-                    total = len(changes)
-                    change_percent = (up / total * 100) if total > 0 else 0
+                    with timings.span("transform"):
+                        # 统计涨跌家数
+                        changes = stocks_data.Data[0] if stocks_data.Data and len(stocks_data.Data) > 0 else []
+                        
+                        up_limit = sum(1 for c in changes if c and c >= 9.9)  # 涨停
+                        up = sum(1 for c in changes if c and 0 < c < 9.9)     # 上涨
+                        flat = sum(1 for c in changes if c and c == 0)        # 平盘
+                        down = sum(1 for c in changes if c and -9.9 < c < 0)  # 下跌
+                        down_limit = sum(1 for c in changes if c and c <= -9.9)  # 跌停
+                        
+                        # 计算整体涨跌幅（上涨家数占比）
+                        total = len(changes)
+                        change_percent = (up / total * 100) if total > 0 else 0
                     
                     result = {
                         "upLimit": up_limit,
@@ -99,7 +103,7 @@ def get_market_overview(date):
         w.stop()
         
         # 输出JSON数据
-        print(json.dumps(result, ensure_ascii=False))
+        print(timings.dumps(result, ensure_ascii=False))
         
     except Exception as e:
         w.stop()
@@ -111,5 +115,7 @@ if __name__ == "__main__":
         print(json.dumps({"error": "参数不足，需要: date"}))
         sys.exit(1)
     
+    timings.mark_imported()
+    profiling.install()
     date = sys.argv[1]
     get_market_overview(date)
@@ -6,8 +6,11 @@
 """
 
 import sys
+import os
 import json
-from WindPy import w
+from wind_upstream import w
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from pycommon import profiling, timings
 
 # 板块配置
 SECTOR_CONFIGS = {
@@ -202,7 +205,7 @@ def get_sectors_data(date):
     w.stop()
     
     # 输出JSON数据
-    print(json.dumps(result, ensure_ascii=False))
+    print(timings.dumps(result, ensure_ascii=False))
 
 if __name__ == "__main__":
     if len(sys.argv) < 2:
@@ -210,4 +213,6 @@ if __name__ == "__main__":
         sys.exit(1)
     
     date = sys.argv[1]
+    timings.mark_imported()
+    profiling.install()
     get_sectors_data(date)
@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+WindPy 调用入口
+
+各脚本通过 `from wind_upstream import w` 调用 WindPy，用法与 `from WindPy import w` 相同:
+
+    data = w.wsd("000001.SH", "pct_chg", date, date, "")
+    if data.ErrorCode != 0: ...
+
+取数函数（wsd/wss/wset 等）返回表示网络超时等临时故障的 ErrorCode 或抛出连接错误时，
+按指数退避重试，不超过调用方的期限（见 pycommon.resilience）。重试用尽后返回最后一次的
+结果，脚本照常检查 ErrorCode。start/stop/isconnected 等直接透传。
+
+UPSTREAM_MODE=record/replay 时录制或回放取数函数的结果（见 pycommon.recorder）；
+回放时不导入 WindPy，start/isconnected/stop 视为已连接。
+SCRIPT_TIMINGS 开启时取数函数的调用记为 wind.<函数名> 阶段（见 pycommon.timings）。
+"""
+
+import os
+import sys
+import functools
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from pycommon import resilience, timings
+from pycommon.recorder import Recorder, RecordedWindData
+
+# 经过重试的取数函数
+DATA_FUNCTIONS = frozenset(["wsd", "wss", "wset", "wsq", "wsi", "wst", "edb", "tdays", "wses", "wsee"])
+
+# 视为临时故障的 ErrorCode（请求超时、网络中断），可用 WIND_RETRYABLE_CODES 追加，逗号分隔
+RETRYABLE_CODES = frozenset(
+    [-40521010, -40521004]
+    + [int(code) for code in os.environ.get("WIND_RETRYABLE_CODES", "").split(",") if code.strip()]
+)
+
+RETRY_POLICY = resilience.RetryPolicy(attempts=3, base=0.5, cap=4.0)
+
+class _RetryableResult(resilience.RetryableError):
+    """ErrorCode 表示临时故障的返回值"""
+
+    def __init__(self, data):
+        super().__init__(f"ErrorCode {data.ErrorCode}: {getattr(data, 'ErrorMsg', '')}")
+        self.data = data
+
+class _ReplayClient:
+    """回放时代替 WindPy 的 w：连接相关的函数视为成功"""
+
+    def start(self, *args, **kwargs):
+        return RecordedWindData(ErrorCode=0)
+
+    def isconnected(self):
+        return True
+
+    def stop(self):
+        return None
+
+class WindProxy:
+    """
+    WindPy w 对象的代理，取数函数经过录制/回放和重试
+
+    Args:
+        recorder: pycommon.recorder.Recorder 实例，None 表示直接调用 WindPy
+    """
+
+    def __init__(self, recorder=None):
+        self._recorder = recorder
+        self._client = None
+        self._wrappers = {}
+
+    def _wind(self):
+        if self._client is None:
+            if self._recorder is not None and self._recorder.replaying:
+                self._client = _ReplayClient()
+            else:
+                from WindPy import w
+                self._client = w
+        return self._client
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        wrapper = self._wrappers.get(name)
+        if wrapper is not None:
+            return wrapper
+
+        recorder = self._recorder
+        if name in DATA_FUNCTIONS and recorder is not None and recorder.replaying:
+            target = recorder.wrap(name, None)
+        else:
+            target = getattr(self._wind(), name)
+            if name not in DATA_FUNCTIONS or not callable(target):
+                return target
+            if recorder is not None:
+                target = recorder.wrap(name, target)
+
+        def attempt(*args, **kwargs):
+            data = target(*args, **kwargs)
+            if getattr(data, "ErrorCode", 0) in RETRYABLE_CODES:
+                raise _RetryableResult(data)
+            return data
+
+        def wrapper(*args, **kwargs):
+            with timings.span(f"wind.{name}"):
+                try:
+                    return resilience.call(functools.partial(attempt, *args, **kwargs), policy=RETRY_POLICY, name=name)
+                except _RetryableResult as e:
+                    return e.data
+
+        wrapper.__name__ = name
+        wrapper.__doc__ = target.__doc__
+        self._wrappers[name] = wrapper
+        return wrapper
+
+recorder = Recorder("wind", convert=RecordedWindData.from_wind)
+w = WindProxy(recorder)
@@ -0,0 +1,138 @@
+import { spawn } from 'child_process';
+import net from 'net';
+import os from 'os';
+import path from 'path';
+import readline from 'readline';
+import { fileURLToPath } from 'url';
+
+const __filename = fileURLToPath(import.meta.url);
+const __dirname = path.dirname(__filename);
+
+/**
+ * AKShare 一次性脚本的 fork 服务（zygote）客户端
+ *
+ * 与 akshare_api/zygote.py 通过 Unix socket 通信：zygote 只导入一次 akshare/pandas/numpy，
+ * 每个请求 fork 一个子进程执行脚本，返回与直接启动脚本相同的 stdout、stderr 和退出码，
+ * 仍然一个请求一个进程，但省去解释器启动和导入。
+ * 设置环境变量 AKSHARE_ZYGOTE=true 开启：一次性脚本（常驻工作进程关闭或不可用时）经由 zygote 执行。
+ */
+
+const ZYGOTE_SCRIPT = path.join(__dirname, 'akshare_api', 'zygote.py');
+const SOCKET_PATH = path.join(os.tmpdir(), `akshare-zygote-${process.pid}.sock`);
+const READY_TIMEOUT = 60000; // 等待 zygote 就绪（导入 akshare）
+// zygote 终止请求的时间上限（秒，含排队），默认与一次性脚本的5分钟一致
+const ZYGOTE_TIMEOUT = Number(process.env.AKSHARE_ZYGOTE_TIMEOUT) > 0 ? Number(process.env.AKSHARE_ZYGOTE_TIMEOUT) : 300;
+const CALL_TIMEOUT = (ZYGOTE_TIMEOUT + 10) * 1000; // 单次调用超时，留出余量让 zygote 先终止子进程并返回结果
+
+let zygote = null;
+let readyPromise = null;
+
+/**
+ * 是否经由 zygote 执行一次性脚本
+ */
+export function isZygoteEnabled() {
+  return process.env.AKSHARE_ZYGOTE === 'true' && process.platform !== 'win32';
+}
+
+/**
+ * 启动 zygote（已启动则复用）
+ * @returns {Promise<void>} zygote 就绪
+ */
+function startZygote() {
+  if (readyPromise) {
+    return readyPromise;
+  }
+
+  readyPromise = new Promise((resolve, reject) => {
+    // stdin 关闭（Node 退出）时 zygote 随之退出
+    const proc = spawn('python3', [
+      ZYGOTE_SCRIPT, '--socket', SOCKET_PATH, '--timeout', String(ZYGOTE_TIMEOUT), '--watch-stdin',
+    ], {
+      cwd: path.dirname(ZYGOTE_SCRIPT),
+    });
+    zygote = proc;
+
+    const readyTimer = setTimeout(() => {
+      reject(new Error('AKShare zygote 启动超时'));
+      proc.kill();
+    }, READY_TIMEOUT);
+
+    const lines = readline.createInterface({ input: proc.stdout });
+    lines.on('line', (line) => {
+      let message;
+      try {
+        message = JSON.parse(line);
+      } catch (error) {
+        return;
+      }
+      if (message.ready) {
+        clearTimeout(readyTimer);
+        console.log('🐍 AKShare zygote 已就绪, pid:', message.pid);
+        resolve();
+      }
+    });
+
+    proc.stderr.on('data', (data) => {
+      console.warn('Python zygote stderr:', data.toString());
+    });
+
+    proc.on('error', (error) => {
+      clearTimeout(readyTimer);
+      reject(new Error(`Failed to start Python zygote: ${error.message}`));
+    });
+
+    proc.on('exit', (code) => {
+      clearTimeout(readyTimer);
+      console.warn(`⚠️ AKShare zygote 退出, code: ${code}`);
+      reject(new Error(`Python zygote exited with code ${code}`));
+      // 下次调用时重新启动
+      if (zygote === proc) {
+        zygote = null;
+        readyPromise = null;
+      }
+    });
+  });
+
+  return readyPromise;
+}
+
+/**
+ * 经由 zygote 执行脚本
+ * @param {string} script - 脚本路径（按文件名在 akshare_api 下查找）
+ * @param {Array} args - 命令行参数
+ * @returns {Promise<Object>} { code, stdout, stderr }，zygote 拒绝或终止了子进程时为 { error, stderr }，
+ *   繁忙或正在退出时带 busy，子进程因内存或超时被终止时带 killed
+ */
+export async function runInZygote(script, args = []) {
+  await startZygote();
+
+  return new Promise((resolve, reject) => {
+    const socket = net.createConnection(SOCKET_PATH);
+    let data = '';
+
+    const timer = setTimeout(() => {
+      socket.destroy();
+      reject(new Error(`zygote 调用超时: ${path.basename(script)}`));
+    }, CALL_TIMEOUT);
+
+    socket.setEncoding('utf8');
+    socket.on('connect', () => {
+      socket.write(JSON.stringify({ script: path.basename(script), args: args.map(String) }) + '\n');
+    });
+    socket.on('data', (chunk) => {
+      data += chunk;
+    });
+    socket.on('error', (error) => {
+      clearTimeout(timer);
+      reject(error);
+    });
+    socket.on('end', () => {
+      clearTimeout(timer);
+      try {
+        resolve(JSON.parse(data));
+      } catch (error) {
+        reject(new Error('zygote 未返回结果就关闭了连接'));
+      }
+    });
+  });
+}